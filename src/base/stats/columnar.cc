@@ -0,0 +1,368 @@
+/*
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are
+ * met: redistributions of source code must retain the above copyright
+ * notice, this list of conditions and the following disclaimer;
+ * redistributions in binary form must reproduce the above copyright
+ * notice, this list of conditions and the following disclaimer in the
+ * documentation and/or other materials provided with the distribution;
+ * neither the name of the copyright holders nor the names of its
+ * contributors may be used to endorse or promote products derived from
+ * this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+ * "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+ * LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+ * A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+ * OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+ * SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include "base/stats/columnar.hh"
+
+#include <algorithm>
+#include <cmath>
+#include <ostream>
+#include <sstream>
+
+#include "base/stats/info.hh"
+#include "base/misc.hh"
+#include "base/output.hh"
+#include "sim/core.hh"
+
+using namespace std;
+
+namespace Stats {
+
+std::list<Info *> &statsList();
+
+namespace {
+
+const char columnarMagic[8] = { 'g', 'e', 'm', '5', 'c', 's', 't', '\0' };
+const uint32_t columnarVersion = 1;
+
+} // anonymous namespace
+
+Columnar::Columnar(std::ostream &_stream)
+    : stream(&_stream), defined(false), defining(false)
+{
+    if (!valid())
+        fatal("Unable to open columnar statistics file for writing\n");
+}
+
+bool
+Columnar::valid() const
+{
+    return stream != NULL && stream->good();
+}
+
+void
+Columnar::add(const string &name, Result value)
+{
+    values.push_back(value);
+    if (defining)
+        valueNames.push_back(name);
+}
+
+void
+Columnar::addVector(const string &name, const string &separator,
+                    const VResult &vec, const vector<string> &subnames,
+                    Result total, bool print_total, bool force_subnames)
+{
+    size_type size = vec.size();
+    bool havesub = !subnames.empty();
+    string base = name + separator;
+
+    // Follow the naming of VectorPrint in the text output
+    if (size == 1) {
+        add(force_subnames ?
+            base + (havesub ? subnames[0] : std::to_string(0)) : name,
+            vec[0]);
+        return;
+    }
+
+    for (off_type i = 0; i < size; ++i) {
+        if (havesub && (i >= subnames.size() || subnames[i].empty()))
+            continue;
+
+        add(defining ?
+            base + (havesub ? subnames[i] : std::to_string(i)) : "",
+            vec[i]);
+    }
+
+    if (print_total)
+        add(base + "total", total);
+}
+
+void
+Columnar::addDist(const string &name, const string &separator,
+                  const DistData &data)
+{
+    // Follow the naming of DistPrint in the text output
+    string base = name + separator;
+
+    add(base + "samples", data.samples);
+    add(base + "mean", data.samples ? data.sum / data.samples : NAN);
+
+    if (data.type == Hist)
+        add(base + "gmean",
+            data.samples ? exp(data.logs / data.samples) : NAN);
+
+    Result stdev = NAN;
+    if (data.samples)
+        stdev = sqrt((data.samples * data.squares - data.sum * data.sum) /
+                     (data.samples * (data.samples - 1.0)));
+    add(base + "stdev", stdev);
+
+    if (data.type == Deviation)
+        return;
+
+    size_t size = data.cvec.size();
+
+    Result total = 0.0;
+    for (off_type i = 0; i < size; ++i)
+        total += data.cvec[i];
+
+    if (data.type == Dist) {
+        total += data.underflow + data.overflow;
+        add(base + "underflows", data.underflow);
+    }
+
+    for (off_type i = 0; i < size; ++i) {
+        string bucket;
+        if (defining) {
+            stringstream namestr;
+            namestr << base;
+
+            Counter low = i * data.bucket_size + data.min;
+            Counter high = ::min(low + data.bucket_size - 1.0, data.max);
+            namestr << low;
+            if (low < high)
+                namestr << "-" << high;
+            bucket = namestr.str();
+        }
+        add(bucket, data.cvec[i]);
+    }
+
+    if (data.type == Dist) {
+        add(base + "overflows", data.overflow);
+        add(base + "min_value", data.min_val);
+        add(base + "max_value", data.max_val);
+    }
+
+    add(base + "total", total);
+}
+
+void
+Columnar::store(const Info &info)
+{
+    if (defining) {
+        columns[info.id] = make_pair(names.size(), values.size());
+        names.insert(names.end(), valueNames.begin(), valueNames.end());
+        valueNames.clear();
+    } else {
+        auto c = columns.find(info.id);
+        if (c != columns.end()) {
+            // The number of values only changes if a stat was resized
+            // after the columns were defined, keep what fits.
+            size_type count =
+                ::min<size_type>(c->second.second, values.size());
+            copy(values.begin(), values.begin() + count,
+                 row.begin() + c->second.first);
+        }
+    }
+
+    values.clear();
+}
+
+void
+Columnar::visit(const ScalarInfo &info)
+{
+    if (!info.flags.isSet(display))
+        return;
+
+    add(info.name, info.result());
+    store(info);
+}
+
+void
+Columnar::visit(const VectorInfo &info)
+{
+    if (!info.flags.isSet(display))
+        return;
+
+    addVector(info.name, info.separatorString, info.result(), info.subnames,
+              info.total(), info.flags.isSet(::Stats::total), false);
+    store(info);
+}
+
+void
+Columnar::visit(const Vector2dInfo &info)
+{
+    if (!info.flags.isSet(display))
+        return;
+
+    vector<string> y_subnames;
+    for (off_type i = 0; i < info.y_subnames.size(); ++i) {
+        if (!info.y_subnames[i].empty()) {
+            y_subnames = info.y_subnames;
+            break;
+        }
+    }
+
+    bool havesub = false;
+    for (off_type i = 0; i < info.subnames.size() && i < info.x; ++i)
+        if (!info.subnames[i].empty())
+            havesub = true;
+
+    bool print_total = info.flags.isSet(::Stats::total);
+    Result super_total = 0.0;
+    for (off_type i = 0; i < info.x; ++i) {
+        if (havesub && (i >= info.subnames.size() || info.subnames[i].empty()))
+            continue;
+
+        off_type iy = i * info.y;
+        VResult yvec(info.cvec.begin() + iy, info.cvec.begin() + iy + info.y);
+
+        Result total = 0.0;
+        for (off_type j = 0; j < info.y; ++j)
+            total += yvec[j];
+        super_total += total;
+
+        addVector(info.name + "_" +
+                  (havesub ? info.subnames[i] : std::to_string(i)),
+                  info.separatorString, yvec, y_subnames, total,
+                  print_total, true);
+    }
+
+    if (print_total && info.x > 1)
+        add(info.name + info.separatorString + "total", super_total);
+
+    store(info);
+}
+
+void
+Columnar::visit(const DistInfo &info)
+{
+    if (!info.flags.isSet(display))
+        return;
+
+    addDist(info.name, info.separatorString, info.data);
+    store(info);
+}
+
+void
+Columnar::visit(const VectorDistInfo &info)
+{
+    if (!info.flags.isSet(display))
+        return;
+
+    for (off_type i = 0; i < info.size(); ++i) {
+        addDist(info.name + "_" +
+                (info.subnames[i].empty() ? std::to_string(i) :
+                 info.subnames[i]),
+                info.separatorString, info.data[i]);
+    }
+    store(info);
+}
+
+void
+Columnar::visit(const FormulaInfo &info)
+{
+    visit((const VectorInfo &)info);
+}
+
+void
+Columnar::visit(const SparseHistInfo &info)
+{
+    if (!info.flags.isSet(display))
+        return;
+
+    // The buckets of a sparse histogram come and go, so only the
+    // number of samples has a fixed column.
+    add(info.name + info.separatorString + "samples", info.data.samples);
+    store(info);
+}
+
+void
+Columnar::define()
+{
+    // Define the columns from all the stats, whether or not they are
+    // part of this dump, so that every row has the same layout.
+    names.push_back("tick");
+
+    defining = true;
+    for (auto info : statsList()) {
+        if (!info->flags.isSet(display))
+            continue;
+
+        info->prepare();
+        info->visit(*this);
+    }
+    defining = false;
+    defined = true;
+
+    writeHeader();
+}
+
+void
+Columnar::writeHeader()
+{
+    uint32_t version = columnarVersion;
+    uint32_t count = names.size();
+
+    uint64_t offset = sizeof(columnarMagic) + sizeof(version) +
+        sizeof(count) + sizeof(uint64_t);
+    for (auto &name : names)
+        offset += name.size() + 1;
+    uint64_t padding = (8 - offset % 8) % 8;
+    offset += padding;
+
+    stream->write(columnarMagic, sizeof(columnarMagic));
+    stream->write((const char *)&version, sizeof(version));
+    stream->write((const char *)&count, sizeof(count));
+    stream->write((const char *)&offset, sizeof(offset));
+    for (auto &name : names)
+        stream->write(name.c_str(), name.size() + 1);
+    for (uint64_t i = 0; i < padding; ++i)
+        stream->put('\0');
+}
+
+void
+Columnar::begin()
+{
+    if (!defined)
+        define();
+
+    row.assign(names.size(), NAN);
+    row[0] = curTick();
+}
+
+void
+Columnar::end()
+{
+    stream->write((const char *)row.data(), row.size() * sizeof(double));
+    stream->flush();
+}
+
+Output *
+initColumnar(const string &filename)
+{
+    static Columnar *columnar = NULL;
+
+    // The file is raw binary data meant to be memory mapped, so it
+    // is never compressed.
+    if (!columnar) {
+        OutputStream *os = simout.create(filename, true, true);
+        columnar = new Columnar(*os->stream());
+    }
+
+    return columnar;
+}
+
+} // namespace Stats
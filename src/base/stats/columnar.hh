@@ -0,0 +1,119 @@
+/*
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are
+ * met: redistributions of source code must retain the above copyright
+ * notice, this list of conditions and the following disclaimer;
+ * redistributions in binary form must reproduce the above copyright
+ * notice, this list of conditions and the following disclaimer in the
+ * documentation and/or other materials provided with the distribution;
+ * neither the name of the copyright holders nor the names of its
+ * contributors may be used to endorse or promote products derived from
+ * this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+ * "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+ * LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+ * A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+ * OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+ * SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#ifndef __BASE_STATS_COLUMNAR_HH__
+#define __BASE_STATS_COLUMNAR_HH__
+
+#include <iosfwd>
+#include <string>
+#include <unordered_map>
+#include <utility>
+#include <vector>
+
+#include "base/stats/output.hh"
+#include "base/stats/types.hh"
+
+namespace Stats {
+
+struct DistData;
+
+/**
+ * Binary stats output storing one fixed-width row of doubles per
+ * dump.
+ *
+ * The file starts with a header holding the column names, followed
+ * by the rows, so that the rows can be memory mapped as a 2D array:
+ *
+ *   char     magic[8]     "gem5cst\0"
+ *   uint32_t version      format version, currently 1
+ *   uint32_t columns      number of columns
+ *   uint64_t data_offset  offset of the first row, a multiple of 8
+ *   char     names[]      NUL terminated column names, zero padded
+ *                         up to data_offset
+ *   double   rows[][columns]
+ *
+ * All the fields are in host byte order. The first column is the
+ * tick of the dump and is named "tick". The other columns are the
+ * values of every displayed stat, named as in the text output, and
+ * are fixed when the first dump is written. Values that weren't
+ * part of a dump (e.g., when only a selection of the stats is
+ * dumped) are NaN.
+ */
+class Columnar : public Output
+{
+  protected:
+    std::ostream *stream;
+
+    /** Are the columns defined yet? */
+    bool defined;
+    /** Is a stat being visited to define its columns? */
+    bool defining;
+
+    /** The names of the columns. */
+    std::vector<std::string> names;
+    /** The first column and the number of columns of each stat. */
+    std::unordered_map<int, std::pair<size_type, size_type> > columns;
+    /** The row of the dump in progress. */
+    std::vector<double> row;
+
+    /** Values and, when defining the columns, names of a stat. */
+    VResult values;
+    std::vector<std::string> valueNames;
+
+    void add(const std::string &name, Result value);
+    void addVector(const std::string &name, const std::string &separator,
+                   const VResult &vec,
+                   const std::vector<std::string> &subnames,
+                   Result total, bool print_total, bool force_subnames);
+    void addDist(const std::string &name, const std::string &separator,
+                 const DistData &data);
+    void store(const Info &info);
+
+    void define();
+    void writeHeader();
+
+  public:
+    Columnar(std::ostream &stream);
+
+    // Implement Visit
+    virtual void visit(const ScalarInfo &info);
+    virtual void visit(const VectorInfo &info);
+    virtual void visit(const DistInfo &info);
+    virtual void visit(const VectorDistInfo &info);
+    virtual void visit(const Vector2dInfo &info);
+    virtual void visit(const FormulaInfo &info);
+    virtual void visit(const SparseHistInfo &info);
+
+    // Implement Output
+    virtual bool valid() const;
+    virtual void begin();
+    virtual void end();
+};
+
+Output *initColumnar(const std::string &filename);
+
+} // namespace Stats
+
+#endif // __BASE_STATS_COLUMNAR_HH__
@@ -66,6 +66,21 @@ const FlagsType __reserved =    init | display;
 struct StorageParams;
 struct Output;
 
+/**
+ * The concrete kind of an Info object. This lets the Python stats
+ * package pick the right wrapper for a stat without trying every
+ * downcast in turn.
+ */
+enum InfoType {
+    ScalarInfoType,
+    VectorInfoType,
+    DistInfoType,
+    VectorDistInfoType,
+    Vector2dInfoType,
+    FormulaInfoType,
+    SparseHistInfoType
+};
+
 class Info
 {
   public:
@@ -133,6 +148,11 @@ class Info
      */
     virtual void visit(Output &visitor) = 0;
 
+    /**
+     * @return the concrete kind of this stat
+     */
+    virtual InfoType infoType() const = 0;
+
     /**
      * Checks if the first stat's name is alphabetically less than the second.
      * This function breaks names up at periods and considers each subname
@@ -150,6 +170,8 @@ class ScalarInfo : public Info
     virtual Counter value() const = 0;
     virtual Result result() const = 0;
     virtual Result total() const = 0;
+
+    InfoType infoType() const { return ScalarInfoType; }
 };
 
 class VectorInfo : public Info
@@ -167,6 +189,8 @@ class VectorInfo : public Info
     virtual const VCounter &value() const = 0;
     virtual const VResult &result() const = 0;
     virtual Result total() const = 0;
+
+    InfoType infoType() const { return VectorInfoType; }
 };
 
 enum DistType { Deviation, Dist, Hist };
@@ -194,6 +218,8 @@ class DistInfo : public Info
   public:
     /** Local storage for the entry values, used for printing. */
     DistData data;
+
+    InfoType infoType() const { return DistInfoType; }
 };
 
 class VectorDistInfo : public Info
@@ -212,6 +238,8 @@ class VectorDistInfo : public Info
 
   public:
     virtual size_type size() const = 0;
+
+    InfoType infoType() const { return VectorDistInfoType; }
 };
 
 class Vector2dInfo : public Info
@@ -229,12 +257,16 @@ class Vector2dInfo : public Info
     mutable VCounter cvec;
 
     void enable();
+
+    InfoType infoType() const { return Vector2dInfoType; }
 };
 
 class FormulaInfo : public VectorInfo
 {
   public:
     virtual std::string str() const = 0;
+
+    InfoType infoType() const { return FormulaInfoType; }
 };
 
 /** Data structure of sparse histogram */
@@ -250,6 +282,8 @@ class SparseHistInfo : public Info
   public:
     /** Local storage for the entry values, used for printing. */
     SparseHistData data;
+
+    InfoType infoType() const { return SparseHistInfoType; }
 };
 
 } // namespace Stats
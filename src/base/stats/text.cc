@@ -81,18 +81,21 @@ namespace Stats {
 std::list<Info *> &statsList();
 
 Text::Text()
-    : mystream(false), stream(NULL), descriptions(false)
+    : mystream(false), stream(NULL), dumps(0), delta(false),
+      output(NULL), descriptions(false), keyframe(0)
 {
 }
 
 Text::Text(std::ostream &stream)
-    : mystream(false), stream(NULL), descriptions(false)
+    : mystream(false), stream(NULL), dumps(0), delta(false),
+      output(NULL), descriptions(false), keyframe(0)
 {
     open(stream);
 }
 
 Text::Text(const std::string &file)
-    : mystream(false), stream(NULL), descriptions(false)
+    : mystream(false), stream(NULL), dumps(0), delta(false),
+      output(NULL), descriptions(false), keyframe(0)
 {
     open(file);
 }
@@ -139,16 +142,77 @@ Text::valid() const
 void
 Text::begin()
 {
+    if (keyframe > 0) {
+        delta = dumps++ % keyframe != 0;
+        if (delta) {
+            ccprintf(*stream, "\n---------- Begin Simulation Statistics "
+                     "Delta ----------\n");
+        } else {
+            ccprintf(*stream,
+                     "\n---------- Begin Simulation Statistics ----------\n");
+        }
+
+        // Collect the window to compare it with the last one
+        window.str("");
+        output = stream;
+        stream = &window;
+        return;
+    }
+
     ccprintf(*stream, "\n---------- Begin Simulation Statistics ----------\n");
 }
 
 void
 Text::end()
 {
+    if (output) {
+        stream = output;
+        output = NULL;
+        writeWindow();
+    }
+
     ccprintf(*stream, "\n---------- End Simulation Statistics   ----------\n");
     stream->flush();
 }
 
+void
+Text::writeWindow()
+{
+    // In a delta window, only the lines of the stats that are new or
+    // whose line changed are written, and the stats of the last dump
+    // that are no longer there are listed by name alone.
+    unordered_map<string, string> lines;
+    lines.reserve(lastLines.size());
+
+    string line;
+    window.seekg(0);
+    while (getline(window, line)) {
+        if (line.empty())
+            continue;
+
+        string name = line.substr(0, line.find_first_of(" \t"));
+        if (delta) {
+            auto last = lastLines.find(name);
+            if (last == lastLines.end() || last->second != line)
+                *stream << line << "\n";
+            if (last != lastLines.end())
+                lastLines.erase(last);
+        } else {
+            *stream << line << "\n";
+        }
+        lines[name].swap(line);
+    }
+
+    if (delta) {
+        for (const auto &last : lastLines)
+            *stream << last.first << "\n";
+    }
+
+    lastLines.swap(lines);
+    window.str("");
+    window.clear();
+}
+
 bool
 Text::noOutput(const Info &info)
 {
@@ -734,7 +798,7 @@ Text::visit(const SparseHistInfo &info)
 }
 
 Output *
-initText(const string &filename, bool desc)
+initText(const string &filename, bool desc, int keyframe)
 {
     static Text text;
     static bool connected = false;
@@ -742,6 +806,7 @@ initText(const string &filename, bool desc)
     if (!connected) {
         text.open(*simout.findOrCreate(filename)->stream());
         text.descriptions = desc;
+        text.keyframe = keyframe;
         connected = true;
     }
 
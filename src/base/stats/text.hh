@@ -32,7 +32,9 @@
 #define __BASE_STATS_TEXT_HH__
 
 #include <iosfwd>
+#include <sstream>
 #include <string>
+#include <unordered_map>
 
 #include "base/stats/output.hh"
 #include "base/stats/types.hh"
@@ -46,12 +48,29 @@ class Text : public Output
     bool mystream;
     std::ostream *stream;
 
+    /** Number of dumps so far, to place the full keyframe dumps */
+    uint64_t dumps;
+    /** True while collecting a window that only gets the changes */
+    bool delta;
+    /** The output stream while the window is collected in window */
+    std::ostream *output;
+    std::stringstream window;
+    /** The line of each stat in the last dump, by stat name */
+    std::unordered_map<std::string, std::string> lastLines;
+
   protected:
     bool noOutput(const Info &info);
+    void writeWindow();
 
   public:
     bool descriptions;
 
+    /**
+     * When non-zero, only the stats that changed since the last dump
+     * are written, and every keyframe'th dump is a full one.
+     */
+    int keyframe;
+
   public:
     Text();
     Text(std::ostream &stream);
@@ -78,7 +97,7 @@ class Text : public Output
 
 std::string ValueToString(Result value, int precision);
 
-Output *initText(const std::string &filename, bool desc);
+Output *initText(const std::string &filename, bool desc, int keyframe = 0);
 
 } // namespace Stats
 
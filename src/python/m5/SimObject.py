@@ -42,6 +42,7 @@
 #          Nathan Binkert
 #          Andreas Hansson
 
+import struct
 import sys
 from types import FunctionType, MethodType, ModuleType
 
@@ -440,14 +441,14 @@ class MetaSimObject(type):
         # initialize required attributes
 
         # class-only attributes
-        cls._params = multidict() # param descriptions
-        cls._ports = multidict()  # port descriptions
+        cls._params = flatmultidict() # param descriptions
+        cls._ports = flatmultidict()  # port descriptions
 
         # class or instance attributes
-        cls._values = multidict()   # param values
-        cls._hr_values = multidict() # human readable param values
-        cls._children = multidict() # SimObject children
-        cls._port_refs = multidict() # port ref objects
+        cls._values = flatmultidict()   # param values
+        cls._hr_values = flatmultidict() # human readable param values
+        cls._children = flatmultidict() # SimObject children
+        cls._port_refs = flatmultidict() # port ref objects
         cls._instantiated = False # really instantiated, cloned, or subclassed
 
         # We don't support multiple inheritance of sim objects.  If you want
@@ -871,6 +872,19 @@ struct PyObject;
 def isSimObjectOrVector(value):
     return False
 
+# Determine what needs to be cloned when creating a new instance from
+# ancestor (a SimObject class or instance): its children, its
+# SimObject-valued parameters and its port references.
+def _cloneSnapshot(ancestor):
+    children = ancestor._children.items()
+    simobj_values = []
+    for key,val in ancestor._values.iteritems():
+        val = tryAsSimObjectOrVector(val)
+        if val is not None:
+            simobj_values.append((key, val))
+    port_refs = ancestor._port_refs.items()
+    return children, simobj_values, port_refs
+
 # This class holds information about each simobject parameter
 # that should be displayed on the command line for use in the
 # configuration system.
@@ -999,6 +1013,7 @@ class SimObject(object):
     def __init__(self, **kwargs):
         ancestor = kwargs.get('_ancestor')
         memo_dict = kwargs.get('_memo')
+        snapshots = kwargs.get('_snapshots')
         if memo_dict is None:
             # prepare to memoize any recursively instantiated objects
             memo_dict = {}
@@ -1010,40 +1025,57 @@ class SimObject(object):
             ancestor = self.__class__
         ancestor._instantiated = True
 
-        # initialize required attributes
-        self._parent = None
-        self._name = None
-        self._ccObject = None  # pointer to C++ object
-        self._ccParams = None
-        self._instantiated = False # really "cloned"
-
-        # Clone children specified at class level.  No need for a
-        # multidict here since we will be cloning everything.
+        # When cloning many copies of the same template (see
+        # replicate()), the snapshot of what needs to be cloned is
+        # only taken once per object in the template.
+        snapshot = None
+        if snapshots is not None:
+            snapshot = snapshots.get(ancestor)
+        if snapshot is None:
+            snapshot = _cloneSnapshot(ancestor)
+            if snapshots is not None:
+                snapshots[ancestor] = snapshot
+        children, simobj_values, port_refs = snapshot
+
+        # initialize required attributes.  These are all private, so
+        # bypass __setattr__ and set them in one go.
+        self.__dict__.update(
+            _parent = None,
+            _name = None,
+            _ccObject = None, # pointer to C++ object
+            _ccParams = None,
+            _instantiated = False, # really "cloned"
+            _descendant_index = None, # see descendantIndex()
+            _path = None, # memoized path(), see _clearPath()
+            # Inherit parameter values from class using multidict so
+            # individual value settings can be overridden but we still
+            # inherit late changes to non-overridden class values.
+            # The flattened view of the ancestor's values is shared by
+            # all its clones until they are iterated over.
+            _values = flatmultidict(ancestor._values),
+            _hr_values = flatmultidict(ancestor._hr_values),
+            # Children and port references are all cloned below, so
+            # there is no need for multidicts here.
+            _children = {},
+            _port_refs = {})
+
+        # Clone children specified at class level.
         # Do children before parameter values so that children that
         # are also param values get cloned properly.
-        self._children = {}
-        for key,val in ancestor._children.iteritems():
-            self.add_child(key, val(_memo=memo_dict))
-
-        # Inherit parameter values from class using multidict so
-        # individual value settings can be overridden but we still
-        # inherit late changes to non-overridden class values.
-        self._values = multidict(ancestor._values)
-        self._hr_values = multidict(ancestor._hr_values)
+        for key,val in children:
+            self.add_child(key, val(_memo=memo_dict, _snapshots=snapshots))
+
         # clone SimObject-valued parameters
-        for key,val in ancestor._values.iteritems():
-            val = tryAsSimObjectOrVector(val)
-            if val is not None:
-                self._values[key] = val(_memo=memo_dict)
-
-        # clone port references.  no need to use a multidict here
-        # since we will be creating new references for all ports.
-        self._port_refs = {}
-        for key,val in ancestor._port_refs.iteritems():
+        for key,val in simobj_values:
+            self._values[key] = val(_memo=memo_dict, _snapshots=snapshots)
+
+        # clone port references
+        for key,val in port_refs:
             self._port_refs[key] = val.clone(self, memo_dict)
         # apply attribute assignments from keyword args, if any
         for key,val in kwargs.iteritems():
-            setattr(self, key, val)
+            if key not in ('_ancestor', '_memo', '_snapshots'):
+                setattr(self, key, val)
 
     # "Clone" the current instance by creating another instance of
     # this instance's class, but that inherits its parameter values
@@ -1067,6 +1099,17 @@ class SimObject(object):
             return memo_dict[self]
         return self.__class__(_ancestor = self, **kwargs)
 
+    # Create a list of count clones of this object (which, like for
+    # a plain clone, must be the root of its tree), e.g., one CPU and
+    # its caches per core.  This is equivalent to calling the object
+    # count times, but what needs to be cloned is only determined once
+    # per object in the tree, and the clones share the parameter
+    # values they inherit from the template.
+    def replicate(self, count, **kwargs):
+        snapshots = {}
+        return [ self(_snapshots=snapshots, **kwargs)
+                 for i in xrange(count) ]
+
     def _get_port_ref(self, attr):
         # Return reference that can be assigned to another port
         # via __setattr__.  There is only ever one reference
@@ -1167,11 +1210,13 @@ class SimObject(object):
     def clear_parent(self, old_parent):
         assert self._parent is old_parent
         self._parent = None
+        self._clearPath()
 
     # Also implemented by SimObjectVector
     def set_parent(self, parent, name):
         self._parent = parent
         self._name = name
+        self._clearPath()
 
     # Return parent object of this SimObject, not implemented by SimObjectVector
     # because the elements in a SimObjectVector may not share the same parent
@@ -1192,6 +1237,7 @@ class SimObject(object):
         child = self._children[name]
         child.clear_parent(self)
         del self._children[name]
+        self._hierarchyChanged()
 
     # Add a new child to this object.
     def add_child(self, name, child):
@@ -1207,6 +1253,7 @@ class SimObject(object):
             self.clear_child(name)
         child.set_parent(self, name)
         self._children[name] = child
+        self._hierarchyChanged()
 
     # Take SimObject-valued parameters that haven't been explicitly
     # assigned as children and make them children of the object that
@@ -1224,16 +1271,44 @@ class SimObject(object):
                 warn("%s adopting orphan SimObject param '%s'", self, key)
                 self.add_child(key, val)
 
+    # The path is memoized since it is needed for every object when
+    # dumping the configuration and creating the C++ objects.  It is
+    # computed from the parent's (memoized) path, so any object with a
+    # cached path also has a parent with a cached path.
     def path(self):
+        if self._path is not None:
+            return self._path
+
         if not self._parent:
-            return '<orphan %s>' % self.__class__
+            path = '<orphan %s>' % self.__class__
         elif isinstance(self._parent, MetaSimObject):
-            return str(self.__class__)
+            path = str(self.__class__)
+        else:
+            ppath = self._parent.path()
+            if ppath == 'root':
+                path = self._name
+            else:
+                path = ppath + "." + self._name
 
-        ppath = self._parent.path()
-        if ppath == 'root':
-            return self._name
-        return ppath + "." + self._name
+        self._path = path
+        return path
+
+    # Forget the memoized path of this object and its whole subtree.
+    # Called whenever the object is (re)parented or renamed.  Since a
+    # child can only have cached its path if we have cached ours, the
+    # walk stops at the first object without a cached path.
+    def _clearPath(self):
+        if self._path is None:
+            return
+        self._path = None
+        for child in self._children.itervalues():
+            if isinstance(child, list):
+                children = child
+            else:
+                children = [child]
+            for child in children:
+                if isSimObject(child):
+                    child._clearPath()
 
     def __str__(self):
         return self.path()
@@ -1244,34 +1319,71 @@ class SimObject(object):
     def ini_str(self):
         return self.path()
 
+    # Return the children of this object that are instances of
+    # ptype and the names of the parameters that can hold a ptype.
+    # Used by find_any(); the result is cached while the proxy
+    # resolution cache is enabled.
+    def _find_any_candidates(self, ptype):
+        cache = m5.proxy.resolutionCache()
+        if cache is not None:
+            key = (self, ptype)
+            if key in cache:
+                return cache[key]
+
+        children = [ child for child in self._children.itervalues()
+                     if isinstance(child, ptype) ]
+
+        # The matching parameter names only depend on the class
+        pkey = (self.__class__, ptype)
+        if cache is not None and pkey in cache:
+            pnames = cache[pkey]
+        else:
+            pnames = [ pname for pname,pdesc in self._params.iteritems()
+                       if issubclass(pdesc.ptype, ptype) ]
+            if cache is not None:
+                cache[pkey] = pnames
+
+        if cache is not None:
+            cache[key] = children, pnames
+        return children, pnames
+
     def find_any(self, ptype):
         if isinstance(self, ptype):
             return self, True
 
+        children, pnames = self._find_any_candidates(ptype)
+
         found_obj = None
-        for child in self._children.itervalues():
+        for child in children:
             visited = False
             if hasattr(child, '_visited'):
               visited = getattr(child, '_visited')
 
-            if isinstance(child, ptype) and not visited:
+            if not visited:
                 if found_obj != None and child != found_obj:
                     raise AttributeError, \
                           'parent.any matched more than one: %s %s' % \
                           (found_obj.path, child.path)
                 found_obj = child
         # search param space
-        for pname,pdesc in self._params.iteritems():
-            if issubclass(pdesc.ptype, ptype):
-                match_obj = self._values[pname]
-                if found_obj != None and found_obj != match_obj:
-                    raise AttributeError, \
-                          'parent.any matched more than one: %s and %s' % (found_obj.path, match_obj.path)
-                found_obj = match_obj
+        for pname in pnames:
+            match_obj = self._values[pname]
+            if found_obj != None and found_obj != match_obj:
+                raise AttributeError, \
+                      'parent.any matched more than one: %s and %s' % (found_obj.path, match_obj.path)
+            found_obj = match_obj
         return found_obj, found_obj != None
 
     def find_all(self, ptype):
         all = {}
+        self._find_all(ptype, all)
+        # Also make sure to sort the keys based on the objects' path to
+        # ensure that the order is the same on all hosts
+        return sorted(all.keys(), key = lambda o: o.path()), True
+
+    # Add all objects of type ptype in the subtree rooted at this
+    # object to the dict all.
+    def _find_all(self, ptype, all):
         # search children
         for child in self._children.itervalues():
             # a child could be a list, so ensure we visit each item
@@ -1286,17 +1398,13 @@ class SimObject(object):
                     all[child] = True
                 if isSimObject(child):
                     # also add results from the child itself
-                    child_all, done = child.find_all(ptype)
-                    all.update(dict(zip(child_all, [done] * len(child_all))))
+                    child._find_all(ptype, all)
         # search param space
         for pname,pdesc in self._params.iteritems():
             if issubclass(pdesc.ptype, ptype):
                 match_obj = self._values[pname]
                 if not isproxy(match_obj) and not isNullPointer(match_obj):
                     all[match_obj] = True
-        # Also make sure to sort the keys based on the objects' path to
-        # ensure that the order is the same on all hosts
-        return sorted(all.keys(), key = lambda o: o.path()), True
 
     def unproxy(self, base):
         return self
@@ -1323,66 +1431,105 @@ class SimObject(object):
                 port.unproxy(self)
 
     def print_ini(self, ini_file):
-        print >>ini_file, '[' + self.path() + ']'       # .ini section header
+        # Build the whole section and write it in one go
+        lines = [ '[' + self.path() + ']' ]     # .ini section header
 
         instanceDict[self.path()] = self
 
         if hasattr(self, 'type'):
-            print >>ini_file, 'type=%s' % self.type
+            lines.append('type=%s' % self.type)
 
         if len(self._children.keys()):
-            print >>ini_file, 'children=%s' % \
-                  ' '.join(self._children[n].get_name() \
-                  for n in sorted(self._children.keys()))
+            lines.append('children=%s' %
+                         ' '.join(self._children[n].get_name()
+                                  for n in sorted(self._children.keys())))
 
         for param in sorted(self._params.keys()):
             value = self._values.get(param)
             if value != None:
-                print >>ini_file, '%s=%s' % (param,
-                                             self._values[param].ini_str())
+                lines.append('%s=%s' % (param, value.ini_str()))
 
         for port_name in sorted(self._ports.keys()):
             port = self._port_refs.get(port_name, None)
             if port != None:
-                print >>ini_file, '%s=%s' % (port_name, port.ini_str())
-
-        print >>ini_file        # blank line between objects
-
-    # generate a tree of dictionaries expressing all the parameters in the
-    # instantiated system for use by scripts that want to do power, thermal
-    # visualization, and other similar tasks
-    def get_config_as_dict(self):
-        d = attrdict()
+                lines.append('%s=%s' % (port_name, port.ini_str()))
+
+        lines.append('')        # blank line between objects
+        ini_file.write('\n'.join(lines) + '\n')
+
+    # Return the entries of the configuration dictionary of this
+    # object (see get_config_as_dict()) as a list of (key, value)
+    # pairs.  Children are returned as SimObjects or SimObjectVectors
+    # rather than being converted, so that the caller can decide how
+    # to recurse into them.
+    def get_config_items(self):
+        items = []
         if hasattr(self, 'type'):
-            d.type = self.type
+            items.append(('type', self.type))
         if hasattr(self, 'cxx_class'):
-            d.cxx_class = self.cxx_class
+            items.append(('cxx_class', self.cxx_class))
         # Add the name and path of this object to be able to link to
         # the stats
-        d.name = self.get_name()
-        d.path = self.path()
+        items.append(('name', self.get_name()))
+        items.append(('path', self.path()))
 
         for param in sorted(self._params.keys()):
+            # SimObject-valued params are children of this object as
+            # well, so leave them to the loop below to avoid writing
+            # the same key twice
+            if param in self._children:
+                continue
             value = self._values.get(param)
             if value != None:
-                d[param] = value.config_value()
+                items.append((param, value.config_value()))
 
         for n in sorted(self._children.keys()):
-            child = self._children[n]
             # Use the name of the attribute (and not get_name()) as
             # the key in the JSON dictionary to capture the hierarchy
             # in the Python code that assembled this system
-            d[n] = child.get_config_as_dict()
+            items.append((n, self._children[n]))
 
         for port_name in sorted(self._ports.keys()):
             port = self._port_refs.get(port_name, None)
             if port != None:
                 # Represent each port with a dictionary containing the
                 # prominent attributes
-                d[port_name] = port.get_config_as_dict()
+                items.append((port_name, port.get_config_as_dict()))
+
+        return items
 
+    # generate a tree of dictionaries expressing all the parameters in the
+    # instantiated system for use by scripts that want to do power, thermal
+    # visualization, and other similar tasks
+    def get_config_as_dict(self):
+        d = attrdict()
+        for key, value in self.get_config_items():
+            if isSimObjectOrVector(value):
+                value = value.get_config_as_dict()
+            d[key] = value
         return d
 
+    # Return the table used by getCCParams() to fill in the C++
+    # params struct for this class: the parameters as (name, is
+    # vector, pack format) tuples and the ports, both sorted by name.
+    # The table is computed once per class.
+    @classmethod
+    def _getCCParamTable(cls):
+        table = cls.__dict__.get('_cc_param_table')
+        if table is None:
+            params = []
+            for name in sorted(cls._params.keys()):
+                pdesc = cls._params[name]
+                if isinstance(pdesc, VectorParamDesc):
+                    params.append((name, True, pdesc.pack_format()))
+                else:
+                    params.append((name, False, None))
+            ports = [ (name, 'port_' + name + '_connection_count')
+                      for name in sorted(cls._ports.keys()) ]
+            table = params, ports
+            cls._cc_param_table = table
+        return table
+
     def getCCParams(self):
         if self._ccParams:
             return self._ccParams
@@ -1392,34 +1539,35 @@ class SimObject(object):
         cc_params.pyobj = self
         cc_params.name = str(self)
 
-        param_names = self._params.keys()
-        param_names.sort()
-        for param in param_names:
+        params, ports = self._getCCParamTable()
+        for param, is_vector, pack_format in params:
             value = self._values.get(param)
             if value is None:
                 fatal("%s.%s without default or user set value",
                       self.path(), param)
 
             value = value.getValue()
-            if isinstance(self._params[param], VectorParamDesc):
+            if is_vector:
                 assert isinstance(value, list)
                 vec = getattr(cc_params, param)
                 assert not len(vec)
-                for v in value:
-                    vec.append(v)
+                if pack_format and value:
+                    # Pass all the elements in one go
+                    vec.assignPacked(struct.pack('=%d%s' %
+                        (len(value), pack_format), *value))
+                else:
+                    for v in value:
+                        vec.append(v)
             else:
                 setattr(cc_params, param, value)
 
-        port_names = self._ports.keys()
-        port_names.sort()
-        for port_name in port_names:
+        for port_name, count_name in ports:
             port = self._port_refs.get(port_name, None)
             if port != None:
                 port_count = len(port)
             else:
                 port_count = 0
-            setattr(cc_params, 'port_' + port_name + '_connection_count',
-                    port_count)
+            setattr(cc_params, count_name, port_count)
         self._ccParams = cc_params
         return self._ccParams
 
@@ -1451,6 +1599,28 @@ class SimObject(object):
             for obj in child.descendants():
                 yield obj
 
+    # Return a tuple of this object and all its descendants, in the
+    # same (sorted) order as descendants().  The tuple is built on
+    # first use and reused by every later pass over the hierarchy
+    # (instantiate(), startup, stats reset, etc.), so the children
+    # are only walked and sorted once.  Any change to the set of
+    # children of this object or one of its descendants discards the
+    # index of the object and all its ancestors.
+    def descendantIndex(self):
+        if self._descendant_index is None:
+            self._descendant_index = tuple(self.descendants())
+        return self._descendant_index
+
+    # Called whenever children are added to or removed from this
+    # object.  Drops the descendant indices of the object and its
+    # ancestors as well as any cached proxy lookups.
+    def _hierarchyChanged(self):
+        m5.proxy.flushResolutionCache()
+        obj = self
+        while isSimObject(obj):
+            obj._descendant_index = None
+            obj = obj._parent
+
     # Call C++ to create C++ object corresponding to this object
     def createCCObject(self):
         self.getCCParams()
@@ -82,18 +82,37 @@ def parse_options():
     group("Statistics Options")
     option("--stats-file", metavar="FILE", default="stats.txt",
         help="Sets the output file for statistics [Default: %default]")
+    option("--stats-delta", metavar="N", type="int", default=0,
+        help="Only write the statistics that changed since the last dump, " \
+             "with a full dump every N dumps [Default: %default]")
+    option("--stats-columnar", metavar="FILE", default=None,
+        help="Also write the statistics to FILE in a binary format with " \
+             "one row of values per dump [Default: %default]")
 
     # Configuration Options
     group("Configuration Options")
     option("--dump-config", metavar="FILE", default="config.ini",
-        help="Dump configuration output file [Default: %default]")
+        help="Dump configuration output file, gzip compressed if FILE " \
+             "ends in .gz [Default: %default]")
     option("--json-config", metavar="FILE", default="config.json",
-        help="Create JSON output of the configuration [Default: %default]")
+        help="Create JSON output of the configuration, gzip compressed " \
+             "if FILE ends in .gz [Default: %default]")
+    option("--json-config-compact", action="store_true", default=False,
+        help="Write the JSON configuration without indentation")
+    option("--skip-config-dumps", action="store_true", default=False,
+        help="Do not write any of the configuration outputs " \
+             "(ini, JSON, DOT and DVFS DOT)")
     option("--dot-config", metavar="FILE", default="config.dot",
-        help="Create DOT & pdf outputs of the configuration [Default: %default]")
+        help="Create DOT output of the configuration [Default: %default]")
     option("--dot-dvfs-config", metavar="FILE", default=None,
-        help="Create DOT & pdf outputs of the DVFS configuration" + \
+        help="Create DOT output of the DVFS configuration" + \
              " [Default: %default]")
+    option("--dot-render", action="store_true", default=False,
+        help="Also render the DOT outputs to pdf & svg using graphviz in " \
+             "the background")
+    option("--dot-render-limit", metavar="N", type='int', default=1000,
+        help="Skip rendering the DOT outputs for configurations with " \
+             "more than N objects, 0 for no limit [Default: %default]")
 
     # Debugging options
     group("Debugging Options")
@@ -114,6 +133,10 @@ def parse_options():
         help="Ignore EXPR sim objects")
     option("--remote-gdb-port", type='int', default=7000,
         help="Remote gdb base port (set to 0 to disable listening)")
+    option("--instantiate-profile", metavar="FILE", default=None,
+        help="Time the instantiation and startup passes per phase and " \
+             "SimObject type and write a JSON report to FILE in the " \
+             "output directory [Default: %default]")
 
     # Help options
     group("Help Options")
@@ -319,7 +342,9 @@ def main(*args):
     sys.path[0:0] = options.path
 
     # set stats options
-    stats.initText(options.stats_file)
+    stats.initText(options.stats_file, keyframe=options.stats_delta)
+    if options.stats_columnar:
+        stats.initColumnar(options.stats_columnar)
 
     # set debugging options
     debug.setRemoteGDBPort(options.remote_gdb_port)
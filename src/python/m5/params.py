@@ -95,6 +95,12 @@ class ParamValue(object):
     __metaclass__ = MetaParamValue
     cmd_line_settable = False
 
+    # struct format character of the C++ type if its representation
+    # is that of a plain number, which allows vectors of this type to
+    # be passed to C++ in a single packed string (see
+    # VectorParamDesc.swig_decl).  None if that is not the case.
+    pack_format = None
+
     # Generate the code needed as a prerequisite for declaring a C++
     # object of this type.  Typically generates one or more #include
     # statements.  Used when declaring parameters of this type.
@@ -302,8 +308,11 @@ class SimObjectVector(VectorParamValue):
         if value.has_parent():
             warn("SimObject %s already has a parent" % value.get_name() +\
                  " that is being overwritten by a SimObjectVector")
-        value.set_parent(val.get_parent(), val._name)
+        parent = val.get_parent()
+        value.set_parent(parent, val._name)
         super(SimObjectVector, self).__setitem__(key, value)
+        if isSimObject(parent):
+            parent._hierarchyChanged()
 
     # Enumerate the params of each member of the SimObject vector. Creates
     # strings that will allow indexing into the vector by the python code and
@@ -402,8 +411,31 @@ class VectorParamDesc(ParamDesc):
         ptype = self.ptype_str
         cxx_type = self.ptype.cxx_type
 
+        # Vectors of plain numbers can be assigned from a string of
+        # packed values in a single call (see pack())
+        if self.pack_format():
+            code('%{')
+            code('#include <cstring>')
+            code('%}')
+            code()
+            code('%extend std::vector< $cxx_type > {')
+            code('    void assignPacked(char *STRING, size_t LENGTH)')
+            code('    {')
+            code('        $$self->resize(LENGTH / sizeof($cxx_type));')
+            code('        if (!$$self->empty())')
+            code('            std::memcpy(&$$self->front(), STRING,')
+            code('                        $$self->size() * sizeof($cxx_type));')
+            code('    }')
+            code('}')
+            code()
+
         code('%template(vector_$ptype) std::vector< $cxx_type >;')
 
+    # Return the struct format character for the elements if the
+    # vector can be passed to C++ as packed values, None otherwise.
+    def pack_format(self):
+        return getattr(self.ptype, 'pack_format', None)
+
     def cxx_predecls(self, code):
         code('#include <vector>')
         self.ptype.cxx_predecls(code)
@@ -553,6 +585,12 @@ class CheckedIntType(MetaParamValue):
                 cls.min = -(2 ** (cls.size - 1))
                 cls.max = (2 ** (cls.size - 1)) - 1
 
+        if 'pack_format' not in dict and hasattr(cls, 'size'):
+            pack_format = { 8 : 'b', 16 : 'h', 32 : 'i', 64 : 'q' }
+            cls.pack_format = pack_format[cls.size]
+            if cls.unsigned:
+                cls.pack_format = cls.pack_format.upper()
+
 # Abstract superclass for bounds-checked integer parameters.  This
 # class is subclassed to generate parameter classes with specific
 # bounds.  Initialization of the min and max bounds is done in the
@@ -617,6 +655,7 @@ class Cycles(CheckedInt):
     cxx_type = 'Cycles'
     size = 64
     unsigned = True
+    pack_format = None
 
     def getValue(self):
         from m5.internal.core import Cycles
@@ -639,6 +678,7 @@ class Cycles(CheckedInt):
 class Float(ParamValue, float):
     cxx_type = 'double'
     cmd_line_settable = True
+    pack_format = 'd'
 
     def __init__(self, value):
         if isinstance(value, (int, long, float, NumericParamValue, Float, str)):
@@ -33,7 +33,29 @@
 #
 #####################################################################
 
-import copy
+# Cache for the structural lookups done while resolving proxies.  It
+# is only enabled while the configuration hierarchy is frozen (i.e.,
+# during the unproxy pass of m5.instantiate()), since the cached
+# results are only valid as long as no children or parameters are
+# added.  Entries are keyed by (object, attribute name) for
+# attribute proxies and by (object, parameter type) for the
+# type-indexed child and parameter lists used by Parent.any.
+_resolution_cache = None
+
+def enableResolutionCache():
+    global _resolution_cache
+    _resolution_cache = {}
+
+def disableResolutionCache():
+    global _resolution_cache
+    _resolution_cache = None
+
+def flushResolutionCache():
+    if _resolution_cache:
+        _resolution_cache.clear()
+
+def resolutionCache():
+    return _resolution_cache
 
 class BaseProxy(object):
     def __init__(self, search_self, search_up):
@@ -127,10 +149,22 @@ class BaseProxy(object):
         self._pdesc = pdesc
 
 class AttrProxy(BaseProxy):
-    def __init__(self, search_self, search_up, attr):
+    def __init__(self, search_self, search_up, attr, modifiers=()):
         super(AttrProxy, self).__init__(search_self, search_up)
         self._attr = attr
-        self._modifiers = []
+        # The modifiers are kept in a tuple so that chained proxies
+        # (e.g., Parent.cpu[0].icache) can share them instead of
+        # copying the whole proxy for every step.
+        self._modifiers = modifiers
+
+    # Return a new proxy with an additional modifier rather than
+    # modifying self in place since self could be an indirect
+    # reference via a variable or parameter
+    def _add_modifier(self, modifier):
+        new_self = AttrProxy(self._search_self, self._search_up, self._attr,
+                             self._modifiers + (modifier, ))
+        new_self._multiplier = self._multiplier
+        return new_self
 
     def __getattr__(self, attr):
         # python uses __bases__ internally for inheritance
@@ -138,12 +172,7 @@ class AttrProxy(BaseProxy):
             return super(AttrProxy, self).__getattr__(self, attr)
         if hasattr(self, '_pdesc'):
             raise AttributeError, "Attribute reference on bound proxy"
-        # Return a copy of self rather than modifying self in place
-        # since self could be an indirect reference via a variable or
-        # parameter
-        new_self = copy.deepcopy(self)
-        new_self._modifiers.append(attr)
-        return new_self
+        return self._add_modifier(attr)
 
     # support indexing on proxies (e.g., Self.cpu[0])
     def __getitem__(self, key):
@@ -151,26 +180,37 @@ class AttrProxy(BaseProxy):
             raise TypeError, "Proxy object requires integer index"
         if hasattr(self, '_pdesc'):
             raise AttributeError, "Index operation on bound proxy"
-        new_self = copy.deepcopy(self)
-        new_self._modifiers.append(key)
-        return new_self
+        return self._add_modifier(key)
 
     def find(self, obj):
+        # Most of the ancestors visited while climbing the tree do not
+        # have the attribute at all, and finding that out through
+        # __getattr__ is expensive, so remember the misses.
+        cache = _resolution_cache
+        if cache is not None:
+            key = (obj, self._attr)
+            if key in cache:
+                return None, False
         try:
             val = getattr(obj, self._attr)
-            visited = False
-            if hasattr(val, '_visited'):
-                visited = getattr(val, '_visited')
-
-            if not visited:
-                # for any additional unproxying to be done, pass the
-                # current, rather than the original object so that proxy
-                # has the right context
-                obj = val
-            else:
-                return None, False
+        except AttributeError:
+            if cache is not None:
+                cache[key] = False
+            return None, False
         except:
             return None, False
+
+        visited = False
+        if hasattr(val, '_visited'):
+            visited = getattr(val, '_visited')
+
+        if not visited:
+            # for any additional unproxying to be done, pass the
+            # current, rather than the original object so that proxy
+            # has the right context
+            obj = val
+        else:
+            return None, False
         while isproxy(val):
             val = val.unproxy(obj)
         for m in self._modifiers:
@@ -51,7 +51,10 @@ import stats
 import SimObject
 import ticks
 import objects
+import proxy
+from m5.util.config_writer import write_ini, write_json
 from m5.util.dot_writer import do_dot, do_dvfs_dot
+from m5.util.phase_profiler import profiler
 from m5.internal.stats import updateEvents as updateStatEvents
 
 from util import fatal
@@ -78,88 +81,129 @@ def instantiate(ckpt_dir=None):
     if not root:
         fatal("Need to instantiate Root() before calling instantiate()")
 
+    if options.instantiate_profile:
+        profiler.enable()
+
     # we need to fix the global frequency
     ticks.fixGlobalFrequency()
 
     # Make sure SimObject-valued params are in the configuration
     # hierarchy so we catch them with future descendants() walks
-    for obj in root.descendants(): obj.adoptOrphanParams()
-
-    # Unproxy in sorted order for determinism
-    for obj in root.descendants(): obj.unproxyParams()
-
-    if options.dump_config:
-        ini_file = file(os.path.join(options.outdir, options.dump_config), 'w')
-        # Print ini sections in sorted order for easier diffing
-        for obj in sorted(root.descendants(), key=lambda o: o.path()):
-            obj.print_ini(ini_file)
-        ini_file.close()
-
-    if options.json_config:
-        try:
-            import json
-            json_file = file(os.path.join(options.outdir, options.json_config), 'w')
-            d = root.get_config_as_dict()
-            json.dump(d, json_file, indent=4)
-            json_file.close()
-        except ImportError:
-            pass
-
-    do_dot(root, options.outdir, options.dot_config)
+    profiler.each('adoptOrphanParams', root.descendants(),
+                  'adoptOrphanParams')
+
+    # The hierarchy is final from here on, so the remaining passes
+    # all share the cached descendant index built on first use.
+    # Unproxy in sorted order for determinism.  The hierarchy is
+    # frozen during this pass, so proxy lookups can be cached.
+    proxy.enableResolutionCache()
+    try:
+        profiler.each('unproxyParams', root.descendantIndex(),
+                      'unproxyParams')
+    finally:
+        proxy.disableResolutionCache()
+
+    # Make all objects known by path to C++ (e.g., for checkpoint
+    # restore), even if the ini file isn't written
+    for obj in root.descendantIndex():
+        SimObject.instanceDict[obj.path()] = obj
+
+    if not options.skip_config_dumps:
+        if options.dump_config:
+            profiler.run('write_ini', write_ini, root,
+                         os.path.join(options.outdir, options.dump_config))
+
+        if options.json_config:
+            profiler.run('write_json', write_json, root,
+                         os.path.join(options.outdir, options.json_config),
+                         options.json_config_compact)
+
+        profiler.run('do_dot', do_dot, root, options.outdir,
+                     options.dot_config, options.dot_render,
+                     options.dot_render_limit)
 
     # Initialize the global statistics
-    stats.initSimStats()
+    profiler.run('initSimStats', stats.initSimStats)
 
     # Create the C++ sim objects and connect ports
-    for obj in root.descendants(): obj.createCCObject()
-    for obj in root.descendants(): obj.connectPorts()
+    objs = root.descendantIndex()
+    profiler.each('createCCObject', objs, 'createCCObject')
+    profiler.each('connectPorts', objs, 'connectPorts')
 
     # Do a second pass to finish initializing the sim objects
-    for obj in root.descendants(): obj.init()
+    profiler.each('init', objs, 'init')
 
     # Do a third pass to initialize statistics
-    for obj in root.descendants(): obj.regStats()
+    profiler.each('regStats', objs, 'regStats')
 
     # Do a fourth pass to initialize probe points
-    for obj in root.descendants(): obj.regProbePoints()
+    profiler.each('regProbePoints', objs, 'regProbePoints')
 
     # Do a fifth pass to connect probe listeners
-    for obj in root.descendants(): obj.regProbeListeners()
+    profiler.each('regProbeListeners', objs, 'regProbeListeners')
 
     # We want to generate the DVFS diagram for the system. This can only be
     # done once all of the CPP objects have been created and initialised so
     # that we are able to figure out which object belongs to which domain.
-    if options.dot_dvfs_config:
-        do_dvfs_dot(root, options.outdir, options.dot_dvfs_config)
+    if options.dot_dvfs_config and not options.skip_config_dumps:
+        profiler.run('do_dvfs_dot', do_dvfs_dot, root, options.outdir,
+                     options.dot_dvfs_config, options.dot_render,
+                     options.dot_render_limit)
 
     # We're done registering statistics.  Enable the stats package now.
-    stats.enable()
+    profiler.run('stats.enable', stats.enable)
 
     # Restore checkpoint (if any)
     if ckpt_dir:
         _drain_manager.preCheckpointRestore()
-        ckpt = internal.core.getCheckpoint(ckpt_dir)
-        internal.core.unserializeGlobals(ckpt);
-        for obj in root.descendants(): obj.loadState(ckpt)
+        ckpt = profiler.run('getCheckpoint',
+                            internal.core.getCheckpoint, ckpt_dir)
+        profiler.run('unserializeGlobals',
+                     internal.core.unserializeGlobals, ckpt)
+        profiler.each('loadState', objs, 'loadState', ckpt)
     else:
-        for obj in root.descendants(): obj.initState()
+        profiler.each('initState', objs, 'initState')
 
     # Check to see if any of the stat events are in the past after resuming from
     # a checkpoint, If so, this call will shift them to be at a valid time.
     updateStatEvents()
 
+    if profiler.enabled:
+        writeInstantiateProfile()
+
+# Write the instantiation profile collected so far to the output
+# directory.  It is written after instantiate() and rewritten once
+# the startup pass of the first simulate() has been timed too.
+def writeInstantiateProfile():
+    from m5 import options
+
+    extra = { 'argv' : sys.argv }
+    try:
+        import defines
+        extra['compile_date'] = defines.compileDate
+    except ImportError:
+        pass
+
+    profiler.write(os.path.join(options.outdir, options.instantiate_profile),
+                   **extra)
+
 need_startup = True
 def simulate(*args, **kwargs):
     global need_startup
 
     if need_startup:
         root = objects.Root.getInstance()
-        for obj in root.descendants(): obj.startup()
+        profiler.each('startup', root.descendantIndex(), 'startup')
         need_startup = False
 
+        if profiler.enabled:
+            writeInstantiateProfile()
+            profiler.disable()
+
         # Python exit handlers happen in reverse order.
-        # We want to dump stats last.
-        atexit.register(stats.dump)
+        # We want to dump stats last, all of them regardless of the
+        # selection used for the other dumps.
+        atexit.register(stats.dump, full=True)
 
         # register our C++ exit callback function with Python
         atexit.register(internal.core.doExitCleanup)
@@ -212,11 +256,11 @@ def drain():
     assert _drain_manager.isDrained(), "Drain state inconsistent"
 
 def memWriteback(root):
-    for obj in root.descendants():
+    for obj in root.descendantIndex():
         obj.memWriteback()
 
 def memInvalidate(root):
-    for obj in root.descendants():
+    for obj in root.descendantIndex():
         obj.memInvalidate()
 
 def checkpoint(dir):
@@ -315,7 +359,7 @@ def switchCpus(system, cpuList, verbose=True):
         new_cpu.takeOverFrom(old_cpu)
 
 def notifyFork(root):
-    for obj in root.descendants():
+    for obj in root.descendantIndex():
         obj.notifyFork()
 
 fork_count = 0
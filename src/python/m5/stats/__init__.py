@@ -27,6 +27,9 @@
 #
 # Authors: Nathan Binkert
 
+import fnmatch
+import re
+
 import m5
 
 from m5 import internal
@@ -35,8 +38,12 @@ from m5.objects import Root
 from m5.util import attrdict, fatal
 
 outputList = []
-def initText(filename, desc=True):
-    output = internal.stats.initText(filename, desc)
+def initText(filename, desc=True, keyframe=0):
+    output = internal.stats.initText(filename, desc, keyframe)
+    outputList.append(output)
+
+def initColumnar(filename):
+    output = internal.stats.initColumnar(filename)
     outputList.append(output)
 
 def initSimStats():
@@ -51,20 +58,20 @@ def enable():
     '''Enable the statistics package.  Before the statistics package is
     enabled, all statistics must be created and initialized and once
     the package is enabled, no more statistics can be created.'''
-    __dynamic_cast = []
-    for k, v in internal.stats.__dict__.iteritems():
-        if k.startswith('dynamic_'):
-            __dynamic_cast.append(v)
+    # Map each stat's type tag to the downcast giving its wrapper
+    casts = {}
+    for kind in ('Scalar', 'Vector', 'Dist', 'VectorDist', 'Vector2d',
+                 'Formula', 'SparseHist'):
+        tag = getattr(internal.stats, '%sInfoType' % kind)
+        casts[tag] = getattr(internal.stats, 'dynamic_%sInfo' % kind)
 
     for stat in internal.stats.statsList():
-        for cast in __dynamic_cast:
-            val = cast(stat)
-            if val is not None:
-                stats_list.append(val)
-                raw_stats_list.append(val)
-                break
-        else:
+        cast = casts.get(stat.infoType())
+        if cast is None:
             fatal("unknown stat type %s", stat)
+        val = cast(stat)
+        stats_list.append(val)
+        raw_stats_list.append(val)
 
     for stat in stats_list:
         if not stat.check() or not stat.baseCheck():
@@ -74,45 +81,101 @@ def enable():
         if not (stat.flags & flags.display):
             stat.name = "__Stat%06d" % stat.id
 
-    def less(stat1, stat2):
-        v1 = stat1.name.split('.')
-        v2 = stat2.name.split('.')
-        return v1 < v2
-
-    stats_list.sort(less)
+    # The stats are dumped in the order they were registered in
     for stat in stats_list:
         stats_dict[stat.name] = stat
         stat.enable()
 
     internal.stats.enable();
 
-def prepare():
-    '''Prepare all stats for data access.  This must be done before
-    dumping and serialization.'''
+def prepare(stats=None):
+    '''Prepare all stats, or only those in stats, for data access.
+    This must be done before dumping and serialization.'''
 
-    for stat in stats_list:
+    if stats is None:
+        stats = stats_list
+
+    for stat in stats:
         stat.prepare()
 
+def compileSelection(patterns=(), globs=(), objects=()):
+    '''Return the enabled stats, in dump order, whose name matches any
+    of the regular expressions in patterns or the shell-style
+    wildcards in globs, or that belong to any of the SimObjects in
+    objects (either SimObjects or their paths) or their children.'''
+
+    if isinstance(patterns, str):
+        patterns = [ patterns ]
+    if isinstance(globs, str):
+        globs = [ globs ]
+    if isinstance(objects, str) or not hasattr(objects, '__iter__'):
+        objects = [ objects ]
+
+    exprs = [ '(?:%s)$' % pattern for pattern in patterns ]
+    exprs += [ fnmatch.translate(glob) for glob in globs ]
+    for obj in objects:
+        if not isinstance(obj, str):
+            obj = obj.path()
+        exprs.append(r'%s(?:\..*)?$' % re.escape(obj))
+
+    if not exprs:
+        return []
+
+    match = re.compile('|'.join(exprs)).match
+    return [ stat for stat in stats_list if match(stat.name) ]
+
+# The stats written by dump() unless a full dump is asked for, None
+# for all of them
+dumpSelection = None
+
+def select(patterns=(), globs=(), objects=()):
+    '''Restrict the dumps, including the periodic ones, to the stats
+    picked by compileSelection().  The selection is computed once, so
+    this has to be called after the stats package is enabled.'''
+
+    if not stats_list:
+        fatal("stats can only be selected once the stats are enabled")
+
+    global dumpSelection
+    dumpSelection = compileSelection(patterns, globs, objects)
+
+def selectAll():
+    '''Go back to dumping all the stats'''
+
+    global dumpSelection
+    dumpSelection = None
+
 lastDump = 0
-def dump():
-    '''Dump all statistics data to the registered outputs'''
+lastDumpFull = True
+def dump(full=False):
+    '''Dump the statistics data to the registered outputs.  Only the
+    selected stats are dumped unless full is set.'''
 
     curTick = m5.curTick()
 
-    global lastDump
+    if full or dumpSelection is None:
+        stats = stats_list
+        full = True
+    else:
+        stats = dumpSelection
+
+    # A full dump still goes ahead if only a selection has been
+    # dumped at this tick.
+    global lastDump, lastDumpFull
     assert lastDump <= curTick
-    if lastDump == curTick:
+    if lastDump == curTick and (lastDumpFull or not full):
         return
     lastDump = curTick
+    lastDumpFull = full
 
     internal.stats.processDumpQueue()
 
-    prepare()
+    prepare(stats)
 
     for output in outputList:
         if output.valid():
             output.begin()
-            for stat in stats_list:
+            for stat in stats:
                 output.visit(stat)
             output.end()
 
@@ -122,7 +185,7 @@ def reset():
     # call reset stats on all SimObjects
     root = Root.getInstance()
     if root:
-        for obj in root.descendants(): obj.resetStats()
+        for obj in root.descendantIndex(): obj.resetStats()
 
     # call any other registered stats reset callbacks
     for stat in stats_list:
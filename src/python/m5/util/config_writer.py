@@ -0,0 +1,120 @@
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#####################################################################
+#
+# Configuration dumps (config.ini and config.json)
+#
+# Both writers stream the configuration one SimObject at a time
+# rather than building the whole configuration in memory first.
+# Output files whose name ends in .gz are gzip compressed.
+#
+#####################################################################
+
+import gzip
+import json
+
+from m5.SimObject import isSimObject, isSimObjectVector
+
+def open_output(filename):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wb')
+    return open(filename, 'w')
+
+def write_ini(root, filename):
+    ini_file = open_output(filename)
+    # Print ini sections in sorted order for easier diffing
+    for obj in sorted(root.descendantIndex(), key=lambda o: o.path()):
+        obj.print_ini(ini_file)
+    ini_file.close()
+
+# Write the configuration of the subtree rooted at root as JSON.  The
+# output is the same as json.dump(root.get_config_as_dict(),
+# indent=4) up to whitespace, or the most compact JSON representation
+# if compact is set.
+def write_json(root, filename, compact=False):
+    if compact:
+        writer = _JsonWriter(None, (',', ':'))
+    else:
+        writer = _JsonWriter(4, (',', ': '))
+
+    json_file = open_output(filename)
+    writer.write_object(json_file, root, 0)
+    json_file.write('\n')
+    json_file.close()
+
+class _JsonWriter(object):
+    def __init__(self, indent, separators):
+        self.indent = indent
+        self.item_separator, self.key_separator = separators
+        self.encode = json.JSONEncoder(indent=indent,
+                                       separators=separators).encode
+
+    def newline(self, level):
+        if self.indent is None:
+            return ''
+        return '\n' + ' ' * (self.indent * level)
+
+    # Write a SimObject.  All the entries of the object itself are
+    # written at once, children are recursed into as they come up.
+    def write_object(self, out, obj, level):
+        encode = self.encode
+        inner = self.newline(level + 1)
+        chunks = [ '{' ]
+        sep = inner
+        for key, value in obj.get_config_items():
+            chunks.append(sep)
+            chunks.append(encode(key))
+            chunks.append(self.key_separator)
+            sep = self.item_separator + inner
+
+            if isSimObject(value):
+                out.write(''.join(chunks))
+                chunks = []
+                self.write_object(out, value, level + 1)
+            elif isSimObjectVector(value):
+                out.write(''.join(chunks))
+                chunks = []
+                self.write_vector(out, value, level + 1)
+            else:
+                # values may span several lines (lists and dicts),
+                # indent them to the current level
+                text = encode(value)
+                if self.indent is not None:
+                    text = text.replace('\n', inner)
+                chunks.append(text)
+        chunks.append(self.newline(level))
+        chunks.append('}')
+        out.write(''.join(chunks))
+
+    def write_vector(self, out, vector, level):
+        if not len(vector):
+            out.write('[]')
+            return
+        inner = self.newline(level + 1)
+        sep = '[' + inner
+        for obj in vector:
+            out.write(sep)
+            sep = self.item_separator + inner
+            self.write_object(out, obj, level + 1)
+        out.write(self.newline(level) + ']')
@@ -55,12 +55,18 @@
 #
 # pydot is required. When missing, no output will be generated.
 #
+# Rendering the figures with graphviz can take a very long time for
+# large systems, so only the dot source is written while the
+# configuration is instantiated. Rendering to pdf and svg is opt-in,
+# done by graphviz in the background, and skipped altogether for
+# systems with more objects than a given limit.
+#
 #####################################################################
 
-import m5, os, re
+import m5, os, re, subprocess, threading
 from m5.SimObject import isRoot, isSimObjectVector
 from m5.params import PortRef
-from m5.util import warn
+from m5.util import inform, warn
 try:
     import pydot
 except:
@@ -347,7 +353,46 @@ def dot_create_dvfs_nodes(simNode, callgraph, domain=None):
 
     callgraph.add_subgraph(cluster)
 
-def do_dot(root, outdir, dotFilename):
+# Wait for a graphviz process rendering dot_filename, and report if it
+# failed
+def dot_wait(process, dot_filename):
+    status = process.wait()
+    if status != 0:
+        warn("graphviz failed to render %s (exit status %d)",
+             dot_filename, status)
+
+# Render the dot source in dot_filename to svg and pdf using graphviz
+# in background processes, unless the system has more than max_objects
+# SimObjects (a limit of 0 means no limit). The processes are waited
+# for by background threads, so that they are reaped as soon as they
+# are done without holding up the simulation.
+def dot_render(root, dot_filename, max_objects):
+    objects = len(root.descendantIndex())
+    if max_objects and objects > max_objects:
+        inform("not rendering %s: %d objects exceed the limit of %d",
+               dot_filename, objects, max_objects)
+        return
+
+    devnull = open(os.devnull, 'w')
+    try:
+        # dot crashes if the figure is extremely wide, but as it runs
+        # in a separate process this no longer affects the simulation
+        for fmt in ('svg', 'pdf'):
+            process = subprocess.Popen(['dot', '-T' + fmt,
+                                        '-o', dot_filename + '.' + fmt,
+                                        dot_filename],
+                                       stdin=devnull, stdout=devnull,
+                                       stderr=devnull, close_fds=True)
+            waiter = threading.Thread(target=dot_wait,
+                                      args=(process, dot_filename))
+            waiter.daemon = True
+            waiter.start()
+    except OSError:
+        warn("failed to start graphviz to render %s", dot_filename)
+    finally:
+        devnull.close()
+
+def do_dot(root, outdir, dotFilename, render=False, max_objects=0):
     if not pydot:
         return
     # * use ranksep > 1.0 for for vertical separation between nodes
@@ -359,15 +404,10 @@ def do_dot(root, outdir, dotFilename):
     dot_create_edges(root, callgraph)
     dot_filename = os.path.join(outdir, dotFilename)
     callgraph.write(dot_filename)
-    try:
-        # dot crashes if the figure is extremely wide.
-        # So avoid terminating simulation unnecessarily
-        callgraph.write_svg(dot_filename + ".svg")
-        callgraph.write_pdf(dot_filename + ".pdf")
-    except:
-        warn("failed to generate dot output from %s", dot_filename)
+    if render:
+        dot_render(root, dot_filename, max_objects)
 
-def do_dvfs_dot(root, outdir, dotFilename):
+def do_dvfs_dot(root, outdir, dotFilename, render=False, max_objects=0):
     if not pydot:
         return
 
@@ -383,10 +423,5 @@ def do_dvfs_dot(root, outdir, dotFilename):
         warn("Failed to generate dot graph for DVFS domains")
         return
 
-    try:
-        # dot crashes if the figure is extremely wide.
-        # So avoid terminating simulation unnecessarily
-        dvfsgraph.write_svg(dot_filename + ".svg")
-        dvfsgraph.write_pdf(dot_filename + ".pdf")
-    except:
-        warn("failed to generate dot output from %s", dot_filename)
+    if render:
+        dot_render(root, dot_filename, max_objects)
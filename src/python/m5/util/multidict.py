@@ -26,7 +26,7 @@
 #
 # Authors: Nathan Binkert
 
-__all__ = [ 'multidict' ]
+__all__ = [ 'multidict', 'flatmultidict' ]
 
 class multidict(object):
     def __init__(self, parent = {}, **kwargs):
@@ -131,6 +131,204 @@ class multidict(object):
             node = node.parent
         print key, values
 
+# Last version stamp handed out to a flatmultidict.  A flatmultidict
+# takes the next stamp whenever it is modified or reparented, so the
+# largest stamp along a chain of flatmultidicts grows whenever one of
+# them changes, and only then.  A view is only checked against its
+# chain again once a new stamp has been handed out since its last
+# check.
+_version = 0
+
+class flatmultidict(multidict):
+    """A multidict that keeps a flattened view of its contents.
+
+    Lookups in a plain multidict walk the parent chain.  This variant
+    caches a single dict that merges the local values with the values
+    of all the parents, so lookups and iteration cost the same as for
+    a plain dict irrespective of the depth of the chain.  The view is
+    rebuilt lazily whenever the multidict itself or one of its
+    ancestors has been changed since the view was built, as tracked
+    by the version stamps of the multidicts along the chain, so
+    changes to unrelated multidicts leave it alone.  Until a
+    multidict is iterated over, lookups fall back to the view of its
+    parent, so the children of a common parent (e.g., many clones of
+    one SimObject) share its view rather than each copying it.
+    """
+
+    def __init__(self, parent = {}, **kwargs):
+        self._flat = None
+        self._flat_version = None
+        self._flat_checked = None
+        self._version = 0
+        self._is_parent = False
+        super(flatmultidict, self).__init__(parent, **kwargs)
+
+    def _get_parent(self):
+        return self._parent
+
+    def _set_parent(self, parent):
+        self._parent = parent
+        if isinstance(parent, flatmultidict):
+            parent._is_parent = True
+        self._changed()
+
+    parent = property(_get_parent, _set_parent)
+
+    def _changed(self):
+        global _version
+        self._flat = None
+        _version += 1
+        self._version = _version
+
+    def _stamp(self):
+        # The largest version stamp of this multidict and its
+        # flatmultidict ancestors
+        stamp = self._version
+        node = self._parent
+        while isinstance(node, flatmultidict):
+            if node._version > stamp:
+                stamp = node._version
+            node = node._parent
+        return stamp
+
+    def _valid(self):
+        if self._flat is None:
+            return False
+        if self._flat_checked != _version:
+            if self._flat_version != self._stamp():
+                return False
+            self._flat_checked = _version
+        return True
+
+    def _view(self):
+        if not self._valid():
+            parent = self._parent
+            if isinstance(parent, flatmultidict):
+                flat = dict(parent._view())
+            elif isinstance(parent, multidict):
+                flat = dict(parent.items())
+            else:
+                flat = dict(parent)
+            for key in self.deleted:
+                flat.pop(key, None)
+            flat.update(self.local)
+            self._flat = flat
+            self._flat_version = self._stamp()
+            self._flat_checked = _version
+        return self._flat
+
+    # Lookups don't need our own view: check the local values and then
+    # the (shared) view of the parent.  This way objects inheriting
+    # from the same parent don't each need a copy of its values.
+    def _parent_view(self):
+        parent = self._parent
+        if isinstance(parent, flatmultidict):
+            return parent._view()
+        return parent
+
+    def __contains__(self, key):
+        if self._valid():
+            return key in self._flat
+        if key in self.local:
+            return True
+        if key in self.deleted:
+            return False
+        return key in self._parent_view()
+
+    def __delitem__(self, key):
+        super(flatmultidict, self).__delitem__(key)
+        self._changed()
+
+    def __setitem__(self, key, value):
+        self.deleted.pop(key, False)
+        self.local[key] = value
+        if self._is_parent or self._flat is None or key not in self._flat:
+            self._changed()
+        else:
+            # Nobody inherits from us, so just update the view in
+            # place.  Only do so for existing keys so that the view
+            # can safely be modified while it is being iterated over.
+            self._flat[key] = value
+
+    def __getitem__(self, key):
+        if self._valid():
+            return self._flat[key]
+        if key in self.local:
+            return self.local[key]
+        if key in self.deleted:
+            raise KeyError, key
+        return self._parent_view()[key]
+
+    def __len__(self):
+        return len(self._view())
+
+    def next(self):
+        return self._view().iteritems()
+
+    def has_key(self, key):
+        return key in self
+
+    def iteritems(self):
+        return self._view().iteritems()
+
+    def items(self):
+        return self._view().items()
+
+    def iterkeys(self):
+        return self._view().iterkeys()
+
+    def keys(self):
+        return self._view().keys()
+
+    def itervalues(self):
+        return self._view().itervalues()
+
+    def values(self):
+        return self._view().values()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+def _benchmark(depth=8, params=100, instances=500, lookups=50):
+    import time
+
+    def run(cls):
+        chain = cls()
+        for level in xrange(depth):
+            for i in xrange(params):
+                chain['p%d_%d' % (level, i)] = level
+            chain = cls(chain)
+        objs = [ cls(chain) for i in xrange(instances) ]
+        keys = [ 'p%d_%d' % (l, i) for l in xrange(depth)
+                 for i in xrange(0, params, params / lookups or 1) ]
+
+        start = time.time()
+        for obj in objs:
+            obj['p0_0'] = 1
+            for key in keys:
+                obj[key]
+                key in obj
+            for key,value in obj.iteritems():
+                pass
+        return time.time() - start
+
+    base = run(multidict)
+    flat = run(flatmultidict)
+    print '%d instances, chain depth %d, %d params per level' % \
+          (instances, depth, params)
+    print '    multidict:     %.3fs' % base
+    print '    flatmultidict: %.3fs (%.1fx)' % (flat, base / flat)
+
 if __name__ == '__main__':
     test1 = multidict()
     test2 = multidict(test1)
@@ -180,3 +378,24 @@ if __name__ == '__main__':
     test3['a'] = [ 0, 1, 2, 3 ]
 
     print test4
+
+    flat1 = flatmultidict()
+    flat2 = flatmultidict(flat1)
+    flat3 = flatmultidict(flat2)
+    for test,flat in ((test1, flat1), (test2, flat2)):
+        for key,value in test.local.items():
+            flat[key] = value
+        for key in test.deleted:
+            flat.deleted[key] = True
+    flat1['a'] = 'test1_a'
+    del flat1['a']
+    flat3['g'] = 'flat3_g'
+    assert sorted(flat2.items()) == sorted(test2.items())
+    assert flat3['c'] == 'test2_c' and flat3['b'] == 'blah'
+    flat1['d'] = 'flat1_d'
+    assert flat3['d'] == 'flat1_d'
+    print flat3
+
+    import sys
+    if '--benchmark' in sys.argv:
+        _benchmark()
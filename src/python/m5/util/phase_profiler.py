@@ -0,0 +1,125 @@
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#####################################################################
+#
+# Instantiation phase profiler
+#
+# Times the passes m5.instantiate() and the first m5.simulate() make
+# over the configuration, both in total and broken down by SimObject
+# type, and writes the result as a JSON report.  The profiler is off
+# by default, in which case the passes run with no timing overhead.
+#
+#####################################################################
+
+import json
+import time
+
+class PhaseProfiler(object):
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        # list of [name, seconds, object count, {type : [seconds, count]}]
+        # in the order the phases were first run
+        self._phases = []
+        self._index = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def _phase(self, name):
+        phase = self._index.get(name)
+        if phase is None:
+            phase = [ name, 0.0, 0, {} ]
+            self._index[name] = phase
+            self._phases.append(phase)
+        return phase
+
+    # Run func() as the phase called name.
+    def run(self, name, func, *args):
+        if not self.enabled:
+            return func(*args)
+
+        start = time.time()
+        try:
+            return func(*args)
+        finally:
+            self._phase(name)[1] += time.time() - start
+
+    # Call the method called method on each of objs as the phase
+    # called name, accounting the time spent per SimObject type.
+    def each(self, name, objs, method, *args):
+        if not self.enabled:
+            for obj in objs:
+                getattr(obj, method)(*args)
+            return
+
+        phase = self._phase(name)
+        types = phase[3]
+        timer = time.time
+        phase_start = timer()
+        try:
+            for obj in objs:
+                start = timer()
+                getattr(obj, method)(*args)
+                elapsed = timer() - start
+
+                entry = types.get(obj.type)
+                if entry is None:
+                    types[obj.type] = [ elapsed, 1 ]
+                else:
+                    entry[0] += elapsed
+                    entry[1] += 1
+                phase[2] += 1
+        finally:
+            phase[1] += timer() - phase_start
+
+    def report(self):
+        phases = []
+        for name, seconds, count, types in self._phases:
+            by_type = [ { 'type' : type_name, 'seconds' : t, 'count' : n }
+                        for type_name, (t, n) in types.iteritems() ]
+            by_type.sort(key=lambda entry: (-entry['seconds'], entry['type']))
+            phases.append({ 'name' : name,
+                            'seconds' : seconds,
+                            'objects' : count,
+                            'types' : by_type })
+
+        return { 'total_seconds' : sum(p['seconds'] for p in phases),
+                 'phases' : phases }
+
+    def write(self, filename, **extra):
+        report = self.report()
+        report.update(extra)
+        with open(filename, 'w') as f:
+            json.dump(report, f, indent=4, sort_keys=True,
+                      separators=(',', ': '))
+            f.write('\n')
+
+# The profiler used by m5.instantiate() and m5.simulate()
+profiler = PhaseProfiler()
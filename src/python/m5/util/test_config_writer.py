@@ -0,0 +1,80 @@
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Tests of the streaming configuration writers.  Run from src/python
+# with: python -m m5.util.test_config_writer
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from m5.SimObject import SimObject
+from m5.params import *
+from m5.util.config_writer import write_json
+
+class TestLeaf(SimObject):
+    type = 'TestLeaf'
+    cxx_header = 'test_leaf.hh'
+    size = Param.Int(1, "size")
+
+class TestTop(SimObject):
+    type = 'TestTop'
+    cxx_header = 'test_top.hh'
+    cpus = VectorParam.TestLeaf([], "cpus")
+    leaf = Param.TestLeaf(NULL, "leaf")
+
+# Fail on duplicate keys instead of keeping the last one
+def unique_keys(pairs):
+    keys = [ key for key, value in pairs ]
+    assert len(keys) == len(set(keys)), "duplicate keys in %s" % keys
+    return dict(pairs)
+
+class JsonWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.root = TestTop(eventq_index=0)
+        self.root.cpus = [ TestLeaf(size=i, eventq_index=0)
+                           for i in range(2) ]
+        self.root.leaf = TestLeaf(eventq_index=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check(self, compact):
+        filename = os.path.join(self.dir, 'config.json')
+        write_json(self.root, filename, compact)
+        with open(filename) as f:
+            streamed = json.load(f, object_pairs_hook=unique_keys)
+        expected = json.loads(json.dumps(self.root.get_config_as_dict()))
+        self.assertEqual(streamed, expected)
+
+    def testIndented(self):
+        self.check(False)
+
+    def testCompact(self):
+        self.check(True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,6 +36,7 @@
 %include <stdint.i>
 
 %{
+#include "base/stats/columnar.hh"
 #include "base/stats/text.hh"
 #include "base/stats/types.hh"
 #include "base/callback.hh"
@@ -135,7 +136,8 @@ template <class T> T cast_info(Info *info);
 %template(dynamic_SparseHistInfo) cast_info<SparseHistInfo *>;
 
 void initSimStats();
-Output *initText(const std::string &filename, bool desc);
+Output *initText(const std::string &filename, bool desc, int keyframe = 0);
+Output *initColumnar(const std::string &filename);
 
 void registerPythonStatsHandlers();
 
@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Compare the statistics of gem5 runs against reference runs.  Each
+# stats file is parsed once into a dictionary of stat name to value.
+# Stats may be given a relative (in percent) and an absolute tolerance
+# by regular expression, and stats can be ignored altogether.  Many
+# pairs of runs can be compared in parallel, and a JSON summary of the
+# comparisons can be written for other tools to read.
+
+import difflib
+import json
+import math
+import multiprocessing
+import optparse
+import os
+import re
+import sys
+
+# Statistics that relate to simulator performance, not correctness,
+# so changes in these are never errors
+ignore_stats = (
+    'host_seconds',
+    'host_tick_rate',
+    'host_inst_rate',
+    'host_op_rate',
+    'host_mem_usage',
+    )
+
+# Key statistics (always displayed), matched anywhere in the name
+key_stats = (
+    'ipc',
+    'committedInsts',
+    'committedOps',
+    'sim_insts',
+    'sim_ops',
+    'sim_ticks',
+    'host_inst_rate',
+    'host_mem_usage',
+    )
+
+def parse(filename):
+    '''Read the first dump of a stats file into a dictionary of stat
+    name to value string'''
+    stats = {}
+    for line in file(filename):
+        fields = line.split('#', 1)[0].split()
+        if not fields:
+            continue
+        if fields[0].startswith('-----'):
+            if fields[1] == 'End':
+                break
+            continue
+        if len(fields) > 1:
+            stats[fields[0]] = fields[1]
+    return stats
+
+def pctDiff(ref, new):
+    '''Percent difference from ref to new'''
+    if ref == 0:
+        return 0.0 if new == 0 else 9999.0
+    return 100.0 * (new - ref) / ref
+
+def finite(value):
+    return not (math.isinf(value) or math.isnan(value))
+
+def digits(value):
+    '''Number of digits after the decimal point of a value string'''
+    point = value.rfind('.')
+    return 0 if point < 0 else len(value) - point - 1
+
+class StatsDiff(object):
+    '''Compare stats files, a stat may differ from the reference by up
+    to the relative tolerance (in percent) or the absolute tolerance of
+    the first of the tolerances whose regular expression matches its
+    name, or by the default rel and abs otherwise'''
+    def __init__(self, ignore=(), tolerances=(), rel=0.0, abs=0.0):
+        ignore = [ '^%s$' % re.escape(stat) for stat in ignore_stats ] + \
+                 list(ignore)
+        self.ignore = re.compile('|'.join(ignore))
+        self.tolerances = [ (re.compile(regex), float(r), float(a))
+                            for regex, r, a in tolerances ]
+        self.rel = float(rel)
+        self.abs = float(abs)
+        self.key = re.compile('|'.join(key_stats))
+
+    def tolerance(self, stat):
+        for regex, rel, abs_tol in self.tolerances:
+            if regex.search(stat):
+                return rel, abs_tol
+        return self.rel, self.abs
+
+    def diff(self, ref_file, new_file):
+        '''Compare the stats of new_file to the ones of ref_file and
+        return a summary of the differences as a dictionary'''
+        ref_stats = parse(ref_file)
+        new_stats = parse(new_file)
+
+        key = []
+        errors = []
+        missing = {}
+        tolerated = 0
+        max_error = 0.0
+        for stat in sorted(ref_stats):
+            ref = ref_stats[stat]
+            new = new_stats.pop(stat, None)
+            if new is None:
+                missing[stat] = ref
+                continue
+
+            if self.key.search(stat):
+                key.append((stat, ref, new))
+
+            if ref == new or self.ignore.search(stat):
+                continue
+
+            try:
+                ref_value = float(ref)
+                new_value = float(new)
+                if not finite(ref_value) or not finite(new_value):
+                    raise ValueError
+            except ValueError:
+                # Something like a divide by zero, there is no point
+                # in trying to quantify the error
+                errors.append((stat, ref, new, None))
+                continue
+
+            error = pctDiff(ref_value, new_value)
+            rel, abs_tol = self.tolerance(stat)
+            if abs(error) <= rel or abs(new_value - ref_value) <= abs_tol:
+                tolerated += 1
+                continue
+
+            errors.append((stat, ref, new, error))
+            max_error = max(max_error, abs(error))
+
+        # The stats left are the ones that are not in the reference
+        added = new_stats
+
+        return {
+            'reference' : ref_file,
+            'new' : new_file,
+            'passed' : not (errors or missing or added),
+            'max_error' : max_error,
+            'key' : key,
+            'errors' : errors,
+            'tolerated' : tolerated,
+            'missing' : missing,
+            'added' : added,
+            }
+
+def report(result, out=sys.stdout, count=20, alpha=False):
+    '''Print the summary of a comparison, only the count largest errors
+    are shown unless count is 0, errors are sorted alphabetically rather
+    than by magnitude if alpha is set'''
+    def line(stat, ref, new, error):
+        fmt = '%%10.%df' % max(digits(ref), digits(new))
+        fmt = '  %%-30s %s %s %s  %%+7.2f%%%%' % (fmt, fmt, fmt)
+        ref = float(ref)
+        new = float(new)
+        print >>out, fmt % (stat, ref, new, new - ref, error)
+
+    print >>out, 'Maximum error magnitude: %+f%%' % result['max_error']
+    print >>out
+    print >>out, '  %-30s %10s %10s %10s   %7s' % \
+          (' ', 'Reference', 'New Value', 'Abs Diff', 'Pct Chg')
+    print >>out, 'Key statistics:'
+    print >>out
+    for stat, ref, new in result['key']:
+        try:
+            line(stat, ref, new, pctDiff(float(ref), float(new)))
+        except ValueError:
+            print >>out, '  %-30s %10s %10s' % (stat, ref, new)
+
+    print >>out
+    print >>out, 'Differences:'
+    print >>out
+    errors = result['errors']
+    if alpha:
+        count = 0
+    else:
+        def magnitude(error):
+            stat, ref, new, error = error
+            return float('inf') if error is None else abs(error)
+        errors = sorted(errors, key=magnitude, reverse=True)
+
+    for i, (stat, ref, new, error) in enumerate(errors):
+        if error is None:
+            print >>out, '%s: %s --> %s' % (stat, ref, new)
+        else:
+            line(stat, ref, new, error)
+
+        if count > 0 and i + 1 >= count:
+            print >>out, '[... showing top %d errors only, ' \
+                  'additional errors omitted ...]' % count
+            break
+
+    if result['tolerated']:
+        print >>out
+        print >>out, '%d differences within tolerance' % result['tolerated']
+
+    for kind, title in (('missing', 'Missing %d reference statistics:'),
+                        ('added', 'Found %d new statistics:')):
+        stats = result[kind]
+        if stats:
+            print >>out
+            print >>out, title % len(stats)
+            print >>out
+            for stat in sorted(stats):
+                print >>out, '  %-50s    %s' % (stat, stats[stat])
+
+def diffOutput(ref_dir, new_dir, ignore=(), exclude=()):
+    '''Return the differences between the files in two directories as
+    a list of lines like diff -ubrs does.  Lines matching one of the
+    regular expressions in ignore are skipped and the files named in
+    exclude are not compared.'''
+    ignore = re.compile('|'.join(ignore)) if ignore else None
+
+    def files(top):
+        result = set()
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [ d for d in dirnames if d not in exclude ]
+            for name in filenames:
+                if name not in exclude:
+                    path = os.path.join(dirpath, name)
+                    result.add(os.path.relpath(path, top))
+        return result
+
+    def lines(filename):
+        result = []
+        for line in file(filename):
+            if ignore and ignore.search(line):
+                continue
+            # Changes in the amount of white space don't matter
+            result.append(' '.join(line.split()) + '\n')
+        return result
+
+    ref_files = files(ref_dir)
+    new_files = files(new_dir)
+    diff = []
+    for name in sorted(ref_files | new_files):
+        ref = os.path.join(ref_dir, name)
+        new = os.path.join(new_dir, name)
+        if name not in new_files:
+            diff.append('Only in %s: %s\n' % os.path.split(ref))
+        elif name not in ref_files:
+            diff.append('Only in %s: %s\n' % os.path.split(new))
+        else:
+            changes = list(difflib.unified_diff(lines(ref), lines(new),
+                                                ref, new))
+            if changes:
+                diff += changes
+            else:
+                diff.append('Files %s and %s are identical\n' % (ref, new))
+    return diff
+
+def statsFile(path):
+    if os.path.isdir(path):
+        return os.path.join(path, 'stats.txt')
+    return path
+
+def _diff(args):
+    differ, ref, new = args
+    return differ.diff(statsFile(ref), statsFile(new))
+
+def diffAll(differ, pairs, jobs=None):
+    '''Compare many (reference, new) pairs of stats files or run
+    directories with jobs worker processes and return the summaries in
+    the order of the pairs'''
+    work = [ (differ, ref, new) for ref, new in pairs ]
+    if jobs == 1 or len(work) < 2:
+        return map(_diff, work)
+
+    pool = multiprocessing.Pool(jobs)
+    try:
+        return pool.map(_diff, work)
+    finally:
+        pool.close()
+        pool.join()
+
+def writeSummary(results, filename):
+    '''Write the summaries of comparisons to a JSON file'''
+    f = file(filename, 'w')
+    json.dump(results, f, indent=4, sort_keys=True, separators=(',', ': '))
+    f.close()
+
+def main():
+    parser = optparse.OptionParser(
+        usage='%prog [options] <reference> <new> [<reference> <new> ...]',
+        description='Compare the stats of new runs against reference '
+        'runs.  Arguments may be stats files or run directories.')
+    parser.add_option('-a', action='store_true', default=False,
+                      dest='alpha', help='Sort errors alphabetically '
+                      '(default: by percentage)')
+    parser.add_option('-n', type='int', default=20, dest='count',
+                      help='Print top <num> errors (default 20, 0 for all)')
+    parser.add_option('-t', type='float', default=0.0, dest='rel',
+                      help='Ignore errors below <num> percent (default 0)')
+    parser.add_option('-T', type='float', default=0.0, dest='abs',
+                      help='Ignore errors below <num> (default 0)')
+    parser.add_option('--tolerance', action='append', default=[],
+                      metavar='REGEX=PCT[,ABS]',
+                      help='Tolerance for the stats matching REGEX, '
+                      'the first one that matches is used')
+    parser.add_option('-i', '--ignore', action='append', default=[],
+                      metavar='REGEX', help='Ignore the stats matching REGEX')
+    parser.add_option('-s', '--summary', metavar='FILE',
+                      help='Write a JSON summary of the comparisons to FILE')
+    parser.add_option('-j', '--jobs', type='int', default=None,
+                      help='Number of comparisons to run in parallel '
+                      '(default: one per CPU)')
+    parser.add_option('-q', '--quiet', action='store_true', default=False,
+                      help='Only report the pairs that differ')
+
+    options, args = parser.parse_args()
+    if not args or len(args) % 2:
+        parser.error('need pairs of file arguments (<reference> <new>)')
+
+    tolerances = []
+    for tolerance in options.tolerance:
+        regex, sep, values = tolerance.rpartition('=')
+        if not sep:
+            parser.error('bad tolerance %s' % tolerance)
+        values = values.split(',')
+        tolerances.append((regex, values[0],
+                           values[1] if len(values) > 1 else 0.0))
+
+    differ = StatsDiff(options.ignore, tolerances, options.rel, options.abs)
+    pairs = zip(args[0::2], args[1::2])
+    results = diffAll(differ, pairs, options.jobs)
+
+    for result in results:
+        if options.quiet and result['passed']:
+            continue
+        if len(results) > 1:
+            print '===== %s %s: %s =====' % (result['reference'],
+                result['new'], 'passed' if result['passed'] else 'CHANGED')
+        report(result, count=options.count, alpha=options.alpha)
+
+    if options.summary:
+        writeSummary(results, options.summary)
+
+    # Exit code is 0 if all stats are found (with no extras) and no
+    # stats differ beyond their tolerance, 1 otherwise
+    sys.exit(0 if all(result['passed'] for result in results) else 1)
+
+if __name__ == '__main__':
+    main()
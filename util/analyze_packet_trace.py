@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# This script computes summary metrics of protobuf packet traces:
+# the read/write mix, the reuse interval of the addresses, the
+# histogram of the strides between consecutive addresses and the
+# bandwidth over time. The trace is decoded by decode_packet_trace
+# (optionally with a pool of processes, see --jobs) into NumPy
+# structured arrays of packet_dtype, and the metrics are updated one
+# chunk of packets at a time so that only the chunk, the histograms
+# and the table of the last access to each block are held in memory.
+# Packets previously converted with decode_packet_trace.py --numpy
+# (.npy) are read through a memory map instead.
+#
+# The reuse interval of an access is the number of accesses since the previous
+# access to the same block, and is kept in power-of-two buckets. Unlike the
+# reuse (stack) distance, it counts the accesses to all blocks in between, not
+# the distinct blocks. The strides are kept exactly up to --max-stride bytes in
+# either direction, larger strides are counted together. With --output the
+# histograms and the bandwidth per bin are saved in a .npz file. The bins of
+# the bandwidth start at the bin of the first packet, and the mean bandwidth is
+# taken over the bins from the first to the last packet.
+
+import numpy
+import optparse
+import sys
+
+# Commands of src/mem/packet.hh Command enum
+READ_REQ = 1
+WRITE_REQ = 4
+
+# Ticks per second of traces without a header, i.e. .npy files
+DEFAULT_TICK_FREQ = 10**12
+
+class TraceStats(object):
+    """
+    Metrics of a packet trace, updated a chunk of packets at a time
+    with add().
+    """
+    def __init__(self, block_size=64, bin_ticks=10**6, max_stride=4096):
+        self.block_size = block_size
+        self.bin_ticks = bin_ticks
+        self.max_stride = max_stride
+
+        self.packets = 0
+        # Packets and bytes of reads, writes and other commands
+        self.mix_packets = numpy.zeros(3, dtype=numpy.int64)
+        self.mix_bytes = numpy.zeros(3, dtype=numpy.int64)
+
+        # Sorted blocks accessed so far and the index of their last
+        # access
+        self.blocks = numpy.zeros(0, dtype=numpy.uint64)
+        self.last_access = numpy.zeros(0, dtype=numpy.int64)
+        self.cold = 0
+        self.reuse_interval = numpy.zeros(64, dtype=numpy.int64)
+
+        # Strides from -max_stride - 1 to max_stride + 1, where the
+        # first and last bins count the larger strides
+        self.last_addr = None
+        self.strides = numpy.zeros(2 * max_stride + 3, dtype=numpy.int64)
+
+        # Bytes read and written per bin of bin_ticks, from the bin of
+        # the first packet
+        self.first_bin = None
+        self.read_bytes = numpy.zeros(0, dtype=numpy.int64)
+        self.write_bytes = numpy.zeros(0, dtype=numpy.int64)
+
+    def add(self, packets):
+        """
+        Update the metrics with an array of packets of packet_dtype,
+        which follow the packets added before.
+        """
+        if not len(packets):
+            return
+        kind = numpy.full(len(packets), 2, dtype=numpy.intp)
+        kind[packets['cmd'] == READ_REQ] = 0
+        kind[packets['cmd'] == WRITE_REQ] = 1
+        self.mix_packets += numpy.bincount(kind, minlength=3)
+        self.mix_bytes += numpy.bincount(kind, weights=packets['size'],
+                                         minlength=3).astype(numpy.int64)
+
+        self.addReuseInterval(packets['addr'] // self.block_size)
+        self.addStrides(packets['addr'].astype(numpy.int64))
+        self.addBandwidth(packets, kind)
+        self.packets += len(packets)
+
+    def addReuseInterval(self, blocks):
+        index = numpy.arange(self.packets, self.packets + len(blocks))
+
+        # Sort the accesses by block, keeping them in order within a
+        # block, so that an access follows the previous access to the
+        # same block
+        order = numpy.argsort(blocks, kind='mergesort')
+        blocks = blocks[order]
+        index = index[order]
+        same = blocks[1:] == blocks[:-1]
+        first = numpy.concatenate(([ True ], ~same))
+        last = numpy.concatenate((~same, [ True ]))
+
+        previous = numpy.full(len(blocks), -1, dtype=numpy.int64)
+        previous[1:][same] = index[:-1][same]
+
+        # The first access to a block in the chunk follows the last
+        # access to it in the previous chunks, if any
+        unique = blocks[first]
+        pos = numpy.searchsorted(self.blocks, unique)
+        found = pos < len(self.blocks)
+        found[found] = self.blocks[pos[found]] == unique[found]
+        first_previous = numpy.full(len(unique), -1, dtype=numpy.int64)
+        first_previous[found] = self.last_access[pos[found]]
+        previous[first] = first_previous
+
+        reused = previous >= 0
+        self.cold += len(blocks) - numpy.count_nonzero(reused)
+        interval = index[reused] - previous[reused]
+        buckets = numpy.log2(interval).astype(numpy.intp)
+        self.reuse_interval += numpy.bincount(
+            buckets, minlength=len(self.reuse_interval))
+
+        self.last_access[pos[found]] = index[last][found]
+        if not found.all():
+            self.blocks = numpy.insert(self.blocks, pos[~found],
+                                       unique[~found])
+            self.last_access = numpy.insert(self.last_access, pos[~found],
+                                            index[last][~found])
+
+    def addStrides(self, addrs):
+        if self.last_addr is None:
+            strides = numpy.diff(addrs)
+        else:
+            strides = numpy.diff(numpy.concatenate(([ self.last_addr ],
+                                                    addrs)))
+        self.last_addr = addrs[-1]
+
+        bins = numpy.clip(strides, -self.max_stride - 1, self.max_stride + 1)
+        self.strides += numpy.bincount(bins + self.max_stride + 1,
+                                       minlength=len(self.strides))
+
+    def addBandwidth(self, packets, kind):
+        bins = (packets['tick'] // self.bin_ticks).astype(numpy.intp)
+        if self.first_bin is None:
+            self.first_bin = bins.min()
+
+        # Packets may be slightly out of order, so the first bin may
+        # move back
+        grow = self.first_bin - bins.min()
+        if grow > 0:
+            self.first_bin -= grow
+            self.read_bytes = numpy.concatenate(
+                (numpy.zeros(grow, dtype=numpy.int64), self.read_bytes))
+            self.write_bytes = numpy.concatenate(
+                (numpy.zeros(grow, dtype=numpy.int64), self.write_bytes))
+
+        bins -= self.first_bin
+        size = bins.max() + 1
+        if size > len(self.read_bytes):
+            grow = size - len(self.read_bytes)
+            self.read_bytes = numpy.concatenate(
+                (self.read_bytes, numpy.zeros(grow, dtype=numpy.int64)))
+            self.write_bytes = numpy.concatenate(
+                (self.write_bytes, numpy.zeros(grow, dtype=numpy.int64)))
+
+        for kind_bytes, k in ((self.read_bytes, 0), (self.write_bytes, 1)):
+            selected = kind == k
+            kind_bytes[:size] += numpy.bincount(
+                bins[selected], weights=packets['size'][selected],
+                minlength=size).astype(numpy.int64)
+
+    def strideValues(self):
+        """
+        Return the stride of each bin of the stride histogram. The
+        first and last bins hold the strides beyond max_stride.
+        """
+        return numpy.arange(-self.max_stride - 1, self.max_stride + 2)
+
+    def arrays(self):
+        """
+        Return the metrics as a dictionary of NumPy arrays.
+        """
+        return { 'mix_packets' : self.mix_packets,
+                 'mix_bytes' : self.mix_bytes,
+                 'reuse_cold' : numpy.array(self.cold),
+                 'reuse_interval' : self.reuse_interval,
+                 'stride_values' : self.strideValues(),
+                 'strides' : self.strides,
+                 'bin_ticks' : numpy.array(self.bin_ticks),
+                 'bin_start' : numpy.array(
+                     (self.first_bin or 0) * self.bin_ticks),
+                 'read_bytes' : self.read_bytes,
+                 'write_bytes' : self.write_bytes }
+
+    def report(self, out, tick_freq, top=10):
+        def pct(count, total):
+            return 100.0 * count / total if total else 0.0
+
+        print >>out, "Packets: %d" % self.packets
+        total_bytes = self.mix_bytes.sum()
+        for name, k in (('Reads', 0), ('Writes', 1), ('Other', 2)):
+            print >>out, "%-8s %12d packets (%6.2f%%) %14d bytes (%6.2f%%)" % \
+                  (name + ':', self.mix_packets[k],
+                   pct(self.mix_packets[k], self.packets),
+                   self.mix_bytes[k], pct(self.mix_bytes[k], total_bytes))
+
+        print >>out
+        print >>out, "Reuse interval (accesses, %d byte blocks):" % \
+              self.block_size
+        print >>out, "  %-24s %12d (%6.2f%%)" % \
+              ('cold', self.cold, pct(self.cold, self.packets))
+        for bucket in numpy.flatnonzero(self.reuse_interval):
+            count = self.reuse_interval[bucket]
+            print >>out, "  %-24s %12d (%6.2f%%)" % \
+                  ('[%d, %d)' % (1 << bucket, 2 << bucket),
+                   count, pct(count, self.packets))
+
+        print >>out
+        print >>out, "Strides (bytes, %d most frequent):" % top
+        total_strides = self.strides.sum()
+        values = self.strideValues()
+        for i in numpy.argsort(-self.strides, kind='mergesort')[:top]:
+            if not self.strides[i]:
+                break
+            if i == 0:
+                stride = '< %d' % -self.max_stride
+            elif i == len(self.strides) - 1:
+                stride = '> %d' % self.max_stride
+            else:
+                stride = '%+d' % values[i]
+            print >>out, "  %-24s %12d (%6.2f%%)" % \
+                  (stride, self.strides[i],
+                   pct(self.strides[i], total_strides))
+
+        if not self.packets:
+            return
+        print >>out
+        seconds = float(self.bin_ticks) / tick_freq
+        print >>out, "Bandwidth (MB/s, %d bins of %d ticks from tick %d):" % \
+              (len(self.read_bytes), self.bin_ticks,
+               self.first_bin * self.bin_ticks)
+        total = self.read_bytes + self.write_bytes
+        active = total > 0
+        for name, kind_bytes in (('Read', self.read_bytes),
+                                 ('Write', self.write_bytes),
+                                 ('Total', total)):
+            bandwidth = kind_bytes / seconds / 1e6
+            print >>out, "  %-6s mean %12.2f  active mean %12.2f  " \
+                  "peak %12.2f" % \
+                  (name + ':', bandwidth.mean(), bandwidth[active].mean(),
+                   bandwidth.max())
+
+def tickFrequency(filename):
+    """
+    Return the ticks per second of a trace, from its header.
+    """
+    if filename.endswith('.npy'):
+        return DEFAULT_TICK_FREQ
+
+    import decode_packet_trace
+    import protolib
+
+    proto_in = protolib.openFileRd(filename)
+    if proto_in.read(4) != "gem5":
+        print "Unrecognized file", filename
+        exit(-1)
+    header = decode_packet_trace.packet_pb2.PacketHeader()
+    protolib.FramedReader(proto_in).decode(header)
+    proto_in.close()
+    return header.tick_freq
+
+def traceChunks(filename, chunk_size, jobs):
+    """
+    Yield the packets of a trace in arrays of packet_dtype of about
+    chunk_size packets.
+    """
+    if filename.endswith('.npy'):
+        packets = numpy.load(filename, mmap_mode='r')
+        for start in xrange(0, len(packets), chunk_size):
+            yield numpy.array(packets[start:start + chunk_size])
+        return
+
+    import decode_packet_trace
+
+    index = decode_packet_trace.readIndex(filename)
+    pending = []
+    count = 0
+    for packets in decode_packet_trace.decodeRanges(filename, index, jobs,
+                                                    True):
+        pending.append(packets)
+        count += len(packets)
+        if count >= chunk_size:
+            yield numpy.concatenate(pending)
+            pending = []
+            count = 0
+    if pending:
+        yield numpy.concatenate(pending)
+
+def main():
+    parser = optparse.OptionParser(
+        usage="%prog [options] <protobuf trace or .npy packets>")
+    parser.add_option("-b", "--block-size", type="int", default=64,
+                      help="Block size in bytes of the reuse interval "
+                      "[default: %default]")
+    parser.add_option("-t", "--bin-ticks", type="int", default=10**6,
+                      help="Ticks per bin of the bandwidth over time "
+                      "[default: %default]")
+    parser.add_option("-s", "--max-stride", type="int", default=4096,
+                      help="Largest stride in bytes kept in the stride "
+                      "histogram [default: %default]")
+    parser.add_option("-c", "--chunk-size", type="int", default=1 << 20,
+                      help="Packets analysed at a time [default: %default]")
+    parser.add_option("-j", "--jobs", type="int", default=1,
+                      help="Decode the trace with a pool of JOBS "
+                      "processes [default: %default]")
+    parser.add_option("-o", "--output", default=None,
+                      help="Save the histograms and the bandwidth per bin "
+                      "in a NumPy .npz file")
+
+    (options, args) = parser.parse_args()
+    if len(args) != 1:
+        parser.print_usage()
+        exit(-1)
+
+    stats = TraceStats(options.block_size, options.bin_ticks,
+                       options.max_stride)
+    tick_freq = tickFrequency(args[0])
+    for packets in traceChunks(args[0], options.chunk_size, options.jobs):
+        stats.add(packets)
+
+    stats.report(sys.stdout, tick_freq)
+    if options.output:
+        numpy.savez(options.output, tick_freq=numpy.array(tick_freq),
+                    **stats.arrays())
+
+if __name__ == "__main__":
+    main()
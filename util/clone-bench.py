@@ -0,0 +1,103 @@
+#! /usr/bin/env python
+
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the throughput of cloning a SimObject template, comparing
+# one clone at a time (template()) with template.replicate().  The
+# template mimics a core with its private caches: a root object with
+# a handful of children, each with a large number of parameters.
+# The script only needs the Python parts of m5 and can be run either
+# with a plain Python interpreter from the top of the source tree or
+# as a gem5 config script.
+
+import optparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(sys.argv[0]),
+                                '..', 'src', 'python'))
+
+from m5.SimObject import MetaSimObject, SimObject
+from m5.params import *
+from m5.proxy import *
+
+parser = optparse.OptionParser()
+
+parser.add_option("-n", "--clones", type="int", default=512,
+                  help="Number of clones to create [default: %default]")
+parser.add_option("-p", "--params", type="int", default=80,
+                  help="Parameters per object [default: %default]")
+parser.add_option("-c", "--children", type="int", default=6,
+                  help="Children of the template root [default: %default]")
+parser.add_option("-r", "--repeat", type="int", default=3,
+                  help="Repetitions, the best is reported "
+                  "[default: %default]")
+
+(options, args) = parser.parse_args()
+
+if args:
+    print "Error: script doesn't take any positional arguments"
+    sys.exit(1)
+
+def makeClass(name, base):
+    attrs = dict(('param%d' % i, Param.Int(i, "Parameter %d" % i))
+                 for i in xrange(options.params))
+    attrs['type'] = name
+    attrs['cxx_header'] = 'sim/sim_object.hh'
+    return MetaSimObject(name, (base, ), attrs)
+
+BenchNode = makeClass('CloneBenchNode', SimObject)
+BenchLeaf = makeClass('CloneBenchLeaf', BenchNode)
+
+def makeTemplate():
+    template = BenchNode(param0 = 1)
+    template.leaves = [ BenchLeaf(param1 = i)
+                        for i in xrange(options.children) ]
+    template.leaf = BenchLeaf()
+    return template
+
+def bench(clone):
+    best = None
+    for i in xrange(options.repeat):
+        template = makeTemplate()
+        start = time.time()
+        clones = clone(template)
+        elapsed = time.time() - start
+        assert len(clones) == options.clones
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+objects = options.clones * (options.children + 2)
+print "Cloning %d templates of %d objects with %d parameters each" % \
+      (options.clones, options.children + 2, options.params)
+
+for name, clone in (
+    ("template()", lambda t: [ t() for i in xrange(options.clones) ]),
+    ("replicate()", lambda t: t.replicate(options.clones))):
+    elapsed = bench(clone)
+    print "%-12s %8.3fs %10.0f clones/s %10.0f objects/s" % \
+          (name, elapsed, options.clones / elapsed, objects / elapsed)
@@ -134,7 +134,8 @@ def main():
 
     # Add the packet header
     header = inst_dep_record_pb2.InstDepRecordHeader()
-    protolib.decodeMessage(proto_in, header)
+    reader = protolib.FramedReader(proto_in)
+    reader.decode(header)
 
     print "Object id:", header.obj_id
     print "Tick frequency:", header.tick_freq
@@ -154,7 +155,7 @@ def main():
     packet = inst_dep_record_pb2.InstDepRecord()
 
     # Decode the packet messages until we hit the end of the file
-    while protolib.decodeMessage(proto_in, packet):
+    while reader.decode(packet):
         num_packets += 1
 
         # Write to file the seq num
@@ -95,7 +95,8 @@ def main():
 
     # Add the packet header
     header = inst_pb2.InstHeader()
-    protolib.decodeMessage(proto_in, header)
+    reader = protolib.FramedReader(proto_in)
+    reader.decode(header)
 
     print "Object id:", header.obj_id
     print "Tick frequency:", header.tick_freq
@@ -113,7 +114,7 @@ def main():
 
     # Decode the inst messages until we hit the end of the file
     optional_fields = ('tick', 'type', 'inst_flags', 'addr', 'size', 'mem_flags')
-    while protolib.decodeMessage(proto_in,  inst):
+    while reader.decode(inst):
         # If we have a tick use it, otherwise count instructions
         if inst.HasField('tick'):
             tick = inst.tick
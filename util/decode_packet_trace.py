@@ -47,7 +47,22 @@
 # addr, size, tick,flags. For example:
 # r,128,64,4000,0
 # w,232123,64,500000,0
+#
+# Large traces can be decoded by a pool of processes (--jobs). The
+# trace is then first scanned for the offsets of its messages without
+# decoding them, and the offset of every INDEX_STRIDE'th message is
+# kept in an index next to the trace (<trace>.idx) so that the scan
+# is only needed once. The ranges of messages between the index
+# entries are decoded in parallel and their output is written in
+# order. With --numpy, the packets are written as a NumPy structured
+# array (see packet_dtype) in a .npy file rather than as text.
 
+import collections
+import io
+import json
+import multiprocessing
+import optparse
+import os
 import protolib
 import sys
 
@@ -75,58 +90,247 @@ except:
         print "Failed to import packet proto definitions"
         exit(-1)
 
-def main():
-    if len(sys.argv) != 3:
-        print "Usage: ", sys.argv[0], " <protobuf input> <ASCII output>"
+# Fields of the packets in the NumPy output
+packet_dtype = [ ('cmd', '<u4'), ('addr', '<u8'), ('size', '<u4'),
+                 ('tick', '<u8'), ('flags', '<u4') ]
+
+INDEX_VERSION = 1
+
+# Number of messages between two entries of the index
+INDEX_STRIDE = 1 << 16
+
+def packetText(packet):
+    """
+    Return the ASCII trace line of a packet.
+    """
+    # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
+    cmd = 'r' if packet.cmd == 1 else ('w' if packet.cmd == 4 else 'u')
+    line = []
+    if packet.HasField('pkt_id'):
+        line.append('%s,' % (packet.pkt_id))
+    if packet.HasField('flags'):
+        line.append('%s,%s,%s,%s,%s' % (cmd, packet.addr, packet.size,
+                                        packet.flags, packet.tick))
+    else:
+        line.append('%s,%s,%s,%s' % (cmd, packet.addr, packet.size,
+                                     packet.tick))
+    if packet.HasField('pc'):
+        line.append(',%s\n' % (packet.pc))
+    else:
+        line.append('\n')
+    return ''.join(line)
+
+def readIndex(filename):
+    """
+    Return the index of a trace, as the offset of the first packet,
+    the offsets of every INDEX_STRIDE'th packet after it, the offset
+    of the end of the packets and the number of packets. The index is
+    loaded from <filename>.idx if it is up to date, and saved there if
+    it had to be built.
+    """
+    st = os.stat(filename)
+    index_filename = filename + '.idx'
+    try:
+        with open(index_filename) as f:
+            index = json.load(f)
+        if index['version'] == INDEX_VERSION and \
+           index['size'] == st.st_size and index['mtime'] == st.st_mtime:
+            return index
+    except (IOError, OSError, ValueError, KeyError):
+        pass
+
+    proto_in = protolib.openFileRd(filename)
+    if proto_in.read(4) != "gem5":
+        print "Unrecognized file", filename
         exit(-1)
 
-    # Open the file in read mode
-    proto_in = protolib.openFileRd(sys.argv[1])
+    # The offsets of the messages after the header, followed by the
+    # end of the last message
+    positions = protolib.FramedReader(proto_in).offsets()
+    next(positions)
 
+    offsets = []
+    count = 0
+    end = 0
+    for count, end in enumerate(positions):
+        if count % INDEX_STRIDE == 0:
+            offsets.append(end)
+    proto_in.close()
+
+    if offsets and offsets[-1] == end:
+        offsets.pop()
+
+    index = { 'version' : INDEX_VERSION,
+              'size' : st.st_size,
+              'mtime' : st.st_mtime,
+              'offsets' : offsets,
+              'end' : end,
+              'count' : count }
     try:
-        ascii_out = open(sys.argv[2], 'w')
-    except IOError:
-        print "Failed to open ", sys.argv[2], " for writing"
+        with open(index_filename, 'w') as f:
+            json.dump(index, f)
+    except (IOError, OSError):
+        # The index is only a cache, e.g. the directory may be
+        # read-only
+        pass
+    return index
+
+def readRanges(filename, index):
+    """
+    Yield the (start, end, data) of the ranges of packets between the
+    entries of the index. The data is only read here for compressed
+    traces, which can't be read at random.
+    """
+    offsets = index['offsets'] + [ index['end'] ]
+    ranges = zip(offsets[:-1], offsets[1:])
+
+    proto_in = protolib.openFileRd(filename)
+    compressed = not isinstance(proto_in, file)
+    for start, end in ranges:
+        data = None
+        if compressed:
+            proto_in.seek(start)
+            data = proto_in.read(end - start)
+        yield start, end, data
+    proto_in.close()
+
+def decodeRange(args):
+    """
+    Decode a range of packets to text, or to a NumPy array of
+    packet_dtype if as_array is set.
+    """
+    filename, start, end, data, as_array = args
+    if data is None:
+        with open(filename, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+
+    packet = packet_pb2.Packet()
+    result = []
+    for message in protolib.FramedReader(io.BytesIO(data)):
+        packet.ParseFromString(message)
+        if as_array:
+            result.append((packet.cmd, packet.addr, packet.size,
+                           packet.tick, packet.flags))
+        else:
+            result.append(packetText(packet))
+
+    if as_array:
+        import numpy
+        return numpy.array(result, dtype=packet_dtype)
+    return ''.join(result)
+
+def decodeRanges(filename, index, jobs, as_array):
+    """
+    Yield the decoded ranges of packets of a trace in order, decoding
+    up to two ranges per process ahead with a pool of jobs processes.
+    """
+    tasks = ( (filename, start, end, data, as_array)
+              for start, end, data in readRanges(filename, index) )
+    if jobs == 1:
+        for task in tasks:
+            yield decodeRange(task)
+        return
+
+    pool = multiprocessing.Pool(jobs)
+    pending = collections.deque()
+    try:
+        for task in tasks:
+            pending.append(pool.apply_async(decodeRange, (task, )))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def decodeParallel(filename, out_filename, jobs, as_array):
+    index = readIndex(filename)
+    print "Parsing %d packets in %d ranges" % \
+          (index['count'], len(index['offsets']))
+
+    if as_array:
+        import numpy
+        out = numpy.lib.format.open_memmap(out_filename, mode='w+',
+                                           dtype=packet_dtype,
+                                           shape=(index['count'], ))
+        pos = 0
+        for packets in decodeRanges(filename, index, jobs, True):
+            out[pos:pos + len(packets)] = packets
+            pos += len(packets)
+        del out
+    else:
+        try:
+            ascii_out = open(out_filename, 'w')
+        except IOError:
+            print "Failed to open ", out_filename, " for writing"
+            exit(-1)
+
+        for text in decodeRanges(filename, index, jobs, False):
+            ascii_out.write(text)
+        ascii_out.close()
+
+    print "Parsed packets:", index['count']
+
+def main():
+    parser = optparse.OptionParser(
+        usage="%prog [options] <protobuf input> <ASCII output>")
+    parser.add_option("-j", "--jobs", type="int", default=1,
+                      help="Decode the trace with a pool of JOBS "
+                      "processes [default: %default]")
+    parser.add_option("--numpy", action="store_true", default=False,
+                      help="Write the packets as a NumPy structured array "
+                      "(.npy) rather than as text")
+
+    (options, args) = parser.parse_args()
+    if len(args) != 2:
+        parser.print_usage()
         exit(-1)
 
+    in_filename, out_filename = args
+
+    # Open the file in read mode
+    proto_in = protolib.openFileRd(in_filename)
+
     # Read the magic number in 4-byte Little Endian
     magic_number = proto_in.read(4)
 
     if magic_number != "gem5":
-        print "Unrecognized file", sys.argv[1]
+        print "Unrecognized file", in_filename
         exit(-1)
 
     print "Parsing packet header"
 
     # Add the packet header
     header = packet_pb2.PacketHeader()
-    protolib.decodeMessage(proto_in, header)
+    reader = protolib.FramedReader(proto_in)
+    reader.decode(header)
 
     print "Object id:", header.obj_id
     print "Tick frequency:", header.tick_freq
 
+    if options.jobs > 1 or options.numpy:
+        proto_in.close()
+        decodeParallel(in_filename, out_filename, options.jobs,
+                       options.numpy)
+        return
+
+    try:
+        ascii_out = open(out_filename, 'w')
+    except IOError:
+        print "Failed to open ", out_filename, " for writing"
+        exit(-1)
+
     print "Parsing packets"
 
     num_packets = 0
     packet = packet_pb2.Packet()
 
     # Decode the packet messages until we hit the end of the file
-    while protolib.decodeMessage(proto_in, packet):
+    while reader.decode(packet):
         num_packets += 1
-        # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
-        cmd = 'r' if packet.cmd == 1 else ('w' if packet.cmd == 4 else 'u')
-        if packet.HasField('pkt_id'):
-            ascii_out.write('%s,' % (packet.pkt_id))
-        if packet.HasField('flags'):
-            ascii_out.write('%s,%s,%s,%s,%s' % (cmd, packet.addr, packet.size,
-                            packet.flags, packet.tick))
-        else:
-            ascii_out.write('%s,%s,%s,%s' % (cmd, packet.addr, packet.size,
-                                           packet.tick))
-        if packet.HasField('pc'):
-            ascii_out.write(',%s\n' % (packet.pc))
-        else:
-            ascii_out.write('\n')
+        ascii_out.write(packetText(packet))
 
     print "Parsed packets:", num_packets
 
@@ -136,7 +136,8 @@ def main():
     # Assume the default tick rate
     header.tick_freq = 1000000000
     header.window_size = 120
-    protolib.encodeMessage(proto_out, header)
+    writer = protolib.FramedWriter(proto_out)
+    writer.encode(header)
 
     print "Creating enum name,value lookup from proto"
     enumValues = {}
@@ -194,11 +195,12 @@ def main():
             if a_dep:
                 dep_record.reg_dep.append(long(a_dep))
 
-        protolib.encodeMessage(proto_out, dep_record)
+        writer.encode(dep_record)
         num_records += 1
 
     print "Converted", num_records, "records."
     # We're done
+    writer.flush()
     ascii_in.close()
     proto_out.close()
 
@@ -106,7 +106,8 @@ def main():
     header.obj_id = "Converted ASCII trace " + sys.argv[1]
     # Assume the default tick rate
     header.tick_freq = 1000000000000
-    protolib.encodeMessage(proto_out, header)
+    writer = protolib.FramedWriter(proto_out)
+    writer.encode(header)
 
     # For each line in the ASCII trace, create a packet message and
     # write it to the encoded output
@@ -118,9 +119,10 @@ def main():
         packet.cmd = 1 if cmd == 'r' else 4
         packet.addr = long(addr)
         packet.size = int(size)
-        protolib.encodeMessage(proto_out, packet)
+        writer.encode(packet)
 
     # We're done
+    writer.flush()
     ascii_in.close()
     proto_out.close()
 
@@ -39,22 +39,23 @@
 
 # Pipeline activity viewer for the O3 CPU model.
 
+import bisect
+import heapq
+import itertools
+import json
 import optparse
 import os
 import sys
-import copy
 
-# Temporary storage for instructions. The queue is filled in out-of-order
-# until it reaches 'max_threshold' number of instructions. It is then
-# sorted out and instructions are printed out until their number drops to
-# 'min_threshold'.
+# Temporary storage for instructions. The instructions are kept in a heap
+# ordered by sequence number, and once it holds more than 'max_threshold'
+# instructions the oldest one is printed for every new one.
 # It is assumed that the instructions are not out of order for more then
-# 'min_threshold' places - otherwise they will appear out of order.
+# 'max_threshold' places - otherwise they will appear out of order.
 insts = {
-    'queue': [] ,         # Instructions to print.
-    'max_threshold':2000, # Instructions are sorted out and printed when
-                          # their number reaches this threshold.
-    'min_threshold':1000, # Printing stops when this number is reached.
+    'queue': [] ,         # Heap of (seq. number, instruction) to print.
+    'max_threshold':2000, # Instructions are printed when their number
+                          # exceeds this threshold.
     'sn_start':0,         # The first instruction seq. number to be printed.
     'sn_stop':0,          # The last instruction seq. number to be printed.
     'tick_start':0,       # The first tick to be printed
@@ -67,8 +68,99 @@ insts = {
     'only_committed':0,   # Set if only committed instructions are printed.
 }
 
-def process_trace(trace, outfile, cycle_time, width, color, timestamps,
-                  committed_only, store_completions, start_tick, stop_tick, start_sn, stop_sn):
+# The trace index (<trace>.idx) holds the offset of every INDEX_STRIDE'th
+# line of the trace, along with the largest tick and fetch seq. number of
+# the lines before it, so that the start of the region of interest can be
+# found without reading the trace up to it.
+INDEX_STRIDE = 1 << 16
+INDEX_VERSION = 1
+
+# Latencies between the pipeline stages kept by the statistics (--stats),
+# in cycles. The latencies are counted in histograms of STATS_BUCKETS
+# power-of-two buckets, the last of which also counts the larger ones.
+LATENCIES = [('fetch', 'decode'), ('decode', 'rename'), ('rename', 'dispatch'),
+             ('dispatch', 'issue'), ('issue', 'complete'),
+             ('complete', 'retire'), ('retire', 'store'), ('fetch', 'retire')]
+STATS_BUCKETS = 16
+
+# A single instruction of the trace
+class Inst(object):
+    __slots__ = ('sn', 'pc', 'upc', 'disasm', 'fetch', 'decode', 'rename',
+                 'dispatch', 'issue', 'complete', 'retire', 'store')
+
+    def __init__(self, sn, pc, upc, disasm, fetch):
+        self.sn = sn
+        self.pc = pc
+        self.upc = upc
+        self.disasm = disasm
+        self.fetch = fetch
+        self.decode = 0
+        self.rename = 0
+        self.dispatch = 0
+        self.issue = 0
+        self.complete = 0
+        self.retire = 0
+        self.store = 0
+
+# Returns the index of the trace, reading it from <trace>.idx if it is up
+# to date and building (and saving) it otherwise
+def read_index(filename):
+    st = os.stat(filename)
+    index_filename = filename + '.idx'
+    try:
+        with open(index_filename) as f:
+            index = json.load(f)
+        if (index['version'] == INDEX_VERSION and
+            index['size'] == st.st_size and index['mtime'] == st.st_mtime):
+            return index
+    except (IOError, OSError, ValueError, KeyError):
+        pass
+
+    ticks = []
+    sns = []
+    offsets = []
+    max_tick = -1
+    max_sn = -1
+    offset = 0
+    with open(filename, 'rb') as trace:
+        for count, line in enumerate(trace):
+            if count % INDEX_STRIDE == 0:
+                ticks.append(max_tick)
+                sns.append(max_sn)
+                offsets.append(offset)
+            offset += len(line)
+            fields = line.split(':')
+            if fields[0] != 'O3PipeView':
+                continue
+            max_tick = max(max_tick, int(fields[2]))
+            if fields[1] == 'fetch':
+                max_sn = max(max_sn, int(fields[5]))
+
+    index = { 'version' : INDEX_VERSION,
+              'size' : st.st_size,
+              'mtime' : st.st_mtime,
+              'ticks' : ticks,
+              'sns' : sns,
+              'offsets' : offsets }
+    try:
+        with open(index_filename, 'w') as f:
+            json.dump(index, f)
+    except (IOError, OSError):
+        # The index is only a cache, e.g. the directory may be read-only
+        pass
+    return index
+
+# Returns the offset of the last indexed line that all the lines reaching
+# start_tick (or fetching start_sn) follow
+def start_offset(index, start_tick, start_sn):
+    if start_tick != 0:
+        i = bisect.bisect_left(index['ticks'], start_tick)
+    else:
+        i = bisect.bisect_left(index['sns'], start_sn)
+    return index['offsets'][i - 1] if i > 0 else 0
+
+def set_range(cycle_time, committed_only, start_tick, stop_tick, start_sn,
+              stop_sn):
     global insts
 
     insts['sn_start'] = start_sn
@@ -77,35 +169,89 @@ def process_trace(trace, outfile, cycle_time, width, color, timestamps,
     insts['tick_stop'] = stop_tick
     insts['tick_drift'] = insts['tick_drift'] * cycle_time
     insts['only_committed'] = committed_only
-    line = None
-    fields = None
 
-    # Skip lines up to the starting tick
-    if start_tick != 0:
-        while True:
-            line = trace.readline()
-            if not line: return
-            fields = line.split(':')
-            if fields[0] != 'O3PipeView': continue
+# Returns the lines of the trace from the first instruction fetch of the
+# region of interest, or None if there is none
+def skip_trace(trace):
+    start_tick = insts['tick_start']
+    start_sn = insts['sn_start']
+
+    # Skip lines up to the starting tick, seeking close to it first
+    if start_tick != 0 or start_sn != 0:
+        trace.seek(start_offset(read_index(trace.name), start_tick, start_sn))
+    lines = iter(trace)
+    for line in lines:
+        fields = line.split(':')
+        if fields[0] != 'O3PipeView': continue
+        if start_tick != 0:
             if int(fields[2]) >= start_tick: break
-    elif start_sn != 0:
-        while True:
-            line = trace.readline()
-            if not line: return
-            fields = line.split(':')
-            if fields[0] != 'O3PipeView': continue
+        elif start_sn != 0:
             if fields[1] == 'fetch' and int(fields[5]) >= start_sn: break
+        else:
+            break
     else:
-        line = trace.readline()
-        if not line: return
-        fields = line.split(':')
+        return None
 
     # Skip lines up to next instruction fetch
     while fields[0] != 'O3PipeView' or fields[1] != 'fetch':
-        line = trace.readline()
-        if not line: return
+        line = next(lines, None)
+        if not line: return None
         fields = line.split(':')
 
+    return itertools.chain([ line ], lines)
+
+# Yields the instructions of the region of interest in trace order, i.e.
+# not sorted by sequence number, along with the instructions around it
+def trace_insts(lines):
+    stop_tick = insts['tick_stop']
+    stop_sn = insts['sn_stop']
+    curr_inst = None
+    for line in lines:
+        fields = line.split(':')
+        if fields[0] != 'O3PipeView':
+            continue
+        if fields[1] == 'fetch':
+            if ((stop_tick > 0 and int(fields[2]) > stop_tick+insts['tick_drift']) or
+                (stop_sn > 0 and int(fields[5]) > (stop_sn+insts['max_threshold']))):
+                return
+            curr_inst = Inst(int(fields[5]), fields[3], fields[4],
+                             ' '.join(fields[6][:-1].split()),
+                             int(fields[2]))
+        elif fields[1] == 'retire':
+            curr_inst.retire = int(fields[2])
+            curr_inst.store = int(fields[4])
+            yield curr_inst
+        else:
+            setattr(curr_inst, fields[1], int(fields[2]))
+
+# Returns whether an instruction is in the region of interest
+def in_range(inst):
+    # As the instructions are processed out of order the main loop starts
+    # earlier then specified by start_sn/tick and finishes later then what
+    # is defined in stop_sn/tick.
+    # Therefore, here we have to filter out instructions that reside out of
+    # the specified boundaries.
+    if (insts['sn_start'] > 0 and inst.sn < insts['sn_start']):
+        return False # earlier then the starting sequence number
+    if (insts['sn_stop'] > 0 and inst.sn > insts['sn_stop']):
+        return False # later then the ending sequence number
+    if (insts['tick_start'] > 0 and inst.fetch < insts['tick_start']):
+        return False # earlier then the starting tick number
+    if (insts['tick_stop'] > 0 and inst.fetch > insts['tick_stop']):
+        return False # later then the ending tick number
+
+    if (insts['only_committed'] != 0 and inst.retire == 0):
+        return False # retire is set to zero if it hasn't been completed
+    return True
+
+def process_trace(trace, outfile, cycle_time, width, color, timestamps,
+                  committed_only, store_completions, start_tick, stop_tick, start_sn, stop_sn):
+    set_range(cycle_time, committed_only, start_tick, stop_tick, start_sn,
+              stop_sn)
+    lines = skip_trace(trace)
+    if lines is None:
+        return
+
     # Print header
     outfile.write('// f = fetch, d = decode, n = rename, p = dispatch, '
                   'i = issue, c = complete, r = retire')
@@ -124,68 +270,137 @@ def process_trace(trace, outfile, cycle_time, width, color, timestamps,
     outfile.write('\n')
 
     # Region of interest
-    curr_inst = {}
-    while True:
-        if fields[0] == 'O3PipeView':
-            curr_inst[fields[1]] = int(fields[2])
-            if fields[1] == 'fetch':
-                if ((stop_tick > 0 and int(fields[2]) > stop_tick+insts['tick_drift']) or
-                    (stop_sn > 0 and int(fields[5]) > (stop_sn+insts['max_threshold']))):
-                    print_insts(outfile, cycle_time, width, color, timestamps, 0)
-                    return
-                (curr_inst['pc'], curr_inst['upc']) = fields[3:5]
-                curr_inst['sn'] = int(fields[5])
-                curr_inst['disasm'] = ' '.join(fields[6][:-1].split())
-            elif fields[1] == 'retire':
-                if curr_inst['retire'] == 0:
-                    curr_inst['disasm'] = '-----' + curr_inst['disasm']
-                if store_completions:
-                    curr_inst[fields[3]] = int(fields[4])
-                queue_inst(outfile, curr_inst, cycle_time, width, color, timestamps, store_completions)
-
-        line = trace.readline()
-        if not line:
-            print_insts(outfile, cycle_time, width, color, timestamps, store_completions, 0)
-            return
-        fields = line.split(':')
+    for inst in trace_insts(lines):
+        queue_inst(outfile, inst, cycle_time, width, color, timestamps, store_completions)
 
+    print_insts(outfile, cycle_time, width, color, timestamps, store_completions, 0)
 
-#Sorts out instructions according to sequence number
-def compare_by_sn(a, b):
-    return cmp(a['sn'], b['sn'])
 
 # Puts new instruction into the print queue.
-# Sorts out and prints instructions when their number reaches threshold value
+# Prints the oldest instruction when their number exceeds the threshold
 def queue_inst(outfile, inst, cycle_time, width, color, timestamps, store_completions):
     global insts
-    l_copy = copy.deepcopy(inst)
-    insts['queue'].append(l_copy)
+    heapq.heappush(insts['queue'], (inst.sn, inst))
     if len(insts['queue']) > insts['max_threshold']:
-        print_insts(outfile, cycle_time, width, color, timestamps, store_completions, insts['min_threshold'])
+        print_insts(outfile, cycle_time, width, color, timestamps, store_completions, insts['max_threshold'])
 
-# Sorts out and prints instructions in print queue
+# Prints instructions in print queue in order of sequence number
 def print_insts(outfile, cycle_time, width, color, timestamps, store_completions, lower_threshold):
     global insts
-    insts['queue'].sort(compare_by_sn)
     while len(insts['queue']) > lower_threshold:
-        print_item=insts['queue'].pop(0)
-        # As the instructions are processed out of order the main loop starts
-        # earlier then specified by start_sn/tick and finishes later then what
-        # is defined in stop_sn/tick.
-        # Therefore, here we have to filter out instructions that reside out of
-        # the specified boundaries.
-        if (insts['sn_start'] > 0 and print_item['sn'] < insts['sn_start']):
-            continue; # earlier then the starting sequence number
-        if (insts['sn_stop'] > 0 and print_item['sn'] > insts['sn_stop']):
-            continue; # later then the ending sequence number
-        if (insts['tick_start'] > 0 and print_item['fetch'] < insts['tick_start']):
-            continue; # earlier then the starting tick number
-        if (insts['tick_stop'] > 0 and print_item['fetch'] > insts['tick_stop']):
-            continue; # later then the ending tick number
-
-        if (insts['only_committed'] != 0 and print_item['retire'] == 0):
-            continue; # retire is set to zero if it hasn't been completed
-        print_inst(outfile,  print_item, cycle_time, width, color, timestamps, store_completions)
+        sn, print_item = heapq.heappop(insts['queue'])
+        if in_range(print_item):
+            print_inst(outfile,  print_item, cycle_time, width, color, timestamps, store_completions)
+
+# Aggregate statistics of the instructions of one PC or opcode
+class InstStats(object):
+    __slots__ = ('insts', 'squashed', 'counts', 'cycles', 'hist')
+
+    def __init__(self):
+        self.insts = 0
+        self.squashed = 0
+        self.counts = [0] * len(LATENCIES)
+        self.cycles = [0] * len(LATENCIES)
+        self.hist = [ [0] * STATS_BUCKETS for l in LATENCIES ]
+
+# Accumulates the statistics of the instructions of the region of interest
+# per PC and per opcode, in a single pass over the trace. The memory used
+# only depends on the number of distinct PCs and opcodes.
+def process_stats(trace, cycle_time, committed_only, start_tick, stop_tick,
+                  start_sn, stop_sn):
+    set_range(cycle_time, committed_only, start_tick, stop_tick, start_sn,
+              stop_sn)
+    groups = { 'pc' : {}, 'opcode' : {} }
+    lines = skip_trace(trace)
+    if lines is None:
+        return groups
+
+    pcs = groups['pc']
+    opcodes = groups['opcode']
+    for inst in trace_insts(lines):
+        if not in_range(inst):
+            continue
+
+        latencies = []
+        for i, (begin, end) in enumerate(LATENCIES):
+            begin_tick = getattr(inst, begin)
+            end_tick = getattr(inst, end)
+            # Stages that were not reached are zero
+            if begin_tick == 0 or end_tick == 0:
+                continue
+            cycles = (end_tick - begin_tick) / cycle_time
+            bucket = min(max(cycles, 0).bit_length(), STATS_BUCKETS - 1)
+            latencies.append((i, cycles, bucket))
+
+        words = inst.disasm.split(None, 1)
+        opcode = words[0] if words else ''
+        for table, key in ((pcs, inst.pc), (opcodes, opcode)):
+            stats = table.get(key)
+            if stats is None:
+                stats = table[key] = InstStats()
+            stats.insts += 1
+            if inst.retire == 0:
+                stats.squashed += 1
+            for i, cycles, bucket in latencies:
+                stats.counts[i] += 1
+                stats.cycles[i] += cycles
+                stats.hist[i][bucket] += 1
+    return groups
+
+def latency_name(latency):
+    return '%s-%s' % latency
+
+# Lower bound in cycles of each bucket of the latency histograms
+def bucket_bounds():
+    return [0] + [ 1 << i for i in range(STATS_BUCKETS - 1) ]
+
+# Writes the statistics as CSV, with one row per group, key and latency
+def write_stats_csv(groups, outfile):
+    import csv
+
+    writer = csv.writer(outfile)
+    writer.writerow(['group', 'key', 'insts', 'squashed', 'latency',
+                     'count', 'cycles'] +
+                    [ 'cycles>=%d' % b for b in bucket_bounds() ])
+    for group in ('pc', 'opcode'):
+        table = groups[group]
+        for key in sorted(table):
+            stats = table[key]
+            for i, latency in enumerate(LATENCIES):
+                writer.writerow([group, key, stats.insts, stats.squashed,
+                                 latency_name(latency), stats.counts[i],
+                                 stats.cycles[i]] + stats.hist[i])
+
+# Writes the statistics as NumPy arrays in a .npz file. For each group
+# (pc and opcode) there are the keys, the counts of instructions and
+# squashed instructions, and the counts, total cycles and histograms of
+# the latencies.
+def write_stats_npz(groups, outfile):
+    import numpy
+
+    arrays = {
+        'latencies' : numpy.array([ latency_name(l) for l in LATENCIES ]),
+        'buckets' : numpy.array(bucket_bounds()),
+    }
+    for group in ('pc', 'opcode'):
+        table = groups[group]
+        keys = sorted(table)
+        records = [ table[key] for key in keys ]
+        arrays[group] = numpy.array(keys, dtype=str)
+        arrays[group + '_insts'] = numpy.array(
+            [ s.insts for s in records ], dtype=numpy.int64)
+        arrays[group + '_squashed'] = numpy.array(
+            [ s.squashed for s in records ], dtype=numpy.int64)
+        arrays[group + '_counts'] = numpy.array(
+            [ s.counts for s in records ],
+            dtype=numpy.int64).reshape(len(keys), len(LATENCIES))
+        arrays[group + '_cycles'] = numpy.array(
+            [ s.cycles for s in records ],
+            dtype=numpy.int64).reshape(len(keys), len(LATENCIES))
+        arrays[group + '_hist'] = numpy.array(
+            [ s.hist for s in records ], dtype=numpy.int64).reshape(
+            len(keys), len(LATENCIES), STATS_BUCKETS)
+    numpy.savez(outfile, **arrays)
 
 # Prints a single instruction
 def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_completions):
@@ -225,18 +440,18 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
     # Print
 
     time_width = width * cycle_time
-    base_tick = (inst['fetch'] / time_width) * time_width
+    base_tick = (inst.fetch / time_width) * time_width
 
     # Find out the time of the last event - it may not
     # be 'retire' if the instruction is not comlpeted.
-    last_event_time = max(inst['fetch'], inst['decode'],inst['rename'],
-                      inst['dispatch'],inst['issue'], inst['complete'], inst['retire'])
+    last_event_time = max(inst.fetch, inst.decode,inst.rename,
+                      inst.dispatch,inst.issue, inst.complete, inst.retire)
     if store_completions:
-        last_event_time = max(last_event_time, inst['store'])
+        last_event_time = max(last_event_time, inst.store)
 
     # Timeline shorter then time_width is printed in compact form where
     # the print continues at the start of the same line.
-    if ((last_event_time - inst['fetch']) < time_width):
+    if ((last_event_time - inst.fetch) < time_width):
         num_lines = 1 # compact form
     else:
         num_lines = ((last_event_time - base_tick) / time_width) + 1
@@ -244,17 +459,18 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
     curr_color = termcap.Normal
 
     # This will visually distinguish completed and abandoned intructions.
-    if inst['retire'] == 0: dot = '=' # abandoned instruction
+    if inst.retire == 0: dot = '=' # abandoned instruction
     else:                   dot = '.' # completed instruction
+    disasm = inst.disasm if inst.retire != 0 else '-----' + inst.disasm
 
     for i in range(num_lines):
         start_tick = base_tick + i * time_width
         end_tick = start_tick + time_width
         if num_lines == 1:  # compact form
-            end_tick += (inst['fetch'] - base_tick)
+            end_tick += (inst.fetch - base_tick)
         events = []
         for stage_idx in range(len(stages)):
-            tick = inst[stages[stage_idx]['name']]
+            tick = getattr(inst, stages[stage_idx]['name'])
             if tick != 0:
                 if tick >= start_tick and tick < end_tick:
                     events.append((tick % time_width,
@@ -267,7 +483,7 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
             curr_color = stages[events[0][2] - 1]['color']
         for event in events:
             if (stages[event[2]]['name'] == 'dispatch' and
-                inst['dispatch'] == inst['issue']):
+                inst.dispatch == inst.issue):
                 continue
             outfile.write(curr_color + dot * ((event[0] / cycle_time) - pos))
             outfile.write(stages[event[2]]['color'] +
@@ -283,12 +499,12 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
                       ']-(' + str(base_tick + i * time_width).rjust(15) + ') ')
         if i == 0:
             outfile.write('%s.%s %s [%s]' % (
-                    inst['pc'].rjust(10),
-                    inst['upc'],
-                    inst['disasm'].ljust(25),
-                    str(inst['sn']).rjust(10)))
+                    inst.pc.rjust(10),
+                    inst.upc,
+                    disasm.ljust(25),
+                    str(inst.sn).rjust(10)))
             if timestamps:
-                outfile.write('  f=%s, r=%s' % (inst['fetch'], inst['retire']))
+                outfile.write('  f=%s, r=%s' % (inst.fetch, inst.retire))
             outfile.write('\n')
         else:
             outfile.write('...'.center(12) + '\n')
@@ -347,6 +563,12 @@ def main():
         '--store_completions',
         action='store_true', default=False,
         help="additionally display store completion ticks (default: '%default')")
+    parser.add_option(
+        '--stats',
+        type='choice', choices=['csv', 'npz'], default=None,
+        help="write per-PC and per-opcode latency histograms, squash counts "
+        "and store completion delays as 'csv' or 'npz' instead of the "
+        "timeline")
     (options, args) = parser.parse_args()
     if len(args) != 1:
         parser.error('incorrect number of arguments')
@@ -362,11 +584,22 @@ def main():
     # Process trace
     print 'Processing trace... ',
     with open(args[0], 'r') as trace:
-        with open(options.outfile, 'w') as out:
-            process_trace(trace, out, options.cycle_time, options.width,
-                          options.color, options.timestamps,
-                          options.only_committed, options.store_completions,
-                          *(tick_range + inst_range))
+        if options.stats:
+            groups = process_stats(trace, options.cycle_time,
+                                   options.only_committed,
+                                   *(tick_range + inst_range))
+            with open(options.outfile, 'wb') as out:
+                if options.stats == 'csv':
+                    write_stats_csv(groups, out)
+                else:
+                    write_stats_npz(groups, out)
+        else:
+            with open(options.outfile, 'w') as out:
+                process_trace(trace, out, options.cycle_time, options.width,
+                              options.color, options.timestamps,
+                              options.only_committed,
+                              options.store_completions,
+                              *(tick_range + inst_range))
     print 'done!'
 
 
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Measure the throughput of the varint framed message reading and
+# writing in protolib: the message at a time functions (decodeMessage,
+# encodeMessage) against FramedReader and FramedWriter.  The messages
+# are random byte strings of the size of typical packet trace
+# messages, with a few longer than 127 bytes, so no protobuf module
+# is needed.
+
+import gzip
+import optparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import protolib
+
+parser = optparse.OptionParser()
+parser.add_option("--messages", type="int", default=1000000,
+                  help="Number of messages [default: %default]")
+parser.add_option("--seed", type="int", default=1,
+                  help="Random seed [default: %default]")
+
+(options, args) = parser.parse_args()
+
+class Message(object):
+    '''Stand-in for a protobuf message holding its serialized bytes'''
+    def __init__(self, data=b''):
+        self.data = data
+
+    def SerializeToString(self):
+        return self.data
+
+    def ParseFromString(self, data):
+        self.data = data
+
+def makeMessages():
+    rng = random.Random(options.seed)
+    pool = os.urandom(1 << 16)
+    messages = []
+    for i in xrange(options.messages):
+        size = rng.randint(12, 30) if rng.random() < 0.99 else \
+               rng.randint(128, 400)
+        start = rng.randint(0, len(pool) - size)
+        messages.append(Message(pool[start:start + size]))
+    return messages
+
+def openWrite(filename):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wb')
+    return open(filename, 'wb')
+
+def writeOld(filename, messages):
+    out = openWrite(filename)
+    for message in messages:
+        protolib.encodeMessage(out, message)
+    out.close()
+
+def writeNew(filename, messages):
+    out = openWrite(filename)
+    writer = protolib.FramedWriter(out)
+    for message in messages:
+        writer.encode(message)
+    writer.flush()
+    out.close()
+
+def readOld(filename):
+    f = protolib.openFileRd(filename)
+    message = Message()
+    result = []
+    while protolib.decodeMessage(f, message):
+        result.append(message.data)
+    f.close()
+    return result
+
+def readNew(filename):
+    f = protolib.openFileRd(filename)
+    result = list(protolib.FramedReader(f))
+    f.close()
+    return result
+
+def timed(func, *args):
+    start = time.time()
+    result = func(*args)
+    return time.time() - start, result
+
+messages = makeMessages()
+data = [ message.data for message in messages ]
+work_dir = tempfile.mkdtemp()
+try:
+    for ext in ('', '.gz'):
+        old = os.path.join(work_dir, 'old.trc' + ext)
+        new = os.path.join(work_dir, 'new.trc' + ext)
+
+        old_write, _ = timed(writeOld, old, messages)
+        new_write, _ = timed(writeNew, new, messages)
+        old_read, old_data = timed(readOld, new)
+        new_read, new_data = timed(readNew, old)
+
+        assert open(old, 'rb').read() == open(new, 'rb').read() or ext
+        assert old_data == data and new_data == data
+
+        kind = 'gzip' if ext else 'plain'
+        for what, old_time, new_time in (('write', old_write, new_write),
+                                         ('read', old_read, new_read)):
+            print "%-5s %-5s %10.0f msg/s old %10.0f msg/s new (%.1fx)" % \
+                  (kind, what, len(messages) / old_time,
+                   len(messages) / new_time, old_time / new_time)
+finally:
+    shutil.rmtree(work_dir)
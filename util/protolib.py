@@ -70,10 +70,18 @@
 # This file is a library of commonly used functions used when interfacing
 # with protobuf python messages. For eg, the decode scripts for different
 # types of proto objects can use the same function to decode a single message
+#
+# FramedReader and FramedWriter read and write the varint length
+# prefixed messages in large blocks rather than a byte at a time,
+# which is a lot faster for large traces.
 
 import gzip
+import mmap
 import struct
 
+# Size of the blocks read and written by FramedReader and FramedWriter
+BLOCK_SIZE = 1 << 20
+
 def openFileRd(in_file):
     """
     This opens the file passed as argument for reading using an appropriate
@@ -124,9 +132,9 @@ def DecodeVarint(in_file):
             else:
                 result &= mask
                 return (result, pos)
-            shift += 7
-            if shift >= 64:
-                raise IOError('Too many bytes when decoding varint.')
+        shift += 7
+        if shift >= 64:
+            raise IOError('Too many bytes when decoding varint.')
 
 def decodeMessage(in_file, message):
     """
@@ -149,13 +157,7 @@ def EncodeVarint(out_file, value):
   google.protobuf.internal.encoder and is only repeated here to
   avoid depending on the internal functions in the library.
   """
-  bits = value & 0x7f
-  value >>= 7
-  while value:
-    out_file.write(struct.pack('<B', 0x80|bits))
-    bits = value & 0x7f
-    value >>= 7
-  out_file.write(struct.pack('<B', bits))
+  out_file.write(encodeVarint(value))
 
 def encodeMessage(out_file, message):
     """
@@ -164,3 +166,174 @@ def encodeMessage(out_file, message):
     out = message.SerializeToString()
     EncodeVarint(out_file, len(out))
     out_file.write(out)
+
+def encodeVarint(value):
+    """
+    Return the bytes of value encoded as a varint.
+    """
+    if value < 0x80:
+        return _small_varints[value]
+
+    out = bytearray()
+    while value >= 0x80:
+        out.append(0x80 | (value & 0x7f))
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+_small_varints = [ struct.pack('<B', i) for i in range(0x80) ]
+
+def decodeVarint(buf, pos):
+    """
+    Decode the varint at pos in the bytearray buf and return its
+    value and the position after it. Raise IndexError if buf ends
+    before the varint does.
+    """
+    result = 0
+    shift = 0
+    while 1:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if not (b & 0x80):
+            return (result & 0xffffffff, pos)
+        shift += 7
+        if shift >= 64:
+            raise IOError('Too many bytes when decoding varint.')
+
+class FramedReader(object):
+    """
+    Reader of the length prefixed messages of a file. The file is read
+    in large blocks, or memory mapped if it is not compressed, from its
+    current position on. Iterating over the reader gives the bytes of
+    each message.
+    """
+    def __init__(self, in_file, block_size=BLOCK_SIZE):
+        self.in_file = in_file
+        self.block_size = block_size
+        self.start = in_file.tell()
+        self._messages = None
+
+    def blocks(self):
+        """
+        Yield the rest of the file in blocks.
+        """
+        if not isinstance(self.in_file, gzip.GzipFile):
+            try:
+                data = mmap.mmap(self.in_file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+            except (AttributeError, ValueError, EnvironmentError):
+                # Not a real file, or an empty one
+                data = None
+
+            if data is not None:
+                try:
+                    for start in xrange(self.start, len(data),
+                                        self.block_size):
+                        yield data[start:start + self.block_size]
+                finally:
+                    data.close()
+                return
+
+        while 1:
+            data = self.in_file.read(self.block_size)
+            if not data:
+                break
+            yield data
+
+    def __iter__(self):
+        buf = bytearray()
+        pos = 0
+        for block in self.blocks():
+            # Keep the part of the last message that was in the last
+            # block
+            buf = buf[pos:]
+            buf += block
+            view = memoryview(buf)
+            end = len(buf)
+            pos = 0
+            while pos < end:
+                size = buf[pos]
+                start = pos + 1
+                if size & 0x80:
+                    try:
+                        size, start = decodeVarint(buf, pos)
+                    except IndexError:
+                        break
+                if start + size > end:
+                    break
+                pos = start + size
+                yield view[start:pos].tobytes()
+
+    def offsets(self):
+        """
+        Yield the offset in the file of the length of each message,
+        and finally the offset of the end of the last message, without
+        copying the messages.
+        """
+        buf = bytearray()
+        pos = 0
+        # Offset in the file of the start of buf
+        base = self.start
+        for block in self.blocks():
+            base += pos
+            buf = buf[pos:]
+            buf += block
+            end = len(buf)
+            pos = 0
+            while pos < end:
+                size = buf[pos]
+                start = pos + 1
+                if size & 0x80:
+                    try:
+                        size, start = decodeVarint(buf, pos)
+                    except IndexError:
+                        break
+                if start + size > end:
+                    break
+                yield base + pos
+                pos = start + size
+        yield base + pos
+
+    def decode(self, message):
+        """
+        Decode the next message of the file into message. Return False
+        if there are no more messages.
+        """
+        if self._messages is None:
+            self._messages = iter(self)
+        try:
+            message.ParseFromString(next(self._messages))
+            return True
+        except StopIteration:
+            return False
+
+class FramedWriter(object):
+    """
+    Writer of length prefixed messages that writes them to a file in
+    large blocks. The writer must be flushed when done.
+    """
+    def __init__(self, out_file, block_size=BLOCK_SIZE):
+        self.out_file = out_file
+        self.block_size = block_size
+        self.buf = bytearray()
+
+    def write(self, data):
+        """
+        Write the bytes of a message with its length prepended.
+        """
+        buf = self.buf
+        buf += encodeVarint(len(data))
+        buf += data
+        if len(buf) >= self.block_size:
+            self.flush()
+
+    def encode(self, message):
+        """
+        Encode a message with its length prepended.
+        """
+        self.write(message.SerializeToString())
+
+    def flush(self):
+        self.out_file.write(bytes(self.buf))
+        self.buf = bytearray()
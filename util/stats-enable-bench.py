@@ -0,0 +1,140 @@
+#! /usr/bin/env python
+
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Benchmark the steps of m5.stats.enable() that scale with the
+# number of stats: wrapping each registered stat in the Python class
+# for its type, and the sort by name of the old enable().  The registry is
+# synthetic and the SWIG downcasts are modelled by Python functions,
+# so the script runs with a plain Python interpreter and doesn't
+# need a gem5 build.  The old wrapping tries each downcast in turn,
+# the new one picks it from the stat's type tag.  The old enable()
+# also sorted the stats with a cmp function returning a bool, which
+# left them in registration order; the new one keeps that order
+# without sorting, so the old sort is timed on its own.
+
+import optparse
+import random
+import sys
+import time
+
+parser = optparse.OptionParser()
+
+parser.add_option("-n", "--stats", type="int", default=1000000,
+                  help="Number of stats in the registry [default: %default]")
+parser.add_option("-r", "--repeat", type="int", default=3,
+                  help="Repetitions, the best is reported "
+                  "[default: %default]")
+parser.add_option("-s", "--seed", type="int", default=1,
+                  help="Random seed [default: %default]")
+
+(options, args) = parser.parse_args()
+
+if args:
+    print "Error: script doesn't take any positional arguments"
+    sys.exit(1)
+
+kinds = ('Scalar', 'Vector', 'Dist', 'VectorDist', 'Vector2d',
+         'Formula', 'SparseHist')
+
+class Info(object):
+    __slots__ = ('name', 'kind')
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+
+    def infoType(self):
+        return self.kind
+
+def makeCast(kind):
+    def cast(info):
+        if info.kind == kind:
+            return info
+        return None
+    return cast
+
+casts = dict((kind, makeCast(kind)) for kind in xrange(len(kinds)))
+
+def makeRegistry():
+    random.seed(options.seed)
+    leaves = [ 'stat%d' % i for i in xrange(200) ]
+    weights = [ 0, 0, 0, 0, 0, 1, 1, 2, 3, 5, 6 ]
+    stats = []
+    cpu = 0
+    while len(stats) < options.stats:
+        for unit in ('fetch', 'decode', 'iew', 'commit', 'icache',
+                     'dcache', 'l2cache', 'itb', 'dtb'):
+            for leaf in leaves:
+                name = 'system.cpu%d.%s.%s' % (cpu, unit, leaf)
+                stats.append(Info(name, random.choice(weights)))
+        cpu += 1
+    del stats[options.stats:]
+    random.shuffle(stats)
+    return stats
+
+def wrapOld(registry):
+    cast_list = casts.values()
+    wrapped = []
+    for stat in registry:
+        for cast in cast_list:
+            val = cast(stat)
+            if val is not None:
+                wrapped.append(val)
+                break
+    return wrapped
+
+def wrapNew(registry):
+    wrapped = []
+    for stat in registry:
+        wrapped.append(casts[stat.infoType()](stat))
+    return wrapped
+
+def sortOld(stats):
+    def less(stat1, stat2):
+        v1 = stat1.name.split('.')
+        v2 = stat2.name.split('.')
+        return v1 < v2
+    stats.sort(less)
+
+def bench(func, registry):
+    best = None
+    for i in xrange(options.repeat):
+        stats = list(registry)
+        start = time.time()
+        func(stats)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+registry = makeRegistry()
+print "Enabling a synthetic registry of %d stats" % len(registry)
+
+for name, func in (("wrap, try each cast", wrapOld),
+                   ("wrap, type tag", wrapNew),
+                   ("sort, bool cmp (old)", sortOld)):
+    elapsed = bench(func, registry)
+    print "%-22s %8.3fs %12.0f stats/s" % \
+          (name, elapsed, len(registry) / elapsed)
@@ -0,0 +1,124 @@
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Reader for the columnar binary stats output (--stats-columnar).
+#
+# The file holds a header with the column names followed by one row
+# of float64 values per stats dump, the first column being the tick
+# of the dump.  The rows are memory mapped as a 2D NumPy array, so
+# opening even a very large file is cheap and only the parts of it
+# that are used get read.  See src/base/stats/columnar.hh for the
+# layout.
+
+import struct
+
+import numpy
+
+MAGIC = b'gem5cst\0'
+VERSION = 1
+
+class ColumnarError(Exception):
+    pass
+
+class ColumnarStats(object):
+    def __init__(self, filename):
+        self.filename = filename
+
+        with open(filename, 'rb') as f:
+            fixed = f.read(24)
+            if len(fixed) == 0:
+                # Nothing was dumped
+                self.names = []
+                self.data = numpy.zeros((0, 0))
+                self._index = {}
+                return
+
+            if len(fixed) < 24 or fixed[:8] != MAGIC:
+                raise ColumnarError("%s is not a columnar stats file" %
+                                    filename)
+
+            # The file is in the byte order of the host that wrote it
+            for order in '<>':
+                version, count, offset = struct.unpack(order + 'IIQ',
+                                                       fixed[8:])
+                if version == VERSION:
+                    break
+            else:
+                raise ColumnarError("%s: unsupported version" % filename)
+
+            names = f.read(offset - 24).split(b'\0')[:count]
+            self.names = [ name.decode('ascii') for name in names ]
+
+        dtype = numpy.dtype(order + 'f8')
+        self.data = numpy.memmap(filename, dtype=dtype, mode='r',
+                                 offset=offset)
+        rows = len(self.data) // count
+        self.data = self.data[:rows * count].reshape(rows, count)
+        self._index = dict((name, i) for i, name in enumerate(self.names))
+
+    def __len__(self):
+        '''Number of dumps in the file'''
+        return self.data.shape[0]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    @property
+    def ticks(self):
+        return self.data[:, 0]
+
+    def index(self, name):
+        '''Column of the stat called name'''
+        try:
+            return self._index[name]
+        except KeyError:
+            raise KeyError("no stat called %s in %s" % (name, self.filename))
+
+    def column(self, name):
+        '''Values of the stat called name, one per dump'''
+        return self.data[:, self.index(name)]
+
+    def columns(self, names):
+        '''Values of the stats in names, one row per dump'''
+        return self.data[:, [ self.index(name) for name in names ]]
+
+    def window(self, i):
+        '''Dictionary of all the stat values of the i'th dump'''
+        return dict(zip(self.names, self.data[i]))
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: %s <file> [stat ...]" % sys.argv[0])
+
+    stats = ColumnarStats(sys.argv[1])
+    names = sys.argv[2:]
+    if not names:
+        print("%d columns, %d dumps" % (len(stats.names), len(stats)))
+        sys.exit(0)
+
+    print(' '.join([ 'tick' ] + names))
+    values = stats.columns([ 'tick' ] + names)
+    for row in values:
+        print(' '.join('%.17g' % value for value in row))
@@ -26,7 +26,9 @@
 #
 # Authors: Nathan Binkert
 
-import MySQLdb, re, string
+import re, string
+
+import numpy
 
 def statcmp(a, b):
     v1 = a.split('.')
@@ -106,18 +108,20 @@ class Node(object):
         return self.name
 
 class Result(object):
-    def __init__(self, x, y):
-        self.data = {}
-        self.x = x
-        self.y = y
+    '''The data of a stat as a dense NumPy array indexed by run, x and y.
+    Indexing with a run id gives the x by y array of that run.'''
+    def __init__(self, runs, array):
+        self.runs = runs
+        self.array = array
+        self.index = dict((run, i) for i, run in enumerate(runs))
+        self.x = array.shape[1]
+        self.y = array.shape[2]
 
     def __contains__(self, run):
-        return run in self.data
+        return run in self.index
 
     def __getitem__(self, run):
-        if run not in self.data:
-            self.data[run] = [ [ 0.0 ] * self.y for i in xrange(self.x) ]
-        return self.data[run]
+        return self.array[self.index[run]]
 
 class Database(object):
     def __init__(self):
@@ -147,7 +151,19 @@ class Database(object):
         self.runs = None
         self.ticks = None
         self.method = 'sum'
-        self._method = type(self).sum
+
+        # Number of rows fetched at a time by data()
+        self.chunk_size = 65536
+
+    # Placeholder for the parameters of a query
+    param = '%s'
+
+    def inClause(self, column, values):
+        '''Return the SQL condition and parameters selecting the rows
+        where column is any of values'''
+        values = list(values)
+        sql = '%s in (%s)' % (column, ','.join([ self.param ] * len(values)))
+        return sql, values
 
     def get(self, job, stat, system=None):
         run = self.allRunNames.get(str(job), None)
@@ -170,8 +186,8 @@ class Database(object):
 
         return None
 
-    def query(self, sql):
-        self.cursor.execute(sql)
+    def query(self, sql, params=()):
+        self.cursor.execute(sql, params)
 
     def update_dict(self, dict):
         dict.update(self.stattop)
@@ -197,18 +213,21 @@ class Database(object):
         self.statdict[statname] = stat
         self.statlist.append(statname)
 
-    def connect(self):
-        # connect
+    def open(self):
+        import MySQLdb
         self.thedb = MySQLdb.connect(db=self.db,
                                      host=self.host,
                                      user=self.user,
                                      passwd=self.passwd)
 
+    def connect(self):
+        # connect
+        self.open()
+
         # create a cursor
         self.cursor = self.thedb.cursor()
 
-        self.query('''select rn_id,rn_name,rn_sample,rn_user,rn_project
-                   from runs''')
+        self.query('select rn_id,rn_name,rn_user,rn_project from runs')
         for result in self.cursor.fetchall():
             run = RunData(result);
             self.allRuns.append(run)
@@ -225,7 +244,9 @@ class Database(object):
 
         self.query('select * from formulas')
         for id,formula in self.cursor.fetchall():
-            self.allFormulas[int(id)] = formula.tostring()
+            if hasattr(formula, 'tostring'):
+                formula = formula.tostring()
+            self.allFormulas[int(id)] = str(formula)
 
         StatData.db = self
         self.query('select * from stats')
@@ -252,35 +273,18 @@ class Database(object):
     def listTicks(self, runs=None):
         print "tick"
         print "----------------------------------------"
-        sql = 'select distinct dt_tick from data where dt_stat=1180 and ('
-        if runs != None:
-            first = True
-            for run in runs:
-               if first:
-            #       sql += ' where'
-                   first = False
-               else:
-                   sql += ' or'
-               sql += ' dt_run=%s' % run.run
-            sql += ')'
-        self.query(sql)
-        for r in self.cursor.fetchall():
-            print r[0]
+        for tick in self.retTicks(runs):
+            print tick
 
     # Name: retTicks
     # Desc: Prints all samples for a given run
     def retTicks(self, runs=None):
-        sql = 'select distinct dt_tick from data where dt_stat=1180 and ('
+        sql = 'select distinct dt_tick from data where dt_stat=1180'
+        params = []
         if runs != None:
-            first = True
-            for run in runs:
-               if first:
-                   first = False
-               else:
-                   sql += ' or'
-               sql += ' dt_run=%s' % run.run
-            sql += ')'
-        self.query(sql)
+            cond, params = self.inClause('dt_run', [ run.run for run in runs ])
+            sql += ' and ' + cond
+        self.query(sql, params)
         ret = []
         for r in self.cursor.fetchall():
             ret.append(r[0])
@@ -343,7 +347,9 @@ class Database(object):
     #########################################
     # get the data
     #
-    def query(self, op, stat, ticks, group=False):
+    def statQuery(self, op, stat, ticks, group=False):
+        '''Return the SQL query and its parameters combining the data
+        of stat (or of a list of stats) with op'''
         sql = 'select '
         sql += 'dt_stat as stat, '
         sql += 'dt_run as run, '
@@ -355,40 +361,41 @@ class Database(object):
         sql += 'from data '
         sql += 'where '
 
-        if isinstance(stat, list):
-            val = ' or '.join([ 'dt_stat=%d' % s.stat for s in stat ])
-            sql += ' (%s)' % val
-        else:
-            sql += ' dt_stat=%d' % stat.stat
+        if not isinstance(stat, list):
+            stat = [ stat ]
+        cond, params = self.inClause('dt_stat', [ s.stat for s in stat ])
+        sql += cond
 
         if self.runs != None and len(self.runs):
-            val = ' or '.join([ 'dt_run=%d' % r for r in self.runs ])
-            sql += ' and (%s)' % val
+            cond, values = self.inClause('dt_run', self.runs)
+            sql += ' and ' + cond
+            params += values
 
         if ticks != None and len(ticks):
-            val = ' or '.join([ 'dt_tick=%d' % s for s in ticks ])
-            sql += ' and (%s)' % val
+            cond, values = self.inClause('dt_tick', ticks)
+            sql += ' and ' + cond
+            params += values
 
         sql += ' group by dt_stat,dt_run,dt_x,dt_y'
         if group:
             sql += ',dt_tick'
-        return sql
+        return sql, params
 
     # Name: sum
     # Desc: given a run, a stat and an array of samples, total the samples
     def sum(self, *args, **kwargs):
-        return self.query('sum', *args, **kwargs)
+        return self.statQuery('sum', *args, **kwargs)
 
     # Name: avg
     # Desc: given a run, a stat and an array of samples, average the samples
-    def avg(self, stat, ticks):
-        return self.query('avg', *args, **kwargs)
+    def avg(self, *args, **kwargs):
+        return self.statQuery('avg', *args, **kwargs)
 
     # Name: stdev
     # Desc: given a run, a stat and an array of samples, get the standard
     #       deviation
-    def stdev(self, stat, ticks):
-        return self.query('stddev', *args, **kwargs)
+    def stdev(self, *args, **kwargs):
+        return self.statQuery('stddev', *args, **kwargs)
 
     def __setattr__(self, attr, value):
         super(Database, self).__setattr__(attr, value)
@@ -404,33 +411,108 @@ class Database(object):
         else:
             raise AttributeError, "can only set get to: sum | avg | stdev"
 
+    def fetchRows(self):
+        '''Gather the (stat, run, x, y, data) rows of the last query a
+        chunk at a time into an array'''
+        chunks = []
+        while True:
+            rows = self.cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            chunks.append(numpy.array(rows, dtype=numpy.float64))
+
+        if not chunks:
+            return numpy.zeros((0, 5))
+        return numpy.concatenate(chunks)
+
     def data(self, stat, ticks=None):
         if ticks is None:
             ticks = self.ticks
-        sql = self._method(self, stat, ticks)
-        self.query(sql)
-
-        runs = {}
-        xmax = 0
-        ymax = 0
-        for x in self.cursor.fetchall():
-            data = Data(x)
-            if not runs.has_key(data.run):
-                runs[data.run] = {}
-            if not runs[data.run].has_key(data.x):
-                runs[data.run][data.x] = {}
-
-            xmax = max(xmax, data.x)
-            ymax = max(ymax, data.y)
-            runs[data.run][data.x][data.y] = data.data
-
-        results = Result(xmax + 1, ymax + 1)
-        for run,data in runs.iteritems():
-            result = results[run]
-            for x,ydata in data.iteritems():
-                for y,data in ydata.iteritems():
-                    result[x][y] = data
-        return results
+        sql, params = self._method(stat, ticks)
+        self.query(sql, params)
+        return self.result(self.fetchRows())
+
+    def prefetch(self, stats):
+        '''Load the data of stats, and of the stats the formulas among
+        them are computed from, with a single query and cache it in the
+        stats so that getting them for each job needs no more queries'''
+        from info import ProxyError, statistics
+        if not isinstance(stats, (list, tuple)):
+            stats = [ stats ]
+
+        fetch = {}
+        for stat in stats:
+            try:
+                for leaf in statistics(stat):
+                    if 'data' not in leaf.__dict__:
+                        fetch[leaf.stat] = leaf
+            except ProxyError:
+                pass
+
+        # Stats sampled at other ticks need a query of their own
+        groups = {}
+        for leaf in fetch.itervalues():
+            ticks = leaf.ticks
+            if ticks is None:
+                ticks = self.ticks
+            key = ticks and tuple(ticks) or None
+            groups.setdefault(key, []).append(leaf)
+
+        for ticks, leaves in groups.iteritems():
+            sql, params = self._method(leaves, ticks and list(ticks))
+            self.query(sql, params)
+            rows = self.fetchRows()
+            for leaf in leaves:
+                leaf.setData(self.result(rows[rows[:, 0] == leaf.stat]))
+
+    def result(self, rows):
+        '''Build the Result of the rows of a stat'''
+        if not len(rows):
+            return Result([], numpy.zeros((0, 1, 1)))
+
+        runs, run_index = numpy.unique(rows[:, 1].astype(int),
+                                       return_inverse=True)
+        x = rows[:, 2].astype(int)
+        y = rows[:, 3].astype(int)
+
+        array = numpy.zeros((len(runs), x.max() + 1, y.max() + 1))
+        array[run_index, x, y] = rows[:, 4]
+        return Result([ int(run) for run in runs ], array)
 
     def __getitem__(self, key):
         return self.stattop[key]
+
+# Aggregate computing the (population) standard deviation like the
+# MySQL stddev() function
+class StdDev(object):
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.squares = 0.0
+
+    def step(self, value):
+        if value is not None:
+            self.count += 1
+            self.sum += value
+            self.squares += value * value
+
+    def finalize(self):
+        if not self.count:
+            return None
+        mean = self.sum / self.count
+        return max(self.squares / self.count - mean * mean, 0.0) ** 0.5
+
+class SQLiteDatabase(Database):
+    '''Database stored in a SQLite file (see dbinit.SQLiteDB) instead
+    of on a MySQL server'''
+
+    param = '?'
+
+    def __init__(self, filename=None):
+        super(SQLiteDatabase, self).__init__()
+        self.filename = filename
+
+    def open(self):
+        import sqlite3
+        self.thedb = sqlite3.connect(self.filename or self.db)
+        self.thedb.create_aggregate('stddev', 1, StdDev)
@@ -26,8 +26,6 @@
 #
 # Authors: Nathan Binkert
 
-import MySQLdb
-
 class MyDB(object):
     def __init__(self, options):
         self.name = options.db
@@ -38,12 +36,14 @@ class MyDB(object):
         self.cursor = None
 
     def admin(self):
+        import MySQLdb
         self.close()
         self.mydb = MySQLdb.connect(db='mysql', host=self.host, user=self.user,
                                     passwd=self.passwd)
         self.cursor = self.mydb.cursor()
 
     def connect(self):
+        import MySQLdb
         self.close()
         self.mydb = MySQLdb.connect(db=self.name, host=self.host,
                                     user=self.user, passwd=self.passwd)
@@ -383,3 +383,212 @@ class MyDB(object):
         FROM event_names
         LEFT JOIN events ON en_id=ev_event
         WHERE ev_event IS NULL''')
+
+class SQLiteDB(object):
+    '''Stats database kept in a SQLite file, with the same tables as
+    MyDB.  There is no server, so admin(), create() and drop() only
+    deal with the file.'''
+
+    def __init__(self, filename):
+        self.name = filename
+        self.mydb = None
+        self.cursor = None
+
+    def admin(self):
+        self.close()
+
+    def connect(self):
+        import sqlite3
+        self.close()
+        self.mydb = sqlite3.connect(self.name)
+        self.cursor = self.mydb.cursor()
+
+    def close(self):
+        if self.mydb is not None:
+            self.mydb.commit()
+            self.mydb.close()
+            self.mydb = None
+        self.cursor = None
+
+    def query(self, sql, params=()):
+        self.cursor.execute(sql, params)
+
+    def drop(self):
+        import os
+        if os.path.exists(self.name):
+            os.remove(self.name)
+
+    def create(self):
+        pass
+
+    def populate(self):
+        # The tables are the ones of MyDB.populate(), see there for the
+        # meaning of the columns.
+        self.query('''
+        CREATE TABLE runs(
+            rn_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+            rn_name     VARCHAR(200)    NOT NULL,
+            rn_sample   VARCHAR(32)     NOT NULL,
+            rn_user     VARCHAR(32)     NOT NULL,
+            rn_project  VARCHAR(100)    NOT NULL,
+            rn_date     TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            rn_expire   TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (rn_name,rn_sample)
+        )''')
+
+        self.query('''
+        CREATE TABLE stats(
+            st_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+            st_name     VARCHAR(255)    NOT NULL,
+            st_descr    TEXT            NOT NULL,
+            st_type     TEXT            NOT NULL CHECK (st_type IN
+                ('SCALAR', 'VECTOR', 'DIST', 'VECTORDIST', 'VECTOR2D',
+                 'FORMULA')),
+            st_print    BOOL            NOT NULL,
+            st_prereq   INTEGER         NOT NULL,
+            st_prec     INTEGER         NOT NULL,
+            st_nozero   BOOL            NOT NULL,
+            st_nonan    BOOL            NOT NULL,
+            st_total    BOOL            NOT NULL,
+            st_pdf      BOOL            NOT NULL,
+            st_cdf      BOOL            NOT NULL,
+            st_min      DOUBLE          NOT NULL,
+            st_max      DOUBLE          NOT NULL,
+            st_bktsize  DOUBLE          NOT NULL,
+            st_size     INTEGER         NOT NULL,
+            UNIQUE (st_name)
+        )''')
+
+        # Lookups are by stat, then run, then tick, which the unique
+        # index doesn't cover as it has x and y in between.
+        self.query('''
+        CREATE TABLE data(
+            dt_stat     INTEGER         NOT NULL,
+            dt_x        INTEGER         NOT NULL,
+            dt_y        INTEGER         NOT NULL,
+            dt_run      INTEGER         NOT NULL,
+            dt_tick     INTEGER         NOT NULL,
+            dt_data     DOUBLE          NOT NULL,
+            UNIQUE (dt_stat,dt_x,dt_y,dt_run,dt_tick)
+        )''')
+        self.query('CREATE INDEX data_stat_run_tick ON data '
+                   '(dt_stat,dt_run,dt_tick)')
+        self.query('CREATE INDEX data_run ON data (dt_run)')
+
+        self.query('''
+        CREATE TABLE subdata(
+            sd_stat     INTEGER         NOT NULL,
+            sd_x        INTEGER         NOT NULL,
+            sd_y        INTEGER         NOT NULL,
+            sd_name     VARCHAR(255)    NOT NULL,
+            sd_descr    TEXT,
+            UNIQUE (sd_stat,sd_x,sd_y)
+        )''')
+
+        self.query('''
+        CREATE TABLE formulas(
+            fm_stat     INTEGER PRIMARY KEY,
+            fm_formula  BLOB            NOT NULL
+        )''')
+
+        self.query('''
+        CREATE TABLE formula_ref(
+            fr_stat     INTEGER         NOT NULL,
+            fr_run      INTEGER         NOT NULL,
+            UNIQUE (fr_stat,fr_run)
+        )''')
+        self.query('CREATE INDEX formula_ref_run ON formula_ref (fr_run)')
+
+        self.query('''
+        CREATE TABLE events(
+            ev_event    INTEGER         NOT NULL,
+            ev_run      INTEGER         NOT NULL,
+            ev_tick     INTEGER         NOT NULL,
+            UNIQUE(ev_event,ev_run,ev_tick)
+        )''')
+        self.query('CREATE INDEX events_run ON events (ev_run)')
+        self.query('CREATE INDEX events_tick ON events (ev_tick)')
+
+        self.query('''
+        CREATE TABLE event_names(
+            en_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+            en_name     VARCHAR(255)    NOT NULL,
+            UNIQUE (en_name)
+        )''')
+
+    def clean(self):
+        self.query('''
+        DELETE FROM data
+        WHERE dt_run NOT IN (SELECT rn_id FROM runs)''')
+
+        self.query('''
+        DELETE FROM formula_ref
+        WHERE fr_run NOT IN (SELECT rn_id FROM runs)''')
+
+        self.query('''
+        DELETE FROM formulas
+        WHERE fm_stat NOT IN (SELECT fr_stat FROM formula_ref)''')
+
+        self.query('''
+        DELETE FROM stats
+        WHERE st_id NOT IN (SELECT DISTINCT dt_stat FROM data)''')
+
+        self.query('''
+        DELETE FROM subdata
+        WHERE sd_stat NOT IN (SELECT DISTINCT dt_stat FROM data)''')
+
+        self.query('''
+        DELETE FROM events
+        WHERE ev_run NOT IN (SELECT rn_id FROM runs)''')
+
+        self.query('''
+        DELETE FROM event_names
+        WHERE en_id NOT IN (SELECT DISTINCT ev_event FROM events)''')
+
+    def insertRun(self, name, user, project='', sample='0'):
+        '''Add a run and return its id.  A run with the same name and
+        sample is replaced: it keeps its id, but loses its data.'''
+        self.query('SELECT rn_id FROM runs WHERE rn_name=? AND rn_sample=?',
+                   (name, sample))
+        row = self.cursor.fetchone()
+        if row is None:
+            self.query('INSERT INTO runs '
+                       '(rn_name,rn_sample,rn_user,rn_project) '
+                       'VALUES (?,?,?,?)', (name, sample, user, project))
+            return self.cursor.lastrowid
+
+        run = row[0]
+        self.query('UPDATE runs SET rn_user=?,rn_project=?,'
+                   'rn_date=CURRENT_TIMESTAMP WHERE rn_id=?',
+                   (user, project, run))
+        self.query('DELETE FROM data WHERE dt_run=?', (run, ))
+        return run
+
+    def statIds(self, stats):
+        '''Return a dictionary of the ids of the scalar stats in
+        stats, a dictionary from their names to their descriptions,
+        adding the ones that aren't in the database yet'''
+        self.query('SELECT st_name,st_id FROM stats')
+        ids = dict(self.cursor.fetchall())
+
+        new = [ (name, desc) for name, desc in stats.iteritems()
+                if name not in ids ]
+        if new:
+            self.cursor.executemany('''
+            INSERT INTO stats (st_name,st_descr,st_type,st_print,st_prereq,
+                               st_prec,st_nozero,st_nonan,st_total,st_pdf,
+                               st_cdf,st_min,st_max,st_bktsize,st_size)
+            VALUES (?,?,'SCALAR',1,0,-1,0,0,0,0,0,0,0,0,0)''', new)
+            self.query('SELECT st_name,st_id FROM stats')
+            ids = dict(self.cursor.fetchall())
+
+        return ids
+
+    def insertData(self, rows):
+        '''Add the (stat, x, y, run, tick, data) rows in rows'''
+        self.cursor.executemany('INSERT OR REPLACE INTO data '
+                                '(dt_stat,dt_x,dt_y,dt_run,dt_tick,dt_data) '
+                                'VALUES (?,?,?,?,?,?)', rows)
+
+    def commit(self):
+        self.mydb.commit()
@@ -29,6 +29,8 @@
 from __future__ import division
 import operator, re, types
 
+import numpy
+
 class ProxyError(Exception):
     pass
 
@@ -52,19 +54,27 @@ def value(stat, *args):
     stat = unproxy(stat)
     return stat.__value__(*args)
 
-def values(stat, run):
+def array(stat, run):
+    '''Value of stat in run as a NumPy array, or a NumPy scalar for
+    scalar stats, None if there is no data'''
     stat = unproxy(stat)
-    result = []
-    for i in xrange(len(stat)):
-        val = value(stat, run, i)
-        if val is None:
-            return None
-        result.append(val)
-    return result
+    return stat.__data__(run)
+
+def values(stat, run):
+    result = array(stat, run)
+    if result is None or numpy.isnan(result).any():
+        return None
+    return result.tolist()
 
 def total(stat, run):
     return sum(values(stat, run))
 
+def statistics(stat):
+    '''The stats in the database that the value of stat is computed
+    from'''
+    stat = unproxy(stat)
+    return stat.__statistics__()
+
 def len(stat):
     stat = unproxy(stat)
     return stat.__len__()
@@ -75,6 +85,21 @@ class Value(object):
     def __vector__(self):
         raise AttributeError, "must define __vector__ for %s" % (type (self))
 
+    def __data__(self, run):
+        if scalar(self):
+            val = value(self, run)
+            if val is None:
+                return None
+            return numpy.float64(val)
+
+        vals = [ value(self, run, i) for i in xrange(len(self)) ]
+        if None in vals:
+            return None
+        return numpy.array(vals, dtype=numpy.float64)
+
+    def __statistics__(self):
+        return []
+
     def __add__(self, other):
         return BinaryProxy(operator.__add__, self, other)
     def __sub__(self, other):
@@ -132,6 +157,15 @@ class VectorItemProxy(Value):
     def __value__(self, run):
         return value(self.proxy, run, self.index)
 
+    def __data__(self, run):
+        val = array(self.proxy, run)
+        if val is None:
+            return None
+        return val[self.index]
+
+    def __statistics__(self):
+        return statistics(self.proxy)
+
 class Vector(Value):
     def __scalar__(self):
         return False
@@ -150,6 +184,8 @@ class ScalarConstant(Scalar):
         self.constant = constant
     def __value__(self, run):
         return self.constant
+    def __data__(self, run):
+        return numpy.float64(self.constant)
     def __str__(self):
         return str(self.constant)
 
@@ -158,6 +194,8 @@ class VectorConstant(Vector):
         self.constant = constant
     def __value__(self, run, index):
         return self.constant[index]
+    def __data__(self, run):
+        return numpy.array(self.constant, dtype=numpy.float64)
     def __len__(self):
         return len(self.constant)
     def __str__(self):
@@ -176,12 +214,14 @@ def WrapValue(value):
 class Statistic(object):
     def __getattr__(self, attr):
         if attr in ('data', 'x', 'y'):
-            result = self.source.data(self, self.ticks)
-            self.data = result.data
-            self.x = result.x
-            self.y = result.y
+            self.setData(self.source.data(self, self.ticks))
         return super(Statistic, self).__getattribute__(attr)
 
+    def setData(self, result):
+        self.data = result
+        self.x = result.x
+        self.y = result.y
+
     def __setattr__(self, attr, value):
         if attr == 'stat':
             raise AttributeError, '%s is read only' % stat
@@ -207,6 +247,36 @@ class ValueProxy(Value):
                 return self.__vectorlen__
         return super(ValueProxy, self).__getattribute__(attr)
 
+    # The values are computed element-wise on whole arrays by
+    # __compute__(), a NaN element stands for a missing value.  The
+    # array of the last run is kept, as the elements of a vector are
+    # usually read one at a time; it is computed again once the data
+    # of the stats it is computed from has been replaced.
+    def __data__(self, run):
+        cache = self.__dict__.get('_cache')
+        if cache is not None and cache[0] == run:
+            sources = [ stat.__dict__.get('data')
+                        for stat in statistics(self) ]
+            if all(new is old for new, old in zip(sources, cache[1])):
+                return cache[2]
+
+        val = self.__compute__(run)
+        sources = [ stat.__dict__.get('data') for stat in statistics(self) ]
+        self._cache = (run, sources, val)
+        return val
+
+    def __scalarvalue__(self, run):
+        val = array(self, run)
+        if val is None or numpy.isnan(val):
+            return None
+        return float(val)
+
+    def __vectorvalue__(self, run, index):
+        val = array(self, run)
+        if val is None or numpy.isnan(val[index]):
+            return None
+        return float(val[index])
+
 class UnaryProxy(ValueProxy):
     def __init__(self, op, arg):
         self.op = op
@@ -218,17 +288,14 @@ class UnaryProxy(ValueProxy):
     def __vector__(self):
         return vector(self.arg)
 
-    def __scalarvalue__(self, run):
-        val = value(self.arg, run)
+    def __compute__(self, run):
+        val = array(self.arg, run)
         if val is None:
             return None
         return self.op(val)
 
-    def __vectorvalue__(self, run, index):
-        val = value(self.arg, run, index)
-        if val is None:
-            return None
-        return self.op(val)
+    def __statistics__(self):
+        return statistics(self.arg)
 
     def __vectorlen__(self):
         return len(unproxy(self.arg))
@@ -254,33 +321,27 @@ class BinaryProxy(ValueProxy):
     def __vector__(self):
         return vector(self.arg0) or vector(self.arg1)
 
-    def __scalarvalue__(self, run):
-        val0 = value(self.arg0, run)
-        val1 = value(self.arg1, run)
+    def __compute__(self, run):
+        val0 = array(self.arg0, run)
+        val1 = array(self.arg1, run)
         if val0 is None or val1 is None:
             return None
-        try:
-            return self.op(val0, val1)
-        except ZeroDivisionError:
-            return None
 
-    def __vectorvalue__(self, run, index):
-        if scalar(self.arg0):
-            val0 = value(self.arg0, run)
-        if vector(self.arg0):
-            val0 = value(self.arg0, run, index)
-        if scalar(self.arg1):
-            val1 = value(self.arg1, run)
-        if vector(self.arg1):
-            val1 = value(self.arg1, run, index)
+        if vector(self):
+            # Check that the lengths match
+            self.__vectorlen__()
 
-        if val0 is None or val1 is None:
-            return None
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            result = self.op(val0, val1)
 
-        try:
-            return self.op(val0, val1)
-        except ZeroDivisionError:
-            return None
+        # Divisions by zero have no value
+        if self.op in (operator.__div__, operator.__truediv__,
+                       operator.__floordiv__):
+            result = numpy.where(val1 == 0, numpy.nan, result)
+        return result
+
+    def __statistics__(self):
+        return statistics(self.arg0) + statistics(self.arg1)
 
     def __vectorlen__(self):
         if vector(self.arg0) and scalar(self.arg1):
@@ -373,6 +434,14 @@ class ScalarStat(Statistic,Scalar):
             return None
         return self.data[run][0][0]
 
+    def __data__(self, run):
+        if run not in self.data:
+            return None
+        return self.data[run][0, 0]
+
+    def __statistics__(self):
+        return [ self ]
+
     def display(self, run=None):
         import display
         p = display.Print()
@@ -390,6 +459,14 @@ class VectorStat(Statistic,Vector):
             return None
         return self.data[run][item][0]
 
+    def __data__(self, run):
+        if run not in self.data:
+            return None
+        return self.data[run][:, 0]
+
+    def __statistics__(self):
+        return [ self ]
+
     def __len__(self):
         return self.x
 
@@ -405,12 +482,20 @@ class VectorStat(Statistic,Vector):
 
 class Formula(Value):
     def __getattribute__(self, attr):
-        if attr not in ( '__scalar__', '__vector__', '__value__', '__len__' ):
+        if attr not in ( '__scalar__', '__vector__', '__value__', '__len__',
+                         '__data__', '__statistics__' ):
             return super(Formula, self).__getattribute__(attr)
 
-        formula = re.sub(':', '__', self.formula)
-        value = eval(formula, self.source.stattop)
-        return getattr(value, attr)
+        # Keep the value the formula evaluates to, so that the arrays
+        # cached by its proxies are kept as well
+        source = self.source
+        cache = self.__dict__.get('_value')
+        if cache is None or cache[0] is not source or \
+           cache[1] != self.formula:
+            formula = re.sub(':', '__', self.formula)
+            cache = (source, self.formula, eval(formula, source.stattop))
+            self._value = cache
+        return getattr(cache[2], attr)
 
     def __str__(self):
         return self.name
@@ -0,0 +1,123 @@
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Bulk loading of text stats files (stats.txt[.gz]) into a SQLite
+# stats database (see dbinit.SQLiteDB).
+#
+# The stats files are parsed in parallel by a pool of worker
+# processes.  The main process owns the database and adds the stats
+# of each file as a run, with one executemany() per file.  Every line
+# of the stats files is stored as a scalar stat under its full name,
+# with the final_tick of its dump window as the tick, except for the
+# stats that are nan or inf, which are left out.  Delta windows
+# are completed with the unchanged stats of the windows before them.
+
+import getpass
+import math
+import multiprocessing
+import os
+from collections import OrderedDict
+
+import statsfile
+
+def parseStats(filename):
+    '''Return filename and the (tick, [(name, value, desc), ...])
+    tuples of the dump windows in it'''
+    stats = statsfile.StatsFile(filename, cache=False)
+    windows = []
+    values = OrderedDict()
+    for i in xrange(len(stats)):
+        tick = i
+        if not stats.isDelta(i):
+            values = OrderedDict()
+        for line in stats.text(i).splitlines():
+            fields = line.split(None, 2)
+            if len(fields) < 2:
+                # A stat dropped since the last window
+                if fields:
+                    values.pop(fields[0], None)
+                continue
+            try:
+                value = float(fields[1])
+            except ValueError:
+                continue
+            if math.isnan(value) or math.isinf(value):
+                # The database has no room for non-finite values,
+                # leave the stat out of the window
+                values.pop(fields[0], None)
+                continue
+
+            desc = ''
+            if len(fields) == 3:
+                pos = fields[2].find('#')
+                if pos >= 0:
+                    desc = fields[2][pos + 1:].strip()
+
+            if fields[0] == 'final_tick':
+                tick = int(value)
+            values[fields[0]] = (fields[0], value, desc)
+        windows.append((tick, values.values()))
+    stats.close()
+
+    return filename, windows
+
+def runName(filename):
+    '''Default run name for a stats file: its absolute path, as there
+    may be several stats files in a directory'''
+    return os.path.abspath(filename)
+
+def load(db, files, user=None, project='', jobs=None, name=runName):
+    '''Add the stats files in files to the SQLite database db as one
+    run each, named by name(filename).  Loading a file into a run
+    that already exists replaces its data.  Up to jobs files (by default
+    one per CPU) are parsed at a time.'''
+
+    if user is None:
+        user = getpass.getuser()
+
+    # The database can be regenerated from the stats files, so don't
+    # wait for every write to hit the disk.
+    db.query('PRAGMA synchronous = OFF')
+
+    ids = {}
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for filename, windows in pool.imap_unordered(parseStats, files):
+            run = db.insertRun(name(filename), user, project)
+
+            new = {}
+            for tick, values in windows:
+                for stat, value, desc in values:
+                    if stat not in ids:
+                        new[stat] = desc
+            if new:
+                ids.update(db.statIds(new))
+
+            db.insertData([ (ids[stat], 0, 0, run, tick, value)
+                            for tick, values in windows
+                            for stat, value, desc in values ])
+            db.commit()
+            print '%s: %d windows' % (filename, len(windows))
+    finally:
+        pool.close()
+        pool.join()
@@ -36,6 +36,27 @@ class StatOutput(ChartOptions):
         self.invert = False
         self.info = info
 
+    def prefetch(self, proxy=None):
+        '''Have the source load the stat for all of the jobs at once
+        rather than with a query for each job'''
+        if not hasattr(self.info, 'prefetch'):
+            return
+
+        from info import ProxyError, statistics
+        if proxy is None:
+            self.info.prefetch(self.stat)
+            return
+
+        # The stat depends on the system of each job
+        stats = []
+        for system in set([ job.system for job in self.jobfile.jobs() ]):
+            proxy.dict['system'] = self.info[system]
+            try:
+                stats += statistics(self.stat)
+            except ProxyError:
+                pass
+        self.info.prefetch(stats)
+
     def display(self, name, printmode = 'G'):
         import info
 
@@ -46,6 +67,7 @@ class StatOutput(ChartOptions):
         else:
             valformat = '%f'
 
+        self.prefetch()
         for job in self.jobfile.jobs():
             value = self.info.get(job, self.stat)
             if value is None:
@@ -105,6 +127,8 @@ class StatOutput(ChartOptions):
         print >>html, '<body>'
         html.flush()
 
+        self.prefetch(proxy)
+
         for options in self.jobfile.options(groups):
             chart = BarChart(self)
 
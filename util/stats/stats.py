@@ -32,9 +32,11 @@ import re, sys, math
 
 def usage():
     print '''\
-Usage: %s [-E] [-F] [ -G <get> ] [-d <db> ] [-g <graphdir> ] [-h <host>] [-p]
-       [-s <system>] [-r <runs> ] [-T <samples>] [-u <username>]
-       <command> [command args]
+Usage: %s [-E] [-F] [ -G <get> ] [-d <db> ] [-f <file>] [-g <graphdir> ]
+       [-h <host>] [-p] [-s <system>] [-r <runs> ] [-T <samples>]
+       [-u <username>] <command> [command args]
+
+       -f <file> uses the SQLite database in <file> instead of a server
 
        commands    extra parameters   description
        ----------- ------------------ ---------------------------------------
@@ -47,6 +49,10 @@ Usage: %s [-E] [-F] [ -G <get> ] [-d <db> ] [-g <graphdir> ] [-h <host>] [-p]
        stats       [regex]            List all stats (only matching regex)
 
        database    <command>          Where command is drop, init, or clean
+       database    load [-j <jobs>] <stats files>
+                                      Load stats files (SQLite only), one
+                                      run each named after the absolute
+                                      path of the stats file
 
 ''' % sys.argv[0]
     sys.exit(1)
@@ -68,7 +74,10 @@ def commands(options, command, args):
         if len(args) == 0: raise CommandException
 
         import dbinit
-        mydb = dbinit.MyDB(options)
+        if options.sqlite:
+            mydb = dbinit.SQLiteDB(options.sqlite)
+        else:
+            mydb = dbinit.MyDB(options)
 
         if args[0] == 'drop':
             if len(args) > 2: raise CommandException
@@ -94,12 +103,31 @@ def commands(options, command, args):
             if len(args) > 1: raise CommandException
             mydb.connect()
             mydb.clean()
+            mydb.close()
+            return
+
+        if args[0] == 'load':
+            if not options.sqlite: raise CommandException
+            jobs = None
+            opts, files = getopts(args[1:], '-j:')
+            for o,a in opts:
+                if o == '-j':
+                    jobs = int(a)
+            if not files: raise CommandException
+
+            import load
+            mydb.connect()
+            load.load(mydb, files, user=options.user, jobs=jobs)
+            mydb.close()
             return
 
         raise CommandException
 
     import db
-    source = db.Database()
+    if options.sqlite:
+        source = db.SQLiteDatabase(options.sqlite)
+    else:
+        source = db.Database()
     source.host = options.host
     source.db = options.db
     source.passwd = options.passwd
@@ -416,6 +444,7 @@ if __name__ == '__main__':
     options = Options()
     options.host = None
     options.db = None
+    options.sqlite = None
     options.passwd = ''
     options.user = getpass.getuser()
     options.runs = None
@@ -428,7 +457,7 @@ if __name__ == '__main__':
     options.jobfile = None
     options.all = False
 
-    opts, args = getopts(sys.argv[1:], '-EFJad:g:h:j:m:pr:s:u:T:')
+    opts, args = getopts(sys.argv[1:], '-EFJad:f:g:h:j:m:pr:s:u:T:')
     for o,a in opts:
         if o == '-E':
             options.printmode = 'E'
@@ -438,6 +467,8 @@ if __name__ == '__main__':
             options.all = True
         if o == '-d':
             options.db = a
+        if o == '-f':
+            options.sqlite = a
         if o == '-g':
             options.graph = True;
             options.graphdir = a
@@ -468,11 +499,12 @@ if __name__ == '__main__':
         if not options.db:
             options.db = options.jobfile.statdb
 
-    if not options.host:
-        sys.exit('Database server must be provided from a jobfile or -h')
+    if not options.sqlite:
+        if not options.host:
+            sys.exit('Database server must be provided from a jobfile or -h')
 
-    if not options.db:
-        sys.exit('Database name must be provided from a jobfile or -d')
+        if not options.db:
+            sys.exit('Database name must be provided from a jobfile or -d')
 
     if len(args) == 0:
         usage()
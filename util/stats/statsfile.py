@@ -0,0 +1,376 @@
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Indexed reader for the text stats output (stats.txt[.gz]).
+#
+# The first time a file is opened, it is scanned once for the dump
+# windows (the Begin/End Simulation Statistics blocks) and the byte
+# offset of each window is recorded.  The index is cached next to the
+# stats file as <file>.idx and reused as long as the stats file is
+# unchanged.  Windows are only parsed when asked for, by splitting
+# each line on whitespace, and their values are returned as NumPy
+# arrays.
+#
+# Offsets into gzip compressed files are offsets into the
+# uncompressed data.  As gzip streams can't be seeked, the reader
+# keeps decompressor checkpoints every few MB of output while it
+# decompresses, so that once a part of the file has been read, a
+# window in it can be reached without decompressing from the start.
+#
+# Files written with --stats-delta hold delta windows with only the
+# stats that changed since the previous window, and a full keyframe
+# window every so often.  A delta window is rebuilt from the keyframe
+# before it, or from the last window that was rebuilt when reading
+# windows in order.
+
+import json
+import os
+import zlib
+from collections import OrderedDict
+
+import numpy
+
+BEGIN = b'---------- Begin Simulation Statistics ----------'
+DELTA_BEGIN = b'---------- Begin Simulation Statistics Delta ----------'
+END = b'---------- End Simulation Statistics   ----------'
+
+# The part that both kinds of begin markers start with
+BEGIN_PREFIX = b'---------- Begin Simulation Statistics '
+
+INDEX_VERSION = 2
+
+# Size of the reads from the stats file
+BLOCK_SIZE = 1 << 22
+
+# Uncompressed bytes between two gzip decompressor checkpoints
+CHECKPOINT_SPACING = 1 << 24
+
+def isGzip(filename):
+    with open(filename, 'rb') as f:
+        return f.read(2) == b'\x1f\x8b'
+
+class PlainSource(object):
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+
+    def blocks(self):
+        '''Yield the (offset, data) blocks of the whole file'''
+        self.file.seek(0)
+        offset = 0
+        while True:
+            data = self.file.read(BLOCK_SIZE)
+            if not data:
+                break
+            yield offset, data
+            offset += len(data)
+
+    def read(self, start, end):
+        self.file.seek(start)
+        return self.file.read(end - start)
+
+    def close(self):
+        self.file.close()
+
+class GzipSource(object):
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        # (uncompressed offset, compressed offset, decompressor) at
+        # points where all the compressed data before the compressed
+        # offset has been consumed, sorted by offset
+        self.checkpoints = [ (0, 0, None) ]
+
+    def _decompress(self, checkpoint):
+        '''Yield the (offset, data) blocks of uncompressed data from
+        checkpoint on, adding checkpoints on the way'''
+        offset, compressed, dobj = checkpoint
+        dobj = dobj.copy() if dobj else zlib.decompressobj(16 + zlib.MAX_WBITS)
+        last = offset
+
+        self.file.seek(compressed)
+        while True:
+            data = self.file.read(BLOCK_SIZE)
+            if not data:
+                break
+            compressed += len(data)
+
+            out = dobj.decompress(data)
+            # A file can hold several gzip members back to back
+            while dobj.unused_data:
+                rest = dobj.unused_data
+                out += dobj.flush()
+                dobj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                out += dobj.decompress(rest)
+
+            if out:
+                yield offset, out
+                offset += len(out)
+
+            if offset - last >= CHECKPOINT_SPACING:
+                if offset > self.checkpoints[-1][0]:
+                    self.checkpoints.append((offset, compressed, dobj.copy()))
+                last = offset
+
+        out = dobj.flush()
+        if out:
+            yield offset, out
+
+    def blocks(self):
+        return self._decompress(self.checkpoints[0])
+
+    def read(self, start, end):
+        checkpoint = self.checkpoints[0]
+        for cp in self.checkpoints:
+            if cp[0] > start:
+                break
+            checkpoint = cp
+
+        chunks = []
+        for offset, data in self._decompress(checkpoint):
+            if offset + len(data) <= start:
+                continue
+            chunks.append(data[max(start - offset, 0):end - offset])
+            if offset + len(data) >= end:
+                break
+        return b''.join(chunks)
+
+    def close(self):
+        self.file.close()
+
+def scanWindows(source):
+    '''Return the (start, end, delta) offsets of the contents of the
+    dump windows found in one pass over source, and whether they are
+    delta windows'''
+
+    windows = []
+    start = None
+    delta = False
+    # Offset of the end of the last marker found
+    done = 0
+    tail = b''
+    for offset, data in source.blocks():
+        buf = tail + data
+        base = offset - len(tail)
+        pos = max(done - base, 0)
+        while True:
+            if start is None:
+                pos = buf.find(BEGIN_PREFIX, pos)
+                if pos < 0:
+                    break
+                if buf.startswith(BEGIN, pos):
+                    marker, delta = BEGIN, False
+                elif buf.startswith(DELTA_BEGIN, pos):
+                    marker, delta = DELTA_BEGIN, True
+                elif len(buf) - pos < len(DELTA_BEGIN):
+                    # Only the start of the marker is in this block
+                    break
+                else:
+                    pos += len(BEGIN_PREFIX)
+                    continue
+                start = base + pos + len(marker)
+            else:
+                pos = buf.find(END, pos)
+                if pos < 0:
+                    break
+                marker = END
+                windows.append((start, base + pos, delta))
+                start = None
+            pos += len(marker)
+            done = base + pos
+
+        # Keep enough of the end of the block to find a marker that
+        # straddles two blocks
+        keep = len(DELTA_BEGIN) - 1
+        tail = buf[-keep:] if len(buf) > keep else buf
+
+    return windows
+
+def parseWindow(data):
+    '''Return the names and values of the stats in the text of a
+    window'''
+    names, values, removed = parseDelta(data)
+    return names, values
+
+def parseDelta(data):
+    '''Return the names and values of the stats in the text of a
+    delta window, and the names of the stats it removes'''
+
+    names = []
+    values = []
+    removed = []
+    for line in data.splitlines():
+        fields = line.split(None, 2)
+        if len(fields) < 2:
+            if fields:
+                removed.append(fields[0])
+            continue
+        try:
+            value = float(fields[1])
+        except ValueError:
+            # Not a stat line, e.g. a histogram printed on one line
+            continue
+        names.append(fields[0])
+        values.append(value)
+
+    if bytes is not str:
+        names = [ name.decode('ascii') for name in names ]
+        removed = [ name.decode('ascii') for name in removed ]
+
+    return names, numpy.array(values, dtype=numpy.float64), removed
+
+class StatsFile(object):
+    def __init__(self, filename, cache=True):
+        self.filename = filename
+        self.index_filename = filename + '.idx'
+
+        if isGzip(filename):
+            self.source = GzipSource(filename)
+        else:
+            self.source = PlainSource(filename)
+
+        self.windows = None
+        if cache:
+            self.windows = self._loadIndex()
+
+        if self.windows is None:
+            self.windows = scanWindows(self.source)
+            if cache:
+                self._saveIndex()
+
+        # The last delta window that was rebuilt, as its index and an
+        # ordered dictionary of its stats
+        self._state = None
+
+    def _fileId(self):
+        st = os.stat(self.filename)
+        return st.st_size, int(st.st_mtime)
+
+    def _loadIndex(self):
+        try:
+            with open(self.index_filename) as f:
+                index = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+        size, mtime = self._fileId()
+        if index.get('version') != INDEX_VERSION or \
+           index.get('size') != size or index.get('mtime') != mtime:
+            return None
+
+        return [ tuple(window) for window in index['windows'] ]
+
+    def _saveIndex(self):
+        size, mtime = self._fileId()
+        index = { 'version' : INDEX_VERSION,
+                  'size' : size,
+                  'mtime' : mtime,
+                  'windows' : self.windows }
+        try:
+            with open(self.index_filename, 'w') as f:
+                json.dump(index, f)
+        except (IOError, OSError):
+            # The index is only a cache, e.g. the directory may be
+            # read-only
+            pass
+
+    def __len__(self):
+        '''Number of dump windows in the file'''
+        return len(self.windows)
+
+    def isDelta(self, i):
+        '''Whether the i'th window only holds the changed stats'''
+        return self.windows[i][2]
+
+    def text(self, i):
+        '''Text of the i'th window'''
+        start, end, delta = self.windows[i]
+        return self.source.read(start, end)
+
+    def window(self, i):
+        '''Names and values, as a NumPy array, of the stats of the
+        i'th window'''
+        if not self.isDelta(i):
+            return parseWindow(self.text(i))
+
+        # Start from the last rebuilt window if it is on the way from
+        # the keyframe to this window, from the keyframe otherwise
+        first = i
+        while first > 0 and self.isDelta(first):
+            first -= 1
+
+        if self._state and first <= self._state[0] <= i:
+            first, stats = self._state
+            first += 1
+        else:
+            stats = OrderedDict()
+
+        for j in range(first, i + 1):
+            names, values, removed = parseDelta(self.text(j))
+            if not self.isDelta(j):
+                stats = OrderedDict()
+            for name in removed:
+                stats.pop(name, None)
+            stats.update(zip(names, values))
+
+        self._state = (i, stats)
+        return list(stats.keys()), numpy.fromiter(stats.values(),
+                                                  dtype=numpy.float64,
+                                                  count=len(stats))
+
+    def values(self, i, names):
+        '''Values of the stats in names in the i'th window as a NumPy
+        array, NaN for the stats that weren't dumped'''
+        window_names, window_values = self.window(i)
+        index = dict(zip(window_names, window_values))
+        return numpy.array([ index.get(name, numpy.nan) for name in names ],
+                           dtype=numpy.float64)
+
+    def stats(self, names, windows=None):
+        '''Values of the stats in names as a 2D NumPy array with one
+        row per window, for all windows or the ones in windows'''
+        if windows is None:
+            windows = range(len(self))
+        else:
+            windows = list(windows)
+        return numpy.array([ self.values(i, names) for i in windows ],
+                           dtype=numpy.float64).reshape(len(windows),
+                                                        len(names))
+
+    def close(self):
+        self.source.close()
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: %s <file> [window [stat ...]]" % sys.argv[0])
+
+    stats = StatsFile(sys.argv[1])
+    if len(sys.argv) == 2:
+        print("%d windows" % len(stats))
+        sys.exit(0)
+
+    names, values = stats.window(int(sys.argv[2]))
+    wanted = set(sys.argv[3:])
+    for name, value in zip(names, values):
+        if not wanted or name in wanted:
+            print("%-60s %.17g" % (name, value))
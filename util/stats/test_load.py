@@ -0,0 +1,89 @@
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Tests of the bulk loading of stats files into a SQLite stats
+# database.  Run with: python util/stats/test_load.py
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import dbinit
+import load
+
+STATS = '''
+---------- Begin Simulation Statistics ----------
+sim_seconds                                  0.000500                       # Number of seconds simulated
+final_tick                                  500000000                       # Number of ticks from beginning of simulation
+system.cpu.ipc                                    nan                       # IPC: Instructions Per Cycle
+system.cpu.cpi                                    inf                       # CPI: Cycles Per Instruction
+system.cpu.committedInsts                        1000                       # Number of instructions committed
+
+---------- End Simulation Statistics   ----------
+'''
+
+class LoadTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = dbinit.SQLiteDB(os.path.join(self.dir, 'stats.db'))
+        self.db.create()
+        self.db.connect()
+        self.db.populate()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.dir)
+
+    def writeStats(self, name, text):
+        filename = os.path.join(self.dir, name)
+        with open(filename, 'w') as f:
+            f.write(text)
+        return filename
+
+    def data(self):
+        self.db.query('SELECT rn_name,st_name,dt_tick,dt_data '
+                      'FROM data, stats, runs '
+                      'WHERE dt_stat=st_id AND dt_run=rn_id')
+        return sorted(self.db.cursor.fetchall())
+
+    def testNonFinite(self):
+        filename = self.writeStats('stats.txt', STATS)
+        load.load(self.db, [ filename ], jobs=1)
+        self.assertEqual(self.data(), [
+            (filename, 'final_tick', 500000000, 500000000.0),
+            (filename, 'sim_seconds', 500000000, 0.0005),
+            (filename, 'system.cpu.committedInsts', 500000000, 1000.0) ])
+
+    def testReload(self):
+        first = self.writeStats('stats.txt', STATS)
+        second = self.writeStats('stats2.txt', STATS.replace('1000', '2000'))
+        load.load(self.db, [ first, second ], jobs=1)
+        load.load(self.db, [ first ], jobs=1)
+        self.db.query('SELECT rn_name FROM runs')
+        self.assertEqual(sorted(self.db.cursor.fetchall()),
+                         [ (first, ), (second, ) ])
+        self.assertEqual(len(self.data()), 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -729,9 +729,6 @@ class StatsEntry(object):
         self.short_name = re.sub("system\.", "", name)
         self.short_name = re.sub(":", "_", name)
 
-        # Regex for this stat (string version used to construct union regex)
-        self.regex_string = "^" + name + "\s+([\d\.]+)"
-        self.regex = re.compile("^" + name + "\s+([\d\.e\-]+)\s+# (.*)$", re.M)
         self.description = ""
 
         # Whether this stat is use per CPU or not
@@ -753,10 +750,8 @@ class StatsEntry(object):
         # Field used to hold ElementTree subelement for this stat
         self.ET_element = None
 
-        # Create per-CPU stat name and regex, etc.
+        # Create per-CPU stat name, etc.
         if self.per_cpu:
-            self.per_cpu_regex_string = []
-            self.per_cpu_regex = []
             self.per_cpu_name = []
             self.per_cpu_found = []
             for i in range(num_cpus):
@@ -768,10 +763,6 @@ class StatsEntry(object):
                 self.per_cpu_name.append(per_cpu_name)
                 print "\t", per_cpu_name
 
-                self.per_cpu_regex_string.\
-                    append("^" + per_cpu_name + "\s+[\d\.]+")
-                self.per_cpu_regex.append(re.compile("^" + per_cpu_name + \
-                    "\s+([\d\.e\-]+)\s+# (.*)$", re.M))
                 self.values.append([])
                 self.per_cpu_found.append(False)
 
@@ -795,18 +786,17 @@ class Stats(object):
             self.next_key))
         self.next_key += 1
 
-    # Union of all stats to accelerate parsing speed
-    def createStatsRegex(self):
-        regex_strings = [];
+    # Map from the name of each stat in the stats file to its entry
+    # and CPU index (None if the stat isn't per CPU)
+    def createStatsLookup(self):
+        self.lookup = {}
         print "\nnum entries in stats_list", len(self.stats_list)
         for entry in self.stats_list:
             if entry.per_cpu:
                 for i in range(num_cpus):
-                    regex_strings.append(entry.per_cpu_regex_string[i])
+                    self.lookup[entry.per_cpu_name[i]] = (entry, i)
             else:
-                regex_strings.append(entry.regex_string)
-
-        self.regex = re.compile('|'.join(regex_strings))
+                self.lookup[entry.name] = (entry, None)
 
 
 def registerStats(config_file):
@@ -856,10 +846,42 @@ def registerStats(config_file):
                 stats.register(item, group, i, False)
                 i += 1
 
-    stats.createStatsRegex()
+    stats.createStatsLookup()
 
     return stats
 
+# Read the lines of a gem5 stats file, gzip compressed if its name
+# ends in .gz, in large blocks
+def readLines(f, compressed, block_size=1 << 22):
+    if compressed:
+        dobj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    rest = ""
+    while True:
+        data = f.read(block_size)
+        if not data:
+            break
+
+        if compressed:
+            data = dobj.decompress(data)
+            # Handle files made of several gzip members
+            while dobj.unused_data:
+                unused = dobj.unused_data
+                data += dobj.flush()
+                dobj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                data += dobj.decompress(unused)
+
+        lines = (rest + data).split("\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line
+
+    if compressed:
+        rest += dobj.flush()
+    for line in rest.split("\n"):
+        if line:
+            yield line
+
 # Parse and read in gem5 stats file
 # Streamline counters are organized per CPU
 def readGem5Stats(stats, gem5_stats_file):
@@ -869,122 +891,132 @@ def readGem5Stats(stats, gem5_stats_file):
     print "===============================\n"
     ext = os.path.splitext(gem5_stats_file)[1]
 
-    window_start_regex = \
-        re.compile("^---------- Begin Simulation Statistics ----------")
-    window_end_regex = \
-        re.compile("^---------- End Simulation Statistics   ----------")
-    final_tick_regex = re.compile("^final_tick\s+(\d+)")
-
     global ticks_in_ns
-    sim_freq_regex = re.compile("^sim_freq\s+(\d+)")
     sim_freq = -1
 
     try:
-        if ext == ".gz":
-            f = gzip.open(gem5_stats_file, "r")
-        else:
-            f = open(gem5_stats_file, "r")
+        f = open(gem5_stats_file, "rb")
     except:
         print "ERROR opening stats file", gem5_stats_file, "!"
         sys.exit(1)
 
-    stats_not_found_list = stats.stats_list[:]
     window_num = 0
-
-    while (True):
-        error = False
-        try:
-            line = f.readline()
-        except IOError:
-            print ""
-            print "WARNING: IO error in stats file"
-            print "(gzip stream not closed properly?)...continuing for now"
-            error = True
-        if not line:
-            break
+    in_window = False
+    # A delta window (--stats-delta) only has the stats that changed
+    # since the last window, the others keep their last value unless
+    # they were dropped
+    delta = False
+    dropped = set()
+
+    def endWindow():
+        if args.verbose:
+            print "new window"
+        for stat in stats.stats_list:
+            if stat.per_cpu:
+                for i in range(num_cpus):
+                    if not stat.per_cpu_found[i] and delta and \
+                       stat.values[i] and (stat, i) not in dropped:
+                        stat.values[i].append(stat.values[i][-1])
+                    elif not stat.per_cpu_found[i]:
+                        if not stat.not_found_at_least_once:
+                            print "WARNING: stat not found in window #", \
+                                window_num, ":", stat.per_cpu_name[i]
+                            print "suppressing further warnings for " + \
+                                "this stat"
+                            stat.not_found_at_least_once = True
+                        stat.values[i].append(str(0))
+                    stat.per_cpu_found[i] = False
+            else:
+                if not stat.found and delta and stat.values and \
+                   (stat, None) not in dropped:
+                    stat.values.append(stat.values[-1])
+                elif not stat.found:
+                    if not stat.not_found_at_least_once:
+                        print "WARNING: stat not found in window #", \
+                            window_num, ":", stat.name
+                        print "suppressing further warnings for this stat"
+                        stat.not_found_at_least_once = True
+                    stat.values.append(str(0))
+                stat.found = False
+        dropped.clear()
+
+    lookup = stats.lookup
+    for line in readLines(f, ext == ".gz"):
+        # Split into name, value and the rest of the line
+        fields = line.split(None, 2)
+        if len(fields) < 2:
+            # A stat dropped since the last window
+            if fields and delta and fields[0] in lookup:
+                dropped.add(lookup[fields[0]])
+            continue
+        name = fields[0]
+
+        if name == "----------":
+            if fields[1] == "Begin":
+                in_window = True
+                delta = fields[2].startswith("Simulation Statistics Delta")
+            elif fields[1] == "End":
+                endWindow()
+                window_num += 1
+                in_window = False
+            continue
 
         # Find out how many gem5 ticks in 1ns
-        if sim_freq < 0:
-            m = sim_freq_regex.match(line)
-            if m:
-                sim_freq = int(m.group(1)) # ticks in 1 sec
-                ticks_in_ns = int(sim_freq / 1e9)
-                print "Simulation frequency found! 1 tick == %e sec\n" \
-                        % (1.0 / sim_freq)
+        if sim_freq < 0 and name == "sim_freq":
+            sim_freq = int(fields[1]) # ticks in 1 sec
+            ticks_in_ns = int(sim_freq / 1e9)
+            print "Simulation frequency found! 1 tick == %e sec\n" \
+                    % (1.0 / sim_freq)
 
         # Final tick in gem5 stats: current absolute timestamp
-        m = final_tick_regex.match(line)
-        if m:
-            tick = int(m.group(1))
+        if name == "final_tick":
+            tick = int(fields[1])
             if tick > end_tick:
+                in_window = False
                 break
             stats.tick_list.append(tick)
 
+        entry = lookup.get(name)
+        if entry is None:
+            continue
+
+        # Only take plain stat lines: a value followed by the description
+        if len(fields) < 3 or not fields[2].startswith("#"):
+            continue
+
+        stat, i = entry
+        found = stat.found if i is None else stat.per_cpu_found[i]
+        if found:
+            continue
 
-        if (window_end_regex.match(line) or error):
+        try:
+            if stat.name == "ipc":
+                value = str(int(float(fields[1]) * 1000))
+            else:
+                value = str(int(float(fields[1])))
+        except (ValueError, OverflowError):
+            continue
+
+        if i is None:
             if args.verbose:
-                print "new window"
-            for stat in stats.stats_list:
-                if stat.per_cpu:
-                    for i in range(num_cpus):
-                        if not stat.per_cpu_found[i]:
-                            if not stat.not_found_at_least_once:
-                                print "WARNING: stat not found in window #", \
-                                    window_num, ":", stat.per_cpu_name[i]
-                                print "suppressing further warnings for " + \
-                                    "this stat"
-                                stat.not_found_at_least_once = True
-                            stat.values[i].append(str(0))
-                        stat.per_cpu_found[i] = False
-                else:
-                    if not stat.found:
-                        if not stat.not_found_at_least_once:
-                            print "WARNING: stat not found in window #", \
-                                window_num, ":", stat.name
-                            print "suppressing further warnings for this stat"
-                            stat.not_found_at_least_once = True
-                        stat.values.append(str(0))
-                    stat.found = False
-            stats_not_found_list = stats.stats_list[:]
-            window_num += 1
-            if error:
-                break
+                print stat.name, value
+            stat.values.append(value)
+            stat.found = True
+        else:
+            if args.verbose:
+                print stat.per_cpu_name[i], value
+            stat.values[i].append(value)
+            stat.per_cpu_found[i] = True
+
+        if stat.description == "":
+            stat.description = fields[2][1:].strip()
+
+    if in_window:
+        print ""
+        print "WARNING: stats file ended in the middle of a window"
+        print "(gzip stream not closed properly?)...continuing for now"
+        endWindow()
 
-        # Do a single regex of the union of all stats first for speed
-        if stats.regex.match(line):
-            # Then loop through only the stats we haven't seen in this window
-            for stat in stats_not_found_list[:]:
-                if stat.per_cpu:
-                    for i in range(num_cpus):
-                        m = stat.per_cpu_regex[i].match(line)
-                        if m:
-                            if stat.name == "ipc":
-                                value = str(int(float(m.group(1)) * 1000))
-                            else:
-                                value = str(int(float(m.group(1))))
-                            if args.verbose:
-                                print stat.per_cpu_name[i], value
-                            stat.values[i].append(value)
-                            stat.per_cpu_found[i] = True
-                            all_found = True
-                            for j in range(num_cpus):
-                                if not stat.per_cpu_found[j]:
-                                    all_found = False
-                            if all_found:
-                                stats_not_found_list.remove(stat)
-                            if stat.description == "":
-                                stat.description = m.group(2)
-                else:
-                    m = stat.regex.match(line)
-                    if m:
-                        value = str(int(float(m.group(1))))
-                        if args.verbose:
-                            print stat.name, value
-                        stat.values.append(value)
-                        stat.found = True
-                        stats_not_found_list.remove(stat)
-                        if stat.description == "":
-                            stat.description = m.group(2)
     f.close()
 
 
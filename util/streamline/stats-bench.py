@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Time the stats file parsing of m5stats2streamline.py on a generated
+# stats file with many CPUs and dump windows.  The stats that are
+# read are the ones of a stat config file (atomic_stat_config.ini by
+# default), surrounded by filler stats as in a real stats file.  Use
+# --script to time another version of m5stats2streamline.py.
+
+import optparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from ConfigParser import ConfigParser
+
+here = os.path.dirname(os.path.abspath(sys.argv[0]))
+
+parser = optparse.OptionParser()
+
+parser.add_option("--cpus", type="int", default=32,
+                  help="Number of CPUs [default: %default]")
+parser.add_option("--l2s", type="int", default=4,
+                  help="Number of L2 caches [default: %default]")
+parser.add_option("--windows", type="int", default=100,
+                  help="Number of dump windows [default: %default]")
+parser.add_option("--filler", type="int", default=400,
+                  help="Other stats per CPU in each window [default: %default]")
+parser.add_option("--no-gzip", action="store_true", default=False,
+                  help="Don't compress the stats file")
+parser.add_option("--config", default=os.path.join(here,
+                  "atomic_stat_config.ini"),
+                  help="Stat config file [default: %default]")
+parser.add_option("--script", default=os.path.join(here,
+                  "m5stats2streamline.py"),
+                  help="Converter to time [default: %default]")
+
+(options, args) = parser.parse_args()
+
+if args:
+    print "Error: script doesn't take any positional arguments"
+    sys.exit(1)
+
+def expand(name, index, count):
+    return name.replace("#", str(index) if count > 1 else "")
+
+def statNames():
+    config = ConfigParser()
+    config.read(options.config)
+
+    names = []
+    for section, count in (("PER_CPU_STATS", options.cpus),
+                           ("PER_L2_STATS", options.l2s),
+                           ("OTHER_STATS", 1)):
+        for group in config.options(section):
+            for item in config.get(section, group).split("\n"):
+                if item:
+                    names += [ expand(item, i, count) for i in range(count) ]
+    for cpu in range(options.cpus):
+        names += [ "system.cluster.cpu%d.filler%d" % (cpu, i)
+                   for i in range(options.filler) ]
+    return sorted(names)
+
+def writeStats(filename):
+    names = statNames()
+    out = open(filename, "wb")
+    dobj = None
+    if not options.no_gzip:
+        dobj = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    for window in range(options.windows):
+        lines = [ "",
+                  "---------- Begin Simulation Statistics ----------",
+                  "%-50s %-20d # Frequency of simulated ticks" %
+                  ("sim_freq", 1000000000000),
+                  "%-50s %-20d # Number of ticks from beginning of "
+                  "simulation" % ("final_tick", (window + 1) * 1000000) ]
+        lines += [ "%-50s %-20d # Stat %d" % (name, window * 7 + i, i)
+                   for i, name in enumerate(names) ]
+        lines += [ "", "---------- End Simulation Statistics   ----------",
+                   "" ]
+        data = "\n".join(lines)
+        out.write(dobj.compress(data) if dobj else data)
+
+    if dobj:
+        out.write(dobj.flush())
+    out.close()
+    return len(names)
+
+def loadConverter(config, run_dir):
+    # Only load the definitions, not the main routine
+    source = open(options.script).read()
+    source = source[:source.index("# Main Routine")]
+
+    argv = sys.argv
+    sys.argv = [ options.script, config, run_dir,
+                 os.path.join(run_dir, "out.apc") ]
+    try:
+        namespace = { "__name__" : "m5stats2streamline" }
+        exec compile(source, options.script, "exec") in namespace
+    finally:
+        sys.argv = argv
+
+    namespace["num_cpus"] = options.cpus
+    namespace["num_l2"] = options.l2s
+    namespace["end_tick"] = sys.maxint
+    return namespace
+
+def quietly(func, *args):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        return func(*args)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+run_dir = tempfile.mkdtemp()
+try:
+    filename = os.path.join(run_dir, "stats.txt")
+    if not options.no_gzip:
+        filename += ".gz"
+    count = writeStats(filename)
+    print "%d windows of %d stats, %d bytes" % \
+          (options.windows, count, os.path.getsize(filename))
+
+    converter = loadConverter(options.config, run_dir)
+    stats = quietly(converter["registerStats"], options.config)
+
+    start = time.time()
+    quietly(converter["readGem5Stats"], stats, filename)
+    elapsed = time.time() - start
+
+    print "readGem5Stats %.3fs, %.1f windows/s" % \
+          (elapsed, options.windows / elapsed)
+    assert len(stats.tick_list) == options.windows
+finally:
+    shutil.rmtree(run_dir)